@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import datetime
+import tempfile
+import tracemalloc
+import numpy as np
+from tabulate import tabulate
+from vix.options.chain import OptionChain
+from vix.options.stream import parse_option_chain_file
+from vix.options.binary import write_binary_chain, read_binary_chain
+from vix.options.expirations import Expirations
+from vix.options.options import determine_forward_level_strike
+from vix.math import calculate_t, calculate_f, calculate_vix
+from vix.volatility import Volatility
+from vix.vectorized_volatility import VectorizedVolatility
+from tests.helpers import build_td_response
+
+"""
+Offline benchmarks of each step of Vix.calculate(), on the sample TD Ameritrade response and on synthetic chains
+scaled up in strikes and in expirations. Nothing touches the network: r is fixed, and chains are read from files
+written to a temporary directory.
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --chains=base,strikes_x100 --engine=python --iterations=50 --json=pipeline.json
+    python -m benchmarks.pipeline --compare=pipeline.json --tolerance=0.25
+
+Every step is timed on its own, over the output of the previous steps, and reported as latency percentiles and
+throughput. Peak memory is measured in a separate pass under tracemalloc, so it doesn't slow the timed runs.
+--compare reads the --json output of an earlier run, and exits with 1 when a step's median latency got slower by more
+than tolerance, (a fraction, 0.25 by default).
+"""
+
+FIXTURE = 'tests/fixtures/sample_td_spx_response.json'
+R = 4.87
+PERCENTILES = [50, 90, 99]
+MIN_REGRESSION_MS = 0.1  # Steps this fast are mostly timer noise
+
+BASE_STRIKES = 80
+BASE_STRIKE_STEP = 25.0
+BASE_DAYS = [3, 10, 17, 24, 31, 38, 45, 59, 87]
+
+
+def build_scaled_response(strike_scale: int = 1, expiration_scale: int = 1, now: datetime.datetime = None) -> dict:
+    """
+    Synthetic chain with strike_scale times the strikes, (over the same price range), and expiration_scale times
+    the expirations of the base synthetic chain, (one per day at most).
+    """
+    if (expiration_scale == 1):
+        days = BASE_DAYS
+    else:
+        count = len(BASE_DAYS) * expiration_scale
+        days = sorted(set(np.linspace(1, max(BASE_DAYS[-1], count), count).astype(int).tolist()))
+
+    return build_td_response(
+        strike_count=BASE_STRIKES * strike_scale,
+        strike_step=BASE_STRIKE_STEP / strike_scale,
+        days=days,
+        now=now,
+    )
+
+
+def chain_responses(names: list = None) -> dict:
+    """
+    Returns
+    -------
+    responses   :dict
+                {name: td response}, the fixture is included when it is available.
+    """
+    now = datetime.datetime.now()
+    builders = {
+        'base': lambda: build_scaled_response(now=now),
+        'strikes_x10': lambda: build_scaled_response(strike_scale=10, now=now),
+        'strikes_x100': lambda: build_scaled_response(strike_scale=100, now=now),
+        'expirations_x10': lambda: build_scaled_response(expiration_scale=10, now=now),
+        'expirations_x100': lambda: build_scaled_response(expiration_scale=100, now=now),
+    }
+    if os.path.exists(FIXTURE):
+        builders = {'fixture': lambda: json.load(open(FIXTURE, 'r')), **builders}
+
+    names = names or list(builders)
+    unknown = [name for name in names if name not in builders]
+    if unknown:
+        raise Exception(f"Unknown benchmark chain(s) {', '.join(unknown)}. Choose from: {', '.join(builders)}")
+
+    return {name: builders[name]() for name in names}
+
+
+def pipeline_steps(json_path: str, binary_path: str, engine) -> list:
+    """
+    The steps of Vix.calculate(), in order. Each step takes the state built by the steps before it and adds its output.
+    """
+    min_days = Expirations.min_days_to_expiration
+    max_days = Expirations.max_days_to_expiration
+
+    def parse(state):
+        state['chain'] = parse_option_chain_file(json_path, min_days, max_days)
+
+    def load_binary(state):
+        state['chain'] = read_binary_chain(binary_path, min_days, max_days)
+
+    def find_option_terms(state):
+        state['selected_chain'] = Expirations().find_option_terms(state['chain'])
+
+    def forward_level(state):
+        state['forward_level'] = determine_forward_level_strike(state['selected_chain'])
+
+    def t_and_f(state):
+        state['t'], state['tminutes'] = calculate_t(state['selected_chain'])
+        state['f'] = calculate_f(state['t'], R, state['forward_level'])
+
+    def volatility(state):
+        state['vol'] = engine.calculate(state['f'], state['t'], R, state['selected_chain'])
+
+    def equation(state):
+        state['vix'] = calculate_vix(state['vol'], state['t'], state['tminutes'])
+
+    return [
+        ('parse (json)', parse),
+        ('load (binary cache)', load_binary),
+        ('find_option_terms', find_option_terms),
+        ('determine_forward_level_strike', forward_level),
+        ('calculate_t / calculate_f', t_and_f),
+        ('volatility', volatility),
+        ('equation', equation),
+    ]
+
+
+def run_steps(fns: list) -> float:
+    state = {}
+    for fn in fns:
+        fn(state)
+    return state['vix']
+
+
+def time_call(fn, iterations: int) -> np.ndarray:
+    fn()  # Warm up, (imports, caches, page cache)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(chain: str, step: str, timings: np.ndarray, peak: int) -> dict:
+    record = {'chain': chain, 'step': step, 'iterations': len(timings)}
+    for p, value in zip(PERCENTILES, np.percentile(timings, PERCENTILES)):
+        record[f"p{p}_ms"] = value * 1000
+    record['max_ms'] = timings.max() * 1000
+    record['per_second'] = len(timings) / timings.sum()
+    record['peak_kib'] = peak / 1024
+    return record
+
+
+def benchmark_chain(name: str, response: dict, engine, iterations: int, directory: str) -> list:
+    json_path = os.path.join(directory, f"{name}.json")
+    binary_path = os.path.join(directory, f"{name}.bin")
+    with open(json_path, 'w') as f:
+        json.dump(response, f)
+    write_binary_chain(
+        OptionChain.from_td_response(response, Expirations.min_days_to_expiration, Expirations.max_days_to_expiration),
+        binary_path,
+        Expirations.min_days_to_expiration,
+        Expirations.max_days_to_expiration,
+    )
+
+    steps = pipeline_steps(json_path, binary_path, engine)
+    records = []
+    state = {}
+
+    for step, fn in steps:
+        fn(state)
+        inputs = dict(state)  # Each run of a step starts from the same inputs
+        timings = time_call(lambda: fn(dict(inputs)), iterations)
+        records.append(summarize(name, step, timings, peak_memory(lambda: fn(dict(inputs)))))
+
+    # The whole pipeline, from the JSON response and from the binary chain cache.
+    for label, skipped in [('pipeline (json)', 'load (binary cache)'), ('pipeline (binary cache)', 'parse (json)')]:
+        fns = [fn for step, fn in steps if step != skipped]
+        run = lambda fns=fns: run_steps(fns)
+        records.append(summarize(name, label, time_call(run, iterations), peak_memory(run)))
+
+    return records
+
+
+def compare(records: list, baseline: list, tolerance: float) -> list:
+    """
+    Returns
+    -------
+    regressions :list
+                Records whose p50 is more than tolerance, (and MIN_REGRESSION_MS), slower than the same chain and step in baseline.
+    """
+    baseline = {(record['chain'], record['step']): record for record in baseline}
+    regressions = []
+
+    for record in records:
+        previous = baseline.get((record['chain'], record['step']))
+        if previous and (record['p50_ms'] - previous['p50_ms'] > max(previous['p50_ms'] * tolerance, MIN_REGRESSION_MS)):
+            regressions.append({**record, 'baseline_p50_ms': previous['p50_ms']})
+
+    return regressions
+
+
+def main(args: list) -> list:
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    iterations = int(options.get('iterations', 20))
+    engine = {'numpy': VectorizedVolatility, 'python': Volatility}[options.get('engine', 'numpy')]()
+    names = options['chains'].split(',') if 'chains' in options else None
+
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, response in chain_responses(names).items():
+            chain_records = benchmark_chain(name, response, engine, iterations, directory)
+            records += chain_records
+
+            contracts = sum(len(strikes) for side in ['callExpDateMap', 'putExpDateMap'] for strikes in response[side].values())
+            print(f"\n{name}: {len(response['callExpDateMap'])} expirations, {contracts} contracts, {iterations} iterations")
+            print(tabulate([{k: v for k, v in record.items() if k not in ['chain', 'iterations']} for record in chain_records], headers='keys', floatfmt='.3f'))
+
+    if 'json' in options:
+        with open(options['json'], 'w') as f:
+            json.dump(records, f, indent=2)
+
+    if 'compare' in options:
+        with open(options['compare'], 'r') as f:
+            regressions = compare(records, json.load(f), float(options.get('tolerance', 0.25)))
+        if regressions:
+            print('\nRegressions:')
+            print(tabulate([{k: record[k] for k in ['chain', 'step', 'baseline_p50_ms', 'p50_ms']} for record in regressions], headers='keys', floatfmt='.3f'))
+            sys.exit(1)
+        print('\nNo regressions.')
+
+    return records
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
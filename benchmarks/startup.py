@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import datetime
+import tempfile
+import subprocess
+import numpy as np
+from tabulate import tabulate
+from vix.cache.disk import DiskCache
+from vix.http import fred, td_ameritrade
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.options.options import build_option_chain_time_range
+from tests.helpers import build_td_response
+
+"""
+Startup benchmarks of the CLI. Each scenario is run as a fresh interpreter, the way it is invoked in production.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs=50
+
+'run.py vix SPY (cached)' runs against a temporary directory whose chain and rate caches are already filled, so it
+measures a whole cached run: interpreter startup, imports, loading the cached chain and the calculation.
+The modules listed as loaded are the heavy ones which were imported by that run, (requests, bs4... shouldn't be).
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN = os.path.join(ROOT, 'run.py')
+HEAVY_MODULES = ['requests', 'urllib3', 'bs4', 'dotenv', 'ijson', 'asyncio', 'multiprocessing', 'pandas', 'tabulate', 'numpy', 'sqlite3']
+
+SCENARIOS = {
+    'python (interpreter only)': [sys.executable, '-c', 'pass'],
+    'import vix.vix': [sys.executable, '-c', 'import vix.vix'],
+    'run.py vix SPY (cached)': [sys.executable, RUN, 'vix', 'SPY'],
+}
+
+
+class _Response:
+    # Just enough of a requests.Response for TDAmeritrade.parse_option_chain_response()
+    def __init__(self, chain: dict):
+        self.chain = chain
+
+    def json(self) -> dict:
+        return self.chain
+
+
+def fill_caches(directory: str, ticker: str = 'SPY'):
+    """
+    Writes a synthetic chain and today's rate into the caches under directory, like a previous run would have.
+    """
+    time_range = build_option_chain_time_range()
+    td = TDAmeritrade(
+        ticker=ticker,
+        api_key='',
+        disk_cache=DiskCache(os.path.join(directory, td_ameritrade.CACHE_DIRECTORY), ttl=td_ameritrade.CACHE_TTL),
+    )
+    td.parse_option_chain_response(_Response(build_td_response(symbol=ticker, spot=400.0, strike_step=5.0)), time_range)
+
+    # Same name as Fred's rate cache
+    today = datetime.datetime.now().strftime('%Y-%m-%d')
+    rates = DiskCache(os.path.join(directory, fred.CACHE_DIRECTORY), ttl=fred.CACHE_TTL)
+    rates.write_bytes(f"rates_{today}.json", json.dumps({'rate': 4.87, 'timestamp': today}).encode('utf-8'))
+
+
+def environment() -> dict:
+    return {**os.environ, 'PYTHONPATH': ROOT, 'TDAMER_KEY': os.environ.get('TDAMER_KEY', 'benchmark')}
+
+
+def time_command(command: list, runs: int, cwd: str) -> np.ndarray:
+    subprocess.run(command, cwd=cwd, env=environment(), check=True, capture_output=True)  # Warm up, (bytecode, page cache)
+    timings = np.empty(runs)
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=environment(), check=True, capture_output=True)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def loaded_modules(command: list, cwd: str) -> list:
+    # Runs the scenario's script or code in an interpreter which reports the heavy modules it ended up importing.
+    if (command[1] == '-c'):
+        code = command[2]
+    else:
+        code = f"import sys, runpy; sys.argv = {command[1:]!r}; runpy.run_path({command[1]!r}, run_name='__main__')"
+    code += f"\nimport sys; print('\\n' + ' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=environment(), check=True, capture_output=True, text=True).stdout
+    return output.strip().split('\n')[-1].split() if output.strip() else []
+
+
+def main(args: list) -> list:
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    runs = int(options.get('runs', 20))
+
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        fill_caches(directory)
+
+        for scenario, command in SCENARIOS.items():
+            timings = time_command(command, runs, directory)
+            records.append({
+                'scenario': scenario,
+                'p50_ms': np.percentile(timings, 50) * 1000,
+                'p90_ms': np.percentile(timings, 90) * 1000,
+                'min_ms': timings.min() * 1000,
+                'loaded': ' '.join(loaded_modules(command, directory)),
+            })
+
+    print(tabulate(records, headers='keys', floatfmt='.1f'))
+    return records
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
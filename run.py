@@ -1,7 +1,5 @@
 import sys
 import os
-from dotenv import load_dotenv
-load_dotenv()
 
 # This is some code I reuse for any scripting projects I have.
 # It's probably too complex for a project with only one command but it works...
@@ -10,19 +8,219 @@ load_dotenv()
 def vix_controller(args):
     from vix.vix import Vix
     key = os.environ.get("TDAMER_KEY")
-    ticker = args[0]
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    tickers = [arg for arg in args if not arg.startswith('--')]
 
     vixvol = Vix(
         td_api_key=key,
         debug=False,
-        caching_enabled=True
+        caching_enabled=True,
+        # python run.py vix SPY --results=storage/results/vix.sqlite3, nothing is stored otherwise
+        result_store=options.get('results'),
     )
 
-    vix = vixvol.calculate(ticker)
-    print('VIX: ' + str(vix))
+    try:
+        run_vix(vixvol, tickers)
+    finally:
+        # python run.py vix SPY --metrics=metrics.jsonl
+        if 'metrics' in options:
+            vixvol.metrics.write_jsonl(options['metrics'])
+
+
+def run_vix(vixvol, tickers: list):
+    if (len(tickers) == 1):
+        vix = vixvol.calculate(tickers[0])
+        print('VIX: ' + str(vix))
+        return
+
+    # python run.py vix SPY AAPL MSFT
+    import asyncio
+    batch = asyncio.run(vixvol.calculate_many_async(tickers))
+    for ticker in tickers:
+        if ticker in batch['results']:
+            print(f"{ticker} VIX: {batch['results'][ticker]}")
+        else:
+            print(f"{ticker} Error: {batch['errors'][ticker]}")
+
+
+def results_controller(args):
+    # python run.py results SPY --days=30
+    # python run.py results --at=2023-06-01T16:00
+    import time
+    import datetime
+    from vix.results import ResultStore, RESULTS_PATH
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    tickers = [arg for arg in args if not arg.startswith('--')]
+    store = ResultStore(options.get('results', RESULTS_PATH))
+
+    if (tickers and ('at' not in options)):
+        start = time.time() - float(options.get('days', 30)) * 24 * 60 * 60
+        rows = [row for ticker in tickers for row in store.history(ticker, start=start)]
+    else:
+        at = datetime.datetime.fromisoformat(options['at']).timestamp() if 'at' in options else time.time()
+        rows = store.at(at, tickers or None)
+
+    for row in rows:
+        value = row['vix'] if (row['error'] is None) else f"Error: {row['error']}"
+        print(f"{datetime.datetime.fromtimestamp(row['timestamp']):%Y-%m-%d %H:%M:%S} {row['ticker']} VIX: {value}")
+
+
+def schedule_controller(args):
+    # python run.py schedule SPY AAPL --interval=60 --ttl=300
+    from vix.vix import Vix
+    from vix.scheduler import VixScheduler
+    key = os.environ.get("TDAMER_KEY")
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    tickers = [arg for arg in args if not arg.startswith('--')]
+
+    vixvol = Vix(
+        td_api_key=key,
+        debug=False,
+        caching_enabled=True,
+        chain_cache_ttl=float(options.get('ttl', 300)),
+    )
+
+    scheduler = VixScheduler(vixvol, tickers, interval=float(options.get('interval', 60)))
+    print(f"Recomputing {', '.join(tickers)} every {scheduler.interval:g} seconds. Values are stored under {scheduler.store.directory}/")
+
+    scheduler.run(on_tick=lambda results: print(' '.join(f"{ticker}: {vix}" for ticker, vix in results.items())))
+
+
+def replay_controller(args):
+    # python run.py replay storage/snapshots SPY AAPL --r=4.87
+    from vix.vix import Vix
+    from vix.providers.snapshots import SnapshotProvider
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    directory, *tickers = [arg for arg in args if not arg.startswith('--')]
+
+    vixvol = Vix(
+        td_api_key=os.environ.get("TDAMER_KEY"),
+        provider=SnapshotProvider(directory),
+    )
+
+    r = float(options['r']) if 'r' in options else None
+    for result in vixvol.replay(tickers or None, r=r):
+        value = result['vix'] if (result['error'] is None) else f"Error: {result['error']}"
+        print(f"{result['snapshot_time']:.0f} {result['ticker']} VIX: {value}")
+
+
+def backfill_controller(args):
+    # python run.py backfill storage/snapshots SPY AAPL --start=2023-01-01 --end=2023-12-31 --output=storage/backfill/vix.npz
+    import datetime
+    from vix.vix import Vix
+    from vix.backfill import Backfill
+    from vix.providers.snapshots import SnapshotProvider
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    directory, *tickers = [arg for arg in args if not arg.startswith('--')]
+    day = lambda name: datetime.datetime.strptime(options[name], '%Y-%m-%d').timestamp() if name in options else None
+
+    vixvol = Vix(
+        td_api_key=os.environ.get("TDAMER_KEY"),
+        provider=SnapshotProvider(directory),
+    )
+
+    backfill = Backfill(vixvol, max_workers=int(options['workers']) if 'workers' in options else None)
+    output = options.get('output', 'storage/backfill/vix.npz')
+    columns = backfill.run(
+        tickers or None,
+        start=day('start'),
+        end=day('end') + 24 * 60 * 60 - 1 if 'end' in options else None,  # Until the end of that day
+        r=float(options['r']) if 'r' in options else None,
+        output=output,
+    )
+
+    errors = int((columns['error'] != '').sum())
+    print(f"{len(columns['vix']) - errors} values, {errors} errors, written to {output}")
+
+
+def term_controller(args):
+    # python run.py term SPY AAPL --horizons=9,30,93,184
+    from vix.vix import Vix
+    from vix.term_structure import HORIZONS
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    tickers = [arg for arg in args if not arg.startswith('--')]
+    horizons = [int(days) for days in options['horizons'].split(',')] if 'horizons' in options else HORIZONS
+
+    vixvol = Vix(td_api_key=os.environ.get("TDAMER_KEY"))
+    batch = vixvol.term_structure(tickers, horizons, r=float(options['r']) if 'r' in options else None)
+
+    for ticker in tickers:
+        values = [f"{horizon}d: {batch['results'].get(ticker, {}).get(horizon, '-')}" for horizon in horizons]
+        print(f"{ticker} {' '.join(values)}")
+        for horizon, error in batch['errors'].get(ticker, {}).items():
+            print(f"  {horizon}d Error: {error}")
+
+
+def surface_controller(args):
+    # python run.py surface SPY --output=storage/surfaces/SPY.surface --all
+    from vix.vix import Vix
+    options = dict((arg[2:].split('=') + [''])[:2] for arg in args if arg.startswith('--'))
+    ticker = [arg for arg in args if not arg.startswith('--')][0]
+
+    vixvol = Vix(td_api_key=os.environ.get("TDAMER_KEY"))
+    surface = vixvol.variance_surface(ticker, r=float(options['r']) if 'r' in options else None, all_expirations=('all' in options))
+
+    output = options.get('output', f"storage/surfaces/{ticker}.surface")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    surface.save(output)
+
+    for expiration in surface.expirations:
+        print(f"{expiration['days_to_expiration']}d F: {expiration['f']:.2f} K0: {expiration['k0']:g} variance: {expiration['variance']:.6f} strikes: {expiration['count']}")
+    print(f"Written to {output}")
+
+
+def ticks_controller(args):
+    # python run.py ticks SPY storage/quotes/SPY.jsonl --r=4.87
+    from vix.vix import Vix
+    from vix.timeseries import TimeSeriesStore
+    from vix.options.quotes import read_quote_updates
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+    ticker, path = [arg for arg in args if not arg.startswith('--')]
+
+    vixvol = Vix(td_api_key=os.environ.get("TDAMER_KEY"))
+    store = TimeSeriesStore()
+
+    r = float(options['r']) if 'r' in options else None
+    for result in vixvol.stream_quotes(ticker, read_quote_updates(path), r=r):
+        if (result['error'] is not None):
+            print(f"{result['timestamp']:.3f} {ticker} Error: {result['error']}")
+            continue
+
+        store.append(ticker, result['timestamp'], result['vix'])
+        print(f"{result['timestamp']:.3f} {ticker} VIX: {result['vix']}")
+
+
+def serve_controller(args):
+    # python run.py serve --port=8080 --ttl=300
+    from vix.vix import Vix
+    from vix.service import VixService
+    options = dict(arg[2:].split('=') for arg in args if arg.startswith('--'))
+
+    vixvol = Vix(
+        td_api_key=os.environ.get("TDAMER_KEY"),
+        debug=False,
+        caching_enabled=True,
+        chain_cache_ttl=float(options.get('ttl', 300)),
+    )
+
+    service = VixService(vixvol, host=options.get('host', '127.0.0.1'), port=int(options.get('port', 8080)), log=True)
+    print(f"Serving the VIX on http://{service.host}:{service.port}/vix/{{ticker}}")
+
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        service.shutdown()
+
+
+def load_env():
+    # Loading .env only when the key isn't already in the environment, (python-dotenv takes a while to import).
+    if ("TDAMER_KEY" not in os.environ):
+        from dotenv import load_dotenv
+        load_dotenv()
 
 
 def main():
+    load_env()
     sys.argv.pop(0)
 
     args = [arg.strip() for arg in sys.argv]
@@ -0,0 +1,58 @@
+import datetime
+import math
+
+
+def _black_scholes(side: str, spot: float, strike: float, t: float, r: float, sigma: float) -> float:
+    d1 = (math.log(spot / strike) + (r + sigma ** 2 / 2) * t) / (sigma * math.sqrt(t))
+    d2 = d1 - sigma * math.sqrt(t)
+    n = lambda x: (1 + math.erf(x / math.sqrt(2))) / 2
+
+    if (side == 'call'):
+        return spot * n(d1) - strike * math.exp(-r * t) * n(d2)
+    return strike * math.exp(-r * t) * n(-d2) - spot * n(-d1)
+
+
+def build_td_response(symbol: str = 'SPX', spot: float = 4000.0, days: list = None, strike_step: float = 25.0,
+                      strike_count: int = 80, sigma: float = 0.2, now: datetime.datetime = None) -> dict:
+    """
+    Builds a synthetic response in the shape of the TD Ameritrade /chains endpoint, priced with Black-Scholes so the
+    VIX equation produces sensible values. Deep out of the money strikes get zero bids, like the real thing.
+    """
+    now = now or datetime.datetime.now()
+    days = days or [3, 10, 17, 24, 31, 38, 45, 59, 87]
+    first_strike = spot - strike_step * (strike_count // 2)
+
+    response = {
+        'symbol': symbol,
+        'underlyingPrice': spot,
+        'callExpDateMap': {},
+        'putExpDateMap': {},
+    }
+
+    for dte in days:
+        expiration = (now + datetime.timedelta(days=dte)).replace(hour=15, minute=0, second=0, microsecond=0)
+        expiration_ms = int(expiration.timestamp() * 1000)
+        key = f"{expiration.strftime('%Y-%m-%d')}:{dte}"
+        t = dte / 365
+
+        for side, side_map in [('call', 'callExpDateMap'), ('put', 'putExpDateMap')]:
+            strikes = {}
+            for i in range(strike_count):
+                strike = first_strike + i * strike_step
+                price = _black_scholes(side, spot, strike, t, 0.04, sigma)
+                bid = round(max(price - 0.05, 0.0), 2) if price > 0.1 else 0.0
+                ask = round(price + 0.05, 2)
+
+                strikes[f"{strike:.1f}"] = [{
+                    'putCall': side.upper(),
+                    'bid': bid,
+                    'ask': ask,
+                    'last': round(price, 2),
+                    'strikePrice': strike,
+                    'expirationDate': expiration_ms,
+                    'daysToExpiration': dte,
+                }]
+
+            response[side_map][key] = strikes
+
+    return response
@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from vix.http.async_chains import AsyncChainFetcher
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.providers.td_ameritrade import TDAmeritradeProvider
+from vix.options.binary import read_binary_chain
+from vix.options.options import build_option_chain_time_range
+from tests.helpers import build_td_response
+
+
+class StubChainHandler(BaseHTTPRequestHandler):
+    responses = {}
+    throttled = set()
+    retry_after = '0'
+    requests = []  # Query strings of every request received
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.requests.append(query)
+        symbol = query['symbol'][0]
+
+        # The first request for a throttled symbol is answered with a 429
+        if (symbol in self.throttled):
+            self.throttled.discard(symbol)
+            self.send_response(429)
+            self.send_header('Retry-After', self.retry_after)
+            self.end_headers()
+            return
+
+        if (symbol not in self.responses):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps(self.responses[symbol]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(responses: dict, throttled: set = None, retry_after: str = '0') -> ThreadingHTTPServer:
+    StubChainHandler.responses = responses
+    StubChainHandler.throttled = throttled or set()
+    StubChainHandler.retry_after = retry_after
+    StubChainHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubChainHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_stream_fetches_concurrently_with_retries():
+    server = _serve({'SPY': build_td_response(symbol='SPY'), 'AAPL': build_td_response(symbol='AAPL')}, throttled={'AAPL'})
+
+    fetcher = AsyncChainFetcher(
+        api_key='',
+        cache=False,
+        retries=2,
+        backoff=0,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+    )
+
+    async def collect():
+        return [item async for item in fetcher.stream(['SPY', 'AAPL', 'MISSING'], build_option_chain_time_range())]
+
+    try:
+        results = {ticker: (chain, error) for ticker, chain, error in asyncio.run(collect())}
+    finally:
+        server.shutdown()
+
+    assert results['SPY'][0].symbol == 'SPY'
+    assert results['AAPL'][0].symbol == 'AAPL'
+    assert results['MISSING'][0] is None
+    assert '404' in results['MISSING'][1]
+
+    # Parsed as the body streamed in, every byte of it counted
+    record = next(record for record in fetcher.metrics.export(step='option_chain') if record['ticker'] == 'SPY')
+    assert record['bytes_fetched'] == len(json.dumps(StubChainHandler.responses['SPY']).encode())
+    assert record['expirations'] == len(results['SPY'][0])
+
+
+def test_batches_read_the_binary_cache_of_single_ticker_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = _serve({'SPY': build_td_response(symbol='SPY')})
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    time_range = build_option_chain_time_range()
+
+    try:
+        single = TDAmeritrade('SPY', api_key='', base_url=base_url).get_parsed_option_chain(time_range, min_days=8, max_days=120)
+        fetcher = AsyncChainFetcher(api_key='', base_url=base_url)
+
+        async def collect():
+            return [item async for item in fetcher.stream(['SPY'], time_range, 8, 120)]
+
+        [(_ticker, chain, error)] = asyncio.run(collect())
+    finally:
+        server.shutdown()
+
+    assert (error, len(StubChainHandler.requests)) == (None, 1)
+    assert fetcher.metrics.export(step='option_chain')[0]['source'] == 'binary_cache'
+    assert [term.expiration_timestamp for term in chain] == [term.expiration_timestamp for term in single]
+
+
+def test_batches_request_the_window_and_cache_pruned_chains(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = _serve({'SPY': build_td_response(symbol='SPY', strike_count=240, strike_step=10.0)})
+    time_range = build_option_chain_time_range()
+
+    try:
+        fetcher = AsyncChainFetcher(api_key='', base_url=f"http://127.0.0.1:{server.server_address[1]}")
+
+        async def collect():
+            return [item async for item in fetcher.stream(['SPY'], time_range, 8, 120)]
+
+        [(_ticker, chain, error)] = asyncio.run(collect())
+    finally:
+        server.shutdown()
+
+    assert error is None
+    assert StubChainHandler.requests[0]['fromDate'] == [(time_range[0] + datetime.timedelta(days=7)).strftime('%Y-%m-%d')]
+
+    # Only the pruned chain is cached
+    from_date, to_date = [date.strftime('%Y-%m-%d') for date in time_range]
+    cached = str(tmp_path / f'storage/cache/td/SPY_{from_date}_{to_date}_8-120d_p0.1.bin')
+    assert not (tmp_path / f'storage/cache/td/SPY_{from_date}_{to_date}.json').exists()
+    assert read_binary_chain(cached, min_days=8, max_days=120) is False
+    assert [len(term.call) for term in read_binary_chain(cached, 8, 120, prune_band=0.1)] == [len(term.call) for term in chain]
+    assert len(chain.terms[0].call) < 240
+
+
+def test_throttled_requests_wait_as_long_as_the_server_asks():
+    server = _serve({'SPY': build_td_response(symbol='SPY')}, throttled={'SPY'}, retry_after='1')
+    fetcher = AsyncChainFetcher(api_key='', cache=False, retries=1, backoff=0, base_url=f"http://127.0.0.1:{server.server_address[1]}")
+
+    async def collect():
+        return [item async for item in fetcher.stream(['SPY'], build_option_chain_time_range())]
+
+    try:
+        start = time.monotonic()
+        [(_ticker, chain, error)] = asyncio.run(collect())
+        elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+
+    # backoff=0 would have retried at once
+    assert error is None and chain.symbol == 'SPY'
+    assert len(StubChainHandler.requests) == 2 and elapsed >= 1
+
+
+def test_debug_batches_serve_the_sample_response(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'tests/fixtures').mkdir(parents=True)
+    (tmp_path / 'tests/fixtures/sample_td_spx_response.json').write_text(json.dumps(build_td_response()))
+    provider = TDAmeritradeProvider(api_key='', cache=False, debug=True)
+
+    async def collect():
+        return [item async for item in provider.stream(['SPX', 'SPY'], build_option_chain_time_range(), 8, 120)]
+
+    # Nothing is requested, (a request would fail without an api key)
+    results = {ticker: (chain, error) for ticker, chain, error in asyncio.run(collect())}
+    assert [error for _chain, error in results.values()] == [None, None]
+    assert results['SPY'][0].symbol == 'SPX' and len(results['SPY'][0]) == len(results['SPX'][0])
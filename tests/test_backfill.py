@@ -0,0 +1,58 @@
+import datetime
+import numpy as np
+from vix.vix import Vix
+from vix.backfill import Backfill, read_backfill
+from vix.options.chain import OptionChain
+from vix.providers.snapshots import SnapshotProvider
+from tests.helpers import build_td_response
+
+
+def test_backfill_calculates_each_snapshot_as_of_its_time(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    provider = SnapshotProvider('snapshots')
+    first = datetime.datetime(2023, 3, 1, 10, 30)
+    expected = {}
+
+    for day in range(3):
+        taken = first + datetime.timedelta(days=day)
+        for ticker, spot in [('SPY', 4000.0), ('QQQ', 3000.0 + day * 10)]:
+            chain = OptionChain.from_td_response(build_td_response(symbol=ticker, spot=spot, now=taken))
+            provider.save(ticker, chain, taken.timestamp())
+            expected[(ticker, taken.timestamp())] = chain
+
+    provider.save('THIN', OptionChain.from_td_response(build_td_response(symbol='THIN', days=[3, 10], now=first)), first.timestamp())
+
+    vixvol = Vix(td_api_key='', debug=True, provider=provider)
+    columns = Backfill(vixvol, max_workers=1).run(output='backfill/vix.npz')
+
+    assert list(columns['ticker']) == ['QQQ'] * 3 + ['SPY'] * 3 + ['THIN']
+    assert np.all(np.diff(columns['timestamp'][:3]) > 0)
+    for ticker, timestamp, vix in zip(columns['ticker'][:6], columns['timestamp'][:6], columns['vix'][:6]):
+        assert vix == vixvol.calculate_chain(expected[(ticker, timestamp)], 4.87, as_of=timestamp)
+
+    assert np.isnan(columns['vix'][-1]) and 'not have enough option contracts' in columns['error'][-1]
+
+    written = read_backfill('backfill/vix.npz')
+    assert np.array_equal(written['vix'], columns['vix'], equal_nan=True)
+
+    parallel = Backfill(vixvol, max_workers=2, chunk_size=2).run(start=first.timestamp() + 1)
+    assert list(parallel['ticker']) == ['QQQ', 'QQQ', 'SPY', 'SPY']
+    assert np.array_equal(parallel['vix'], columns['vix'][[1, 2, 4, 5]])
+
+
+def test_fred_looks_up_historical_rates(tmp_path):
+    from vix.cache.disk import DiskCache
+    from vix.http.fred import Fred
+
+    disk_cache = DiskCache(str(tmp_path))
+    history = 'observation_date,DTB3\n2023-02-28,4.65\n2023-03-01,4.69\n2023-03-02,.\n2023-03-03,4.72\n'
+    disk_cache.write_bytes(f"rates_history_{datetime.date.today().strftime('%Y-%m-%d')}.csv", history.encode('utf-8'))
+
+    def rate_on(day):
+        fred = Fred(disk_cache=disk_cache, as_of=datetime.datetime(2023, 3, day, 12).timestamp())
+        return fred.scrape_3m_treasury(), fred.source
+
+    assert rate_on(1) == (4.69, 'history')
+    assert rate_on(2) == (4.69, 'history')  # No observation that day
+    assert rate_on(5) == (4.72, 'history')
+    assert rate_on(1) == (4.69, 'disk_cache')
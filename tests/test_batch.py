@@ -0,0 +1,121 @@
+import os
+import time
+from vix.vix import Vix
+from vix.options.expirations import Expirations
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.options.chain import OptionChain
+from vix.providers.snapshots import SnapshotProvider
+from tests.helpers import build_td_response
+
+
+def test_calculate_many_reports_errors_per_ticker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responses = {
+        'SPY': build_td_response(symbol='SPY', spot=400.0, strike_step=5.0),
+        'AAPL': build_td_response(symbol='AAPL', spot=150.0, strike_step=2.5, sigma=0.3),
+        'THIN': build_td_response(symbol='THIN', days=[3, 10]),  # Not enough expirations
+    }
+    monkeypatch.setattr(
+        TDAmeritrade,
+        'get_parsed_option_chain',
+        lambda td, time_range, **kwargs: OptionChain.from_td_response(responses[td.ticker], **kwargs)
+    )
+
+    vixvol = Vix(td_api_key='', debug=True)
+    batch = vixvol.calculate_many(['SPY', 'AAPL', 'THIN'], max_workers=1)
+
+    assert set(batch['results']) == {'SPY', 'AAPL'}
+    assert batch['results']['SPY'] == vixvol.calculate('SPY')
+    assert 'not have enough option contracts' in batch['errors']['THIN']
+
+
+def test_calculate_batch_matches_calculate_many(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responses = {
+        'SPY': build_td_response(symbol='SPY', spot=400.0, strike_step=5.0),
+        'AAPL': build_td_response(symbol='AAPL', spot=150.0, strike_step=2.5, sigma=0.3),
+        'THIN': build_td_response(symbol='THIN', days=[3, 10]),
+    }
+    monkeypatch.setattr(
+        TDAmeritrade,
+        'get_parsed_option_chain',
+        lambda td, time_range, **kwargs: OptionChain.from_td_response(responses[td.ticker], **kwargs)
+    )
+
+    vixvol = Vix(td_api_key='', debug=True)
+    batch = vixvol.calculate_batch(['SPY', 'AAPL', 'THIN'], r=4.87)
+
+    assert batch['results'] == {ticker: vixvol.calculate(ticker, r=4.87) for ticker in ['SPY', 'AAPL']}
+    assert 'not have enough option contracts' in batch['errors']['THIN']
+    assert vixvol.metrics.export(step='batch')[0]['tickers'] == 2
+
+
+def test_repeated_calculations_are_served_from_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetches = []
+
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        fetches.append(td.ticker)
+        return OptionChain.from_td_response(build_td_response(symbol=td.ticker), **kwargs)
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+
+    vixvol = Vix(td_api_key='', debug=True)
+    first = vixvol.calculate('SPY')
+    assert vixvol.calculate('SPY') == first
+    assert fetches == ['SPY']
+    assert vixvol.cache_stats()['chains_memory']['hits'] == 1
+
+    # A chain which was cached on disk near the end of its ttl isn't kept in memory for another whole ttl
+    def get_stale_option_chain(td, time_range, **kwargs):
+        fetches.append(td.ticker)
+        chain = OptionChain.from_td_response(build_td_response(symbol=td.ticker), **kwargs)
+        chain.snapshot_time = time.time() - 299.9
+        return chain
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_stale_option_chain)
+    stale = Vix(td_api_key='', debug=True, caching_enabled=True, chain_cache_ttl=300)
+    stale.calculate('AAPL', r=4.87)
+    time.sleep(0.2)
+    stale.calculate('AAPL', r=4.87)
+    assert fetches == ['SPY', 'AAPL', 'AAPL']
+
+
+def test_selected_strips_are_memoized_per_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetches = []
+
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        fetches.append(td.ticker)
+        chain = OptionChain.from_td_response(build_td_response(symbol=td.ticker), **kwargs)
+        chain.snapshot_time = time.time()
+        return chain
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+    monkeypatch.setattr(Expirations, 'find_option_terms', _count_calls(Expirations.find_option_terms))
+
+    first = Vix(td_api_key='', debug=True).calculate('SPY')
+
+    # A new Vix has empty memory caches, the strips are read back from disk.
+    vixvol = Vix(td_api_key='', debug=True)
+    assert vixvol.calculate('SPY') == first
+    assert vixvol.calculate('SPY') == first
+    assert fetches == ['SPY']
+    assert Expirations.find_option_terms.calls == 1
+    assert vixvol.cache_stats()['strips']['hits'] == 1
+
+    # Strips of another provider, (or pruned with another band), are never served
+    snapshots = SnapshotProvider(str(tmp_path / 'snapshots'))
+    snapshots.save('SPY', OptionChain.from_td_response(build_td_response(symbol='SPY', spot=4100.0)), time.time())
+    assert Vix(td_api_key='', provider=snapshots).calculate('SPY') != first
+    assert Vix(td_api_key='', debug=True, prune_band=None).calculate('SPY') == first
+    assert Expirations.find_option_terms.calls == 3
+    assert len([name for name in os.listdir(vixvol.strip_cache.disk_cache.directory) if name.startswith('SPY_')]) == 3
+
+
+def _count_calls(function):
+    def counted(*args, **kwargs):
+        counted.calls += 1
+        return function(*args, **kwargs)
+    counted.calls = 0
+    return counted
@@ -0,0 +1,38 @@
+from benchmarks.pipeline import build_scaled_response, benchmark_chain, compare
+from vix.vectorized_volatility import VectorizedVolatility
+
+
+def test_benchmark_chain_reports_every_step(tmp_path):
+    records = benchmark_chain('base', build_scaled_response(), VectorizedVolatility(), 2, str(tmp_path))
+
+    steps = [record['step'] for record in records]
+    assert steps[0] == 'parse (json)'
+    assert steps[-2:] == ['pipeline (json)', 'pipeline (binary cache)']
+    assert all(record['p50_ms'] > 0 and record['peak_kib'] >= 0 for record in records)
+
+
+def test_scaled_response_dimensions():
+    response = build_scaled_response(strike_scale=10, expiration_scale=10)
+
+    assert len(response['callExpDateMap']) == 90
+    assert all(len(strikes) == 800 for strikes in response['callExpDateMap'].values())
+
+
+def test_compare_flags_slower_steps():
+    baseline = [{'chain': 'base', 'step': 'volatility', 'p50_ms': 1.0}, {'chain': 'base', 'step': 'equation', 'p50_ms': 1.0}]
+    records = [{'chain': 'base', 'step': 'volatility', 'p50_ms': 1.5}, {'chain': 'base', 'step': 'equation', 'p50_ms': 1.1}]
+
+    regressions = compare(records, baseline, tolerance=0.25)
+    assert [record['step'] for record in regressions] == ['volatility']
+
+
+def test_cached_run_does_not_import_network_modules(tmp_path):
+    from benchmarks.startup import SCENARIOS, fill_caches, loaded_modules
+
+    fill_caches(str(tmp_path))
+    loaded = loaded_modules(SCENARIOS['run.py vix SPY (cached)'], str(tmp_path))
+
+    assert 'numpy' in loaded
+    # sqlite3 is only imported once results are stored, which a run only does with --results
+    assert not {'requests', 'bs4', 'ijson', 'asyncio', 'sqlite3'} & set(loaded)
+    assert 'sqlite3' not in loaded_modules(SCENARIOS['import vix.vix'], str(tmp_path))
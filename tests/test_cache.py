@@ -0,0 +1,173 @@
+import os
+import time
+import json
+import datetime
+import numpy as np
+from vix.options.chain import OptionChain
+from vix.options.binary import write_binary_chain, read_binary_chain
+from vix.options.options import build_option_chain_time_range
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.cache.disk import DiskCache
+from vix.cache.memory import MemoryCache
+from vix.vix import Vix
+from tests.helpers import build_td_response
+
+
+def test_binary_chain_round_trip(tmp_path):
+    chain = OptionChain.from_td_response(build_td_response())
+    path = str(tmp_path / 'chain.bin')
+    write_binary_chain(chain, path, min_days=8, max_days=120)
+
+    loaded = read_binary_chain(path, min_days=8, max_days=120)
+    assert loaded.symbol == chain.symbol
+    assert [term.days_to_expiration for term in loaded] == [term.days_to_expiration for term in chain if 8 <= term.days_to_expiration <= 120]
+    assert isinstance(loaded.terms[0].call.strikes, np.memmap)
+    assert np.array_equal(loaded.terms[0].call.mid, chain.terms[1].call.mid)
+
+    # A cache written for a narrower window can't answer a wider request
+    assert read_binary_chain(path) is False
+
+
+def test_json_cache_is_converted_to_binary(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    time_range = build_option_chain_time_range()
+    from_date, to_date = [date.strftime('%Y-%m-%d') for date in time_range]
+    (tmp_path / 'storage/cache/td').mkdir(parents=True)
+    (tmp_path / f'storage/cache/td/SPY_{from_date}_{to_date}.json').write_text(json.dumps(build_td_response(symbol='SPY')))
+
+    td = TDAmeritrade('SPY', api_key='', base_url='http://127.0.0.1:9')  # Nothing listens there
+    chain = td.get_parsed_option_chain(time_range, min_days=8, max_days=120)
+
+    assert chain.symbol == 'SPY'
+    assert (tmp_path / f'storage/cache/td/SPY_{from_date}_{to_date}_8-120d_p0.1.bin').exists()
+    assert len(td.get_parsed_option_chain(time_range, min_days=8, max_days=120)) == len(chain)
+
+
+class _ChainSession:
+    # Answers every request with the same chain response, and remembers the urls
+    status_code = 200
+    headers = {}
+
+    def __init__(self, response: dict):
+        self.body = json.dumps(response).encode('utf-8')
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        return (self.body[i:i + chunk_size] for i in range(0, len(self.body), chunk_size))
+
+
+def test_fetched_chains_are_pruned_before_caching(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    time_range = build_option_chain_time_range()
+    response = build_td_response(symbol='SPY', strike_count=240, strike_step=10.0)
+    session = _ChainSession(response)
+
+    td = TDAmeritrade('SPY', api_key='', session=session)
+    chain = td.get_parsed_option_chain(time_range, min_days=8, max_days=120)
+
+    # Only the expirations in the window were requested
+    from_date = (time_range[0] + datetime.timedelta(days=7)).strftime('%Y-%m-%d')
+    assert f'fromDate={from_date}' in session.urls[0]
+
+    full = OptionChain.from_td_response(response, min_days=8, max_days=120)
+    assert sum(len(term.call) + len(term.put) for term in chain) < sum(len(term.call) + len(term.put) for term in full)
+    assert Vix(td_api_key='', caching_enabled=False).calculate_chain(chain, 4.5) == Vix(td_api_key='', caching_enabled=False).calculate_chain(full, 4.5)
+
+    # The cache holds the pruned chain, which can't answer for every strike
+    from_date, to_date = [date.strftime('%Y-%m-%d') for date in time_range]
+    cached = str(tmp_path / f'storage/cache/td/SPY_{from_date}_{to_date}_8-120d_p0.1.bin')
+    assert [len(term.call) for term in read_binary_chain(cached, min_days=8, max_days=120, prune_band=0.05)] == [len(term.call) for term in chain]
+    assert read_binary_chain(cached, min_days=8, max_days=120) is False
+
+
+def test_each_window_keeps_its_own_binary_cache(tmp_path, monkeypatch):
+    # ex: the VIX and a term structure, computed one after the other on the same ticker
+    monkeypatch.chdir(tmp_path)
+    time_range = build_option_chain_time_range()
+    session = _ChainSession(build_td_response(symbol='SPY'))
+
+    for _ in range(2):
+        for min_days, max_days in [(8, 120), (1, 210)]:
+            td = TDAmeritrade('SPY', api_key='', session=session)
+            td.get_parsed_option_chain(time_range, min_days=min_days, max_days=max_days)
+
+    assert len(session.urls) == 2 and td.source == 'binary_cache'
+
+
+def test_disk_cache_ttl_eviction_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60, max_bytes=250)
+    cache.write_bytes('a', b'x' * 100)
+    cache.write_bytes('b', b'x' * 100)
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+
+    cache.write_bytes('c', b'x' * 100)
+    assert cache.stats['evictions'] == 1
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+    # Expired files are misses, and are deleted
+    os.utime(cache.path('a'), (time.time(), time.time() - 120))
+    assert cache.get('a') is None
+    assert not os.path.exists(cache.path('a'))
+    assert cache.stats['expired'] == 1
+
+
+def test_disk_cache_discards_failed_writes(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    try:
+        with cache.writing('chain.json') as path:
+            with open(path, 'w') as f:
+                f.write('{"half": ')
+            raise IOError('connection reset')
+    except IOError:
+        pass
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_disk_cache_skips_files_evicted_by_other_workers(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    cache.write_bytes('a', b'x' * 100)
+    cache.write_bytes('b', b'x' * 100)
+    scandir = os.scandir
+
+    def listed_then_evicted(directory):
+        # Another worker deletes 'a' right after this one listed the directory
+        entries = list(scandir(directory))
+        if os.path.exists(cache.path('a')):
+            os.remove(cache.path('a'))
+        return iter(entries)
+
+    monkeypatch.setattr(os, 'scandir', listed_then_evicted)
+    cache.write_bytes('c', b'x' * 100)
+    assert cache.size() == 200
+    assert cache.get('c') is not None
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set('SPY', 1)
+    cache.set('AAPL', 2)
+    assert cache.get('SPY') == 1
+    cache.set('MSFT', 3)
+
+    assert 'AAPL' not in cache  # Least recently used
+    assert cache.get_or_set('MSFT', lambda: 0) == 3
+    assert cache.stats['evictions'] == 1
+
+    expiring = MemoryCache(ttl=0)
+    expiring.set('SPY', 1)
+    time.sleep(0.001)
+    assert expiring.get('SPY') is None
+
+    # Freshness is measured from when the value was made, not from when it was cached
+    cache.set('SPY', 1, created=time.time() - 61)
+    cache.set('AAPL', 2, created=time.time() - 30)
+    assert cache.get('SPY') is None and cache.get('AAPL') == 2
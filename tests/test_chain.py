@@ -0,0 +1,98 @@
+import json
+import pickle
+import pytest
+import numpy as np
+from vix.options.chain import OptionChain, OptionTerm, OptionSide
+from vix.options.stream import parse_option_chain_file
+from vix.options.binary import write_binary_chain, read_binary_chain
+from vix.options.expirations import Expirations
+from vix.options.options import determine_forward_level_strike
+from tests.helpers import build_td_response
+
+
+def test_chain_is_columnar_and_sorted():
+    response = build_td_response(days=[10, 31])
+    chain = OptionChain.from_td_response(response)
+
+    assert len(chain) == 2
+    term = chain.terms[0]
+    assert term.days_to_expiration == 10
+    assert list(term.call.strikes) == sorted(term.call.strikes)
+    assert len(term.call) == len(term.put) == 80
+
+    row = response['callExpDateMap'][next(iter(response['callExpDateMap']))]['4000.0'][0]
+    i = list(term.call.strikes).index(4000.0)
+    assert term.call.bid[i] == row['bid']
+    assert term.call.mid[i] == (row['bid'] + row['ask']) / 2
+
+
+def test_near_next_terms_and_forward_level():
+    chain = OptionChain.from_td_response(build_td_response())
+    selected_chain = Expirations().find_option_terms(chain)
+
+    assert selected_chain['nearTerm'].days_to_expiration == 24
+    assert selected_chain['nextTerm'].days_to_expiration == 31
+
+    forward_level = determine_forward_level_strike(selected_chain)
+    assert forward_level['nearTerm']['strikePrice'] == 4000.0
+
+
+def test_near_next_terms_on_daily_expirations(tmp_path):
+    chain = OptionChain.from_td_response(build_td_response(days=list(range(1, 100)), strike_count=10))
+    path = str(tmp_path / 'chain.bin')
+    write_binary_chain(chain, path)
+
+    # Only the selected expirations are ever materialized, and a lazily loaded chain still goes to other processes.
+    loaded = pickle.loads(pickle.dumps(read_binary_chain(path)))
+    for selected_chain in [Expirations().find_option_terms(chain), Expirations().find_option_terms(loaded)]:
+        assert selected_chain['nearTerm'].days_to_expiration == 23
+        assert selected_chain['nextTerm'].days_to_expiration == 30
+    assert np.array_equal(loaded.terms[30].put.mid, chain.terms[30].put.mid)
+
+    with pytest.raises(Exception, match='not have enough option contracts'):
+        Expirations().find_option_terms(OptionChain.from_td_response(build_td_response(days=[3, 10, 24, 28])))
+
+
+def test_forward_level_ties_go_to_the_highest_strike():
+    def term(strikes, call_last, put_last):
+        n = len(strikes)
+        return OptionTerm('2023-03-09', 0, 30, OptionSide(strikes, [1.0] * n, [1.0] * n, call_last), OptionSide(strikes, [1.0] * n, [1.0] * n, put_last))
+
+    selected_chain = {
+        # 100 and 110 are both 0.5 apart, 105 has no last put price.
+        'nearTerm': term([95.0, 100.0, 105.0, 110.0, 115.0], [8.0, 5.0, 3.0, 2.0, 1.0], [2.0, 4.5, 0.0, 2.5, 4.0]),
+        'nextTerm': term([100.0, 110.0], [6.0, 3.0], [3.0, 6.0]),
+    }
+
+    forward_level = determine_forward_level_strike(selected_chain)
+    assert forward_level['nearTerm'] == {'strikePrice': 110.0, 'call': 2.0, 'put': 2.5}
+    assert forward_level['nextTerm']['strikePrice'] == 110.0
+
+
+def test_stream_parser_matches_full_parse(tmp_path):
+    response = build_td_response()
+    path = tmp_path / 'chain.json'
+    path.write_text(json.dumps(response))
+
+    streamed = parse_option_chain_file(str(path), min_days=8, max_days=120)
+    parsed = OptionChain.from_td_response(response, min_days=8, max_days=120)
+
+    assert streamed.symbol == 'SPX' and streamed.underlying_price == 4000.0
+    assert [term.expiration_timestamp for term in streamed] == [term.expiration_timestamp for term in parsed]
+    for a, b in zip(streamed, parsed):
+        assert np.array_equal(a.call.mid, b.call.mid)
+        assert np.array_equal(a.put.last, b.put.last)
+
+    # Nested fields and non-standard contracts are skipped, whatever order the response comes in
+    for side_map in ['putExpDateMap', 'callExpDateMap']:
+        for strikes in response[side_map].values():
+            for strike, contracts in strikes.items():
+                contracts[0]['optionDeliverablesList'] = [{'symbol': 'SPX', 'deliverableUnits': 100.0}]
+                contracts.append({**contracts[0], 'bid': -1.0, 'ask': -1.0})
+    response = {'putExpDateMap': response['putExpDateMap'], 'status': {'code': 'SUCCESS'}, **response}
+    path.write_text(json.dumps(response))
+
+    streamed = parse_option_chain_file(str(path), min_days=8, max_days=120)
+    assert streamed.symbol == 'SPX' and len(streamed) == len(parsed)
+    for a, b in zip(streamed, parsed):
+        assert np.array_equal(a.call.mid, b.call.mid) and np.array_equal(a.put.mid, b.put.mid)
@@ -0,0 +1,98 @@
+import time
+import random
+import pytest
+from vix.vix import Vix
+from vix.math import calculate_t, calculate_f
+from vix.incremental_volatility import IncrementalVolatility
+from vix.vectorized_volatility import VectorizedVolatility
+from vix.options.chain import OptionChain
+from vix.options.options import determine_forward_level_strike
+from vix.options.expirations import Expirations
+from vix.options.quotes import read_quote_updates, write_quote_updates
+from vix.http.td_ameritrade import TDAmeritrade
+from tests.helpers import build_td_response
+
+
+def _random_updates(rng: random.Random, response: dict, selected_chain: dict, count: int) -> list:
+    # Price moves, bids dropping to zero and coming back, and last prices which move the forward level strike
+    updates = []
+    for _ in range(count):
+        options = selected_chain[rng.choice(['nearTerm', 'nextTerm'])]
+        side = rng.choice(['call', 'put'])
+        key = next(key for key in response[f"{side}ExpDateMap"] if key.startswith(options.expiration_date))
+        strike = rng.choice(list(response[f"{side}ExpDateMap"][key]))
+        row = response[f"{side}ExpDateMap"][key][strike][0]
+
+        update = {'expiration': options.expiration_date, 'side': side, 'strike': float(strike)}
+        kind = rng.random()
+        if (kind < 0.15):
+            update['bid'] = 0.0
+        elif (kind < 0.8):
+            update['bid'] = round(max(row['ask'] * rng.uniform(0.6, 1.1) - 0.05, 0.05), 2)
+            update['ask'] = round(update['bid'] + rng.uniform(0.05, 1), 2)
+        else:
+            update['last'] = round(row['last'] * rng.uniform(0.8, 1.2), 2)
+
+        row.update({field: update[field] for field in ['bid', 'ask', 'last'] if field in update})
+        updates.append(update)
+
+    return updates
+
+
+def test_incremental_engine_matches_the_updated_chain():
+    rng = random.Random(7)
+    response = build_td_response()
+    selected_chain = Expirations().find_option_terms(OptionChain.from_td_response(response))
+    engine = IncrementalVolatility(selected_chain, {'nearTerm': 4.5, 'nextTerm': 4.8})
+    as_of = time.time()
+
+    for _ in range(60):
+        applied = engine.apply(_random_updates(rng, response, selected_chain, rng.randint(1, 4)))
+        assert applied >= 1
+
+        # The same tick, from scratch
+        fresh_chain = Expirations().find_option_terms(OptionChain.from_td_response(response))
+        t, _tminutes = calculate_t(fresh_chain, as_of)
+        f = calculate_f(t, engine.r, determine_forward_level_strike(fresh_chain))
+        expected = VectorizedVolatility().calculate(f, t, engine.r, fresh_chain)
+
+        assert engine.forward_level() == determine_forward_level_strike(fresh_chain)
+        vol, _t, _tminutes = engine.variances(as_of)
+        assert vol == pytest.approx(expected, rel=1e-12)
+
+    # Most ticks only moved weights, and the chain the engine started from is untouched
+    assert engine.stats['weights_updated'] > engine.stats['strips_built']
+    assert engine.apply([{'expiration': '1999-01-01', 'side': 'call', 'strike': 4000.0, 'bid': 1.0}]) == 0
+    assert engine.stats['ignored'] == 1
+    assert selected_chain['nearTerm'].call.bid.tolist() != engine.selected_chain['nearTerm'].call.bid.tolist()
+
+
+def test_stream_quotes_from_a_replay_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    response = build_td_response(symbol='SPY')
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', lambda td, time_range, **kwargs: OptionChain.from_td_response(response, **kwargs))
+
+    vixvol = Vix(td_api_key='', caching_enabled=False)
+    selected_chain = vixvol.get_selected_chain('SPY')
+    near = selected_chain['nearTerm']
+    now = time.time()
+
+    path = str(tmp_path / 'SPY.jsonl')
+    write_quote_updates(path, [
+        {'timestamp': now, 'expiration': near.expiration_date, 'side': 'put', 'strike': 3900.0, 'bid': 20.0, 'ask': 21.0},
+        {'timestamp': now, 'expiration': near.expiration_date, 'side': 'CALL', 'strike': 4100.0, 'ask': 30.0},
+        {'timestamp': now + 1, 'expiration': near.expiration_date, 'side': 'put', 'strike': 3900.0, 'bid': 20.5},
+    ])
+    ticks = list(read_quote_updates(path))
+    assert [(timestamp, len(updates)) for timestamp, updates in ticks] == [(now, 2), (now + 1, 1)]
+
+    results = list(vixvol.stream_quotes('SPY', ticks, r=4.5))
+    assert [result['error'] for result in results] == [None, None]
+    assert results[0]['vix'] != vixvol.calculate('SPY', r=4.5)
+
+    # The replayed quotes, applied to the chain itself
+    key = lambda side_map: next(key for key in response[side_map] if key.startswith(near.expiration_date))
+    response['putExpDateMap'][key('putExpDateMap')]['3900.0'][0].update({'bid': 20.5, 'ask': 21.0})
+    response['callExpDateMap'][key('callExpDateMap')]['4100.0'][0]['ask'] = 30.0
+    assert results[1]['vix'] == pytest.approx(vixvol.calculate_chain(OptionChain.from_td_response(response), 4.5, as_of=now + 1), abs=0.001)
+    assert vixvol.metrics.export('stream_quotes')[0]['updates'] == 3
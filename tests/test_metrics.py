@@ -0,0 +1,74 @@
+import pickle
+from vix.vix import Vix
+from vix.metrics import Metrics
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.options.chain import OptionChain
+from tests.helpers import build_td_response
+
+
+def _serve_synthetic_chains(monkeypatch):
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        td.source = 'network'
+        td.bytes_fetched = 1024
+        return OptionChain.from_td_response(build_td_response(symbol=td.ticker), **kwargs)
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+
+
+def test_calculate_records_each_step(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _serve_synthetic_chains(monkeypatch)
+    hooked = []
+
+    vixvol = Vix(td_api_key='', debug=True, metrics=Metrics(hooks=[hooked.append]))
+    vix = vixvol.calculate('SPY')
+
+    steps = [record['step'] for record in vixvol.metrics.export(ticker='SPY')]
+    assert steps == ['strip_cache', 'option_chain', 'find_option_terms', 'calculate_t', 'forward_level', 'volatility', 'equation', 'calculate']
+    assert len(hooked) == len(vixvol.metrics.records)
+
+    chain = vixvol.metrics.export(step='option_chain')[0]
+    assert (chain['source'], chain['cache'], chain['bytes_fetched']) == ('network', 'miss', 1024)
+    assert vixvol.metrics.export(step='risk_free_rate')[0]['source'] == 'sample'
+    assert vixvol.metrics.export(step='calculate')[0]['vix'] == vix
+
+    for term, counts in vixvol.metrics.export(step='volatility')[0]['terms'].items():
+        assert 0 < counts['strikes_retained'] <= counts['strikes_considered'] + 1  # K0 is in the strip as a put and a call
+
+    vixvol.calculate('SPY')
+    assert vixvol.metrics.export(step='option_chain')[-1]['source'] == 'memory'
+    assert vixvol.metrics.export(step='option_chain')[-1]['cache'] == 'hit'
+
+
+def test_failed_steps_are_recorded_with_their_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        TDAmeritrade,
+        'get_parsed_option_chain',
+        lambda td, time_range, **kwargs: OptionChain.from_td_response(build_td_response(days=[3, 10]), **kwargs)
+    )
+    vixvol = Vix(td_api_key='', debug=True, metrics=Metrics(hooks=[lambda record: 1 / 0]))  # A broken hook doesn't stop anything
+
+    batch = vixvol.calculate_many(['THIN'], max_workers=1)
+
+    assert 'THIN' in batch['errors']
+    assert 'not have enough option contracts' in vixvol.metrics.export(step='find_option_terms')[0]['error']
+
+
+def test_worker_records_are_sent_back_to_the_parent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _serve_synthetic_chains(monkeypatch)
+    hooked = []
+
+    vixvol = Vix(td_api_key='', debug=True, metrics=Metrics(hooks=[hooked.append]))
+    assert pickle.loads(pickle.dumps(vixvol.metrics)).hooks == []
+
+    # Workers build their own Vix, only tickers and rates are sent with the tasks
+    def not_sent(vix):
+        raise AssertionError('A Vix was sent to a worker process.')
+
+    monkeypatch.setattr(Vix, '__getstate__', not_sent, raising=False)
+    batch = vixvol.calculate_many(['SPY', 'AAPL', 'QQQ', 'IWM'], max_workers=2)
+
+    assert set(batch['results']) == {'SPY', 'AAPL', 'QQQ', 'IWM'}
+    assert sorted(record['ticker'] for record in hooked if record['step'] == 'calculate') == ['AAPL', 'IWM', 'QQQ', 'SPY']
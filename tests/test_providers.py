@@ -0,0 +1,68 @@
+import time
+import asyncio
+import pytest
+from vix.vix import Vix
+from vix.options.chain import OptionChain
+from vix.providers.provider import ChainProvider
+from vix.providers.snapshots import SnapshotProvider
+from tests.helpers import build_td_response
+
+
+def _record(directory, now):
+    provider = SnapshotProvider(directory)
+    responses = {ticker: build_td_response(symbol=ticker, spot=spot) for ticker, spot in [('SPY', 4000.0), ('AAPL', 3000.0)]}
+
+    provider.save('SPY', responses['SPY'], now - 120)
+    provider.save('AAPL', OptionChain.from_td_response(responses['AAPL']), now - 60)
+    provider.save('SPY', OptionChain.from_td_response(responses['SPY']), now)
+    return provider, responses
+
+
+def test_snapshots_are_returned_latest_first_and_replayed_in_order(tmp_path):
+    now = float(int(time.time()))
+    provider, responses = _record(str(tmp_path), now)
+
+    record = {}
+    chain = provider.get_option_chain('SPY', None, record=record)
+    assert (chain.snapshot_time, record['source']) == (now, 'snapshot')
+    assert len(chain) == len(responses['SPY']['callExpDateMap'])
+
+    provider.as_of = now - 1
+    assert provider.get_option_chain('SPY', None).snapshot_time == now - 120
+    provider.as_of = now - 1000
+    with pytest.raises(Exception):
+        provider.get_option_chain('SPY', None)
+
+    replayed = [(snapshot_time, ticker) for snapshot_time, ticker, _chain in SnapshotProvider(str(tmp_path)).replay()]
+    assert replayed == [(now - 120, 'SPY'), (now - 60, 'AAPL'), (now, 'SPY')]
+
+
+def test_vix_runs_on_recorded_snapshots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = float(int(time.time()))
+    provider, responses = _record('snapshots', now)
+
+    vixvol = Vix(td_api_key='', debug=True, provider=provider)
+    expected = vixvol.calculate_chain(OptionChain.from_td_response(responses['SPY']), 4.87)
+
+    assert vixvol.calculate('SPY', r=4.87) == expected
+    assert vixvol.metrics.export(step='option_chain')[0]['source'] == 'snapshot'
+
+    batch = asyncio.run(vixvol.calculate_many_async(['SPY', 'AAPL', 'MISSING'], max_workers=2))
+    assert batch['results']['SPY'] == expected
+    assert 'No snapshot of MISSING' in batch['errors']['MISSING']
+
+    # T is measured from each snapshot's time
+    results = list(vixvol.replay(['SPY'], r=4.87))
+    chain = OptionChain.from_td_response(responses['SPY'])
+    assert [result['vix'] for result in results] == [vixvol.calculate_chain(chain, 4.87, as_of=as_of) for as_of in [now - 120, now]]
+    assert vixvol.calculate('SPY', r=4.87, as_of=now - 60) == vixvol.calculate_chain(chain, 4.87, as_of=now - 60)
+    assert vixvol.metrics.export(step='option_chain')[-1]['snapshot_time'] == now - 120
+
+
+def test_incomplete_providers_fail_when_constructed():
+    class NoChains(ChainProvider):
+        pass
+
+    with pytest.raises(TypeError, match='get_option_chain'):
+        NoChains()
@@ -0,0 +1,74 @@
+import os
+import json
+import datetime
+import pytest
+from vix.vix import Vix
+from vix.rates import YieldCurve, maturity_days
+from vix.options.chain import OptionChain
+from vix.options.expirations import Expirations
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.http.fred import Fred
+from tests.helpers import build_td_response
+
+TREASURY_CSV = '''Date,1 Mo,2 Mo,3 Mo,6 Mo,1 Yr,Notes
+01/04/2023,4.12,,4.51,4.77,4.73,
+01/03/2023,4.17,4.42,4.53,4.77,4.71,
+'''
+
+
+def test_yield_curve_interpolates_between_maturities(tmp_path):
+    path = tmp_path / 'curve.csv'
+    path.write_text(TREASURY_CSV)
+    curve = YieldCurve.load(str(path))
+
+    assert len(curve) == 2 and maturity_days('13 Wk') == 91 and maturity_days('DTB6') == 182
+    assert curve.rate(365 / 12, datetime.date(2023, 1, 3)) == pytest.approx(4.17)
+
+    # The missing 2 Mo rate of the 4th is interpolated between 1 Mo and 3 Mo
+    assert curve.rate(365 / 6, datetime.date(2023, 1, 4)) == pytest.approx((4.12 + 4.51) / 2)
+
+    # Flat past the ends of the curve, and the last curve is used over the weekend
+    assert curve.rate(2, datetime.date(2023, 1, 7)) == pytest.approx(4.12)
+    assert curve.rate(1000, datetime.date(2023, 1, 7)) == pytest.approx(4.73)
+
+    # Before the first day, or once the file is stale, the curve doesn't cover the day
+    assert curve.rate(30, datetime.date(2023, 1, 2)) is None
+    assert not curve.covers(datetime.date(2023, 2, 1))
+
+
+def test_yield_curve_from_json(tmp_path):
+    path = tmp_path / 'curve.json'
+    path.write_text(json.dumps({'2023-01-03': {'4 Wk': 4.0, '26 Wk': 5.0}}))
+    curve = YieldCurve.load(str(path))
+
+    assert curve.rate(105, datetime.date(2023, 1, 3)) == pytest.approx(4.5)
+
+
+def test_terms_get_their_own_rate_without_scraping(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Fred, 'send_request', lambda fred, url: pytest.fail('FRED should not be scraped'))
+    monkeypatch.setattr(
+        TDAmeritrade,
+        'get_parsed_option_chain',
+        lambda td, time_range, **kwargs: OptionChain.from_td_response(build_td_response(symbol=td.ticker), **kwargs)
+    )
+
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    os.makedirs('storage/rates')
+    with open('storage/rates/yield_curve.csv', 'w') as f:
+        f.write(f"Date,1 Mo,2 Mo,3 Mo\n{today},4.0,5.0,6.0\n")
+
+    vixvol = Vix(td_api_key='')
+    chain = OptionChain.from_td_response(build_td_response())
+    selected_chain = Expirations().find_option_terms(chain)
+
+    rates = vixvol.get_term_rates(selected_chain)
+    assert rates['nearTerm'] == 4.0  # 24 days, before the first maturity
+    assert rates['nextTerm'] == pytest.approx(4.0 + (31 - 365 / 12) / (365 / 12))  # 31 days
+    assert vixvol.get_risk_free_rate() == pytest.approx(6.0, abs=0.01)
+    assert vixvol.get_shared_rate() is None
+
+    vix = vixvol.calculate('SPX')
+    assert vix == vixvol.calculate_chain(chain, rates, 'SPX')
+    assert vix != vixvol.calculate_chain(chain, 4.87, 'SPX')
+    assert vixvol.calculate_batch(['SPX'])['results']['SPX'] == vix
@@ -0,0 +1,103 @@
+import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from vix.vix import Vix
+from vix.backfill import Backfill
+from vix.results import ResultStore
+from vix.options.chain import OptionChain
+from vix.options.expirations import Expirations
+from vix.providers.snapshots import SnapshotProvider
+from tests.helpers import build_td_response
+
+
+def _insert_batch(path: str, worker: int) -> int:
+    # Runs in another process, on a store it hasn't seen created
+    store = ResultStore(path, timeout=10)
+    return store.insert_many([{'ticker': f"T{worker}", 'timestamp': float(i), 'vix': 20.0 + i} for i in range(100)])
+
+
+def test_workers_set_up_a_new_database_together(tmp_path):
+    path = str(tmp_path / 'results/vix.sqlite3')
+    with ProcessPoolExecutor(max_workers=6) as pool:
+        assert list(pool.map(_insert_batch, [path] * 12, range(12))) == [100] * 12
+
+    store = ResultStore(path)
+    assert len(store.tickers()) == 12 and len(store.history()) == 1200
+    assert store.history('T3', start=98)[-1]['vix'] == 119.0
+
+
+def test_threads_store_through_their_own_connections(tmp_path):
+    # ex: the request threads of a VixService, on a Vix given the path of the database
+    now = datetime.datetime(2023, 3, 1, 10, 30)
+    chain = OptionChain.from_td_response(build_td_response(symbol='SPY', now=now))
+    vixvol = Vix(td_api_key='', result_store=str(tmp_path / 'results/vix.sqlite3'))
+
+    def calculate(i):
+        return vixvol.get_result_store(), vixvol.calculate_chain(chain, 4.87, f"T{i % 8}", as_of=now.timestamp() + i)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        calculated = list(pool.map(calculate, range(32)))
+
+    assert len({id(store) for store, _vix in calculated}) == 1
+    assert len(vixvol.get_result_store().tickers()) == 8 and len(vixvol.get_result_store().history()) == 32
+
+
+def test_backfill_workers_store_values_with_their_provenance(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    provider = SnapshotProvider('snapshots')
+    first = datetime.datetime(2023, 3, 1, 10, 30)
+    chains = {}
+
+    for day in range(4):
+        taken = first + datetime.timedelta(days=day)
+        for ticker, spot in [('SPY', 4000.0), ('QQQ', 3000.0 + day * 10)]:
+            chains[(ticker, taken.timestamp())] = OptionChain.from_td_response(build_td_response(symbol=ticker, spot=spot, now=taken))
+            provider.save(ticker, chains[(ticker, taken.timestamp())], taken.timestamp())
+    provider.save('THIN', OptionChain.from_td_response(build_td_response(symbol='THIN', days=[3, 10], now=first)), first.timestamp())
+
+    store = ResultStore(str(tmp_path / 'results/vix.sqlite3'))
+    vixvol = Vix(td_api_key='', debug=True, provider=provider, result_store=store)
+    columns = Backfill(vixvol, max_workers=2, chunk_size=3).run(r=4.87)
+
+    # Every worker stored its chunk
+    assert store.tickers() == ['QQQ', 'SPY', 'THIN']
+    assert len(store.history()) == len(columns['vix']) == 9
+
+    spy = store.history('SPY', start=first.timestamp() + 1)
+    assert [row['timestamp'] for row in spy] == [(first + datetime.timedelta(days=day)).timestamp() for day in [1, 2, 3]]
+    assert [row['vix'] for row in spy] == list(columns['vix'][[5, 6, 7]])
+
+    row = spy[0]
+    selected_chain = Expirations().find_option_terms(chains[('SPY', row['timestamp'])])
+    assert row['snapshot_time'] == row['timestamp']
+    assert (row['near_expiration'], row['next_expiration']) == (selected_chain['nearTerm'].expiration_timestamp, selected_chain['nextTerm'].expiration_timestamp)
+    assert (row['near_rate'], row['next_rate'], row['error']) == (4.87, 4.87, None)
+
+    # Every ticker at a time, as of its latest value
+    noon = (first + datetime.timedelta(days=1, hours=2)).timestamp()
+    latest = store.at(noon)
+    assert [(row['ticker'], row['timestamp']) for row in latest] == [('QQQ', spy[0]['timestamp']), ('SPY', spy[0]['timestamp']), ('THIN', first.timestamp())]
+    assert 'not have enough option contracts' in latest[-1]['error']
+    assert [row['ticker'] for row in store.at(noon, within=24 * 60 * 60)] == ['QQQ', 'SPY']
+    assert store.at(noon, tickers=['SPY']) == [spy[0]]
+
+    # Calculated again, the value is replaced rather than duplicated
+    vixvol.calculate_chain(chains[('SPY', row['timestamp'])], 5.0, 'SPY', as_of=row['timestamp'])
+    assert len(store.history('SPY')) == 4 and store.history('SPY')[1]['near_rate'] == 5.0
+
+    # An error doesn't replace the value, nor its provenance
+    stored = store.history('SPY')[1]
+    assert store.insert({'ticker': 'SPY', 'timestamp': row['timestamp'], 'error': 'Read timed out'}) == 0
+    assert store.history('SPY')[1] == stored
+    assert store.insert({'ticker': 'THIN', 'timestamp': first.timestamp(), 'error': 'Read timed out'}) == 1
+    assert store.history('THIN')[0]['error'] == 'Read timed out'
+
+    # Batches are stored too, with the rate of each selected expiration
+    as_of = (first + datetime.timedelta(days=3, hours=1)).timestamp()
+    selected_chain = Expirations().find_option_terms(chains[('SPY', as_of - 60 * 60)])
+    rates = {options.expiration_timestamp: rate for options, rate in zip(selected_chain.values(), [4.5, 4.6])}
+    batch = vixvol.calculate_batch(['SPY'], r=rates, as_of=as_of)
+    assert store.at(as_of, tickers=['SPY'])[0] == {
+        'ticker': 'SPY', 'timestamp': as_of, 'vix': batch['results']['SPY'], 'error': None, 'snapshot_time': as_of - 60 * 60,
+        'near_expiration': selected_chain['nearTerm'].expiration_timestamp, 'next_expiration': selected_chain['nextTerm'].expiration_timestamp,
+        'near_rate': 4.5, 'next_rate': 4.6, 'engine': 'batched',
+    }
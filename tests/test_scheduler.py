@@ -0,0 +1,53 @@
+import time
+from vix.vix import Vix
+from vix.scheduler import VixScheduler
+from vix.timeseries import TimeSeriesStore
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.options.chain import OptionChain
+from tests.helpers import build_td_response
+
+
+def test_ticks_reuse_strips_and_append_to_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    snapshots = {'SPY': build_td_response(symbol='SPY')}
+
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        chain = OptionChain.from_td_response(snapshots[td.ticker], **kwargs)
+        chain.snapshot_time = time.time()
+        return chain
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+
+    vixvol = Vix(td_api_key='', debug=True, caching_enabled=True)
+    store = TimeSeriesStore(str(tmp_path / 'timeseries'))
+    scheduler = VixScheduler(vixvol, ['SPY'], interval=0, store=store)
+
+    # The chain is cached between ticks, its snapshot time tells both terms are unchanged
+    now = time.time()
+    first = scheduler.tick(as_of=now)
+    second = scheduler.tick(as_of=now)
+    assert scheduler.stats['strips_built'] == 2
+    assert scheduler.stats['strips_reused'] == 2
+    assert first['SPY'] == vixvol.calculate_chain(OptionChain.from_td_response(snapshots['SPY']), as_of=now) == second['SPY']
+
+    # Once the cached chain expires, a new snapshot has new quotes, both terms are rebuilt
+    vixvol.chain_memory.clear()
+    vixvol.strip_cache.memory.clear()
+    vixvol.strip_cache.disk_cache.clear()
+    snapshots['SPY'] = build_td_response(symbol='SPY', sigma=0.3)
+    assert scheduler.tick(as_of=now + 1)['SPY'] > second['SPY']
+    assert scheduler.stats['strips_built'] == 4
+    assert len(scheduler._VixScheduler__strips['SPY']) == 2
+
+    # Strips of tickers no longer scheduled are dropped
+    scheduler.tickers.append('QQQ')
+    snapshots['QQQ'] = build_td_response(symbol='QQQ')
+    scheduler.tick(as_of=now + 2)
+    scheduler.tickers.remove('QQQ')
+    scheduler.tick(as_of=now + 3)
+    assert list(scheduler._VixScheduler__strips) == ['SPY']
+
+    series = store.read('SPY')
+    assert len(series) == 5
+    assert list(series['vix'][:2]) == [first['SPY'], second['SPY']]
+    assert len(store.read('SPY', start=now + 1)) == 3
@@ -0,0 +1,69 @@
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+from vix.vix import Vix
+from vix.service import VixService
+from vix.options.chain import OptionChain
+from vix.http.td_ameritrade import TDAmeritrade
+from tests.helpers import build_td_response
+
+
+def _get(service: VixService, path: str, body: dict = None) -> tuple[int, dict]:
+    data = json.dumps(body).encode('utf-8') if (body is not None) else None
+    try:
+        with urllib.request.urlopen(f"http://{service.host}:{service.port}{path}", data=data) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_service_coalesces_concurrent_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetches = []
+
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        fetches.append(td.ticker)
+        time.sleep(0.2)  # Slow enough for every request to arrive while the first one is fetching
+        days = [3, 10] if (td.ticker == 'THIN') else None
+        return OptionChain.from_td_response(build_td_response(symbol=td.ticker, days=days), **kwargs)
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+
+    service = VixService(Vix(td_api_key='', debug=True), port=0)
+    service.start()
+    try:
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(_get(service, '/vix/spx'))) for _ in range(5)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        assert fetches == ['SPX']
+        assert [status for status, _body in responses] == [200] * 5
+        assert len({body['vix'] for _status, body in responses}) == 1
+        assert service.coalescer.stats['coalesced'] == 4
+
+        status, body = _get(service, '/vix', {'tickers': ['SPX', 'THIN']})
+        assert status == 200 and body['results']['SPX'] == responses[0][1]['vix']
+        assert 'not have enough option contracts' in body['errors']['THIN']
+
+        # A single ticker and an overlapping batch share the fetch of the ticker they have in common
+        overlapping = {}
+        threads = [
+            threading.Thread(target=lambda: overlapping.update(single=_get(service, '/vix/QQQ'))),
+            threading.Thread(target=lambda: overlapping.update(batch=_get(service, '/vix?tickers=IWM,QQQ'))),
+        ]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert sorted(fetches) == ['IWM', 'QQQ', 'SPX', 'THIN']
+        assert overlapping['batch'][1]['results']['QQQ'] == overlapping['single'][1]['vix']
+        assert set(overlapping['batch'][1]['results']) == {'IWM', 'QQQ'}
+
+        assert _get(service, '/vix/THIN')[0] == 422
+        assert _get(service, '/vix/SPX?as_of=yesterday')[0] == 400
+        assert _get(service, '/vix', {'tickers': 'SPY'}) == (400, {'error': 'tickers must be a list, (ex: ["SPY"]).'})
+        assert _get(service, '/unknown')[0] == 404
+        assert _get(service, '/health')[1]['errors'] == 4
+    finally:
+        service.shutdown()
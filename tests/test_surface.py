@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from vix.vix import Vix
+from vix.math import calculate_vix
+from vix.surface import VarianceSurface
+from vix.options.chain import OptionChain
+from vix.providers.snapshots import SnapshotProvider
+from tests.helpers import build_td_response
+
+
+def _contributions_of(name: str) -> float:
+    # Runs in another process, which reads the surface straight from shared memory
+    surface = VarianceSurface.attach(name)
+    total = float(surface.strikes['contribution'].sum())
+    surface.close()
+    return total
+
+
+def test_variance_surface_keeps_every_step_of_the_calculation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = float(int(time.time()))
+    provider = SnapshotProvider(str(tmp_path / 'snapshots'))
+    provider.save('SPY', OptionChain.from_td_response(build_td_response(symbol='SPY', days=[3, 10, 17, 24, 31, 38, 45, 59, 87])), now)
+
+    vixvol = Vix(td_api_key='', provider=provider)
+    surface = vixvol.variance_surface('SPY', r=4.87, as_of=now + 60)
+    assert len(surface) == 2 and not surface.expiration_errors
+
+    # The selected terms reproduce calculate() exactly
+    terms = lambda name: dict(zip(['nearTerm', 'nextTerm'], surface.expirations[name].tolist()))
+    assert calculate_vix(terms('variance'), terms('t'), terms('tminutes')) == vixvol.calculate('SPY', r=4.87, as_of=now + 60)
+
+    for i, expiration in enumerate(surface.expirations):
+        strip = surface.strip(i)
+        variance = 2 / expiration['t'] * strip['contribution'].sum() - 1 / expiration['t'] * (expiration['f'] / expiration['k0'] - 1) ** 2
+        assert expiration['variance'] == pytest.approx(abs(variance), rel=1e-12)
+
+        # Puts up to K0, K0 twice, then calls
+        at_k0 = np.flatnonzero(strip['strike'] == expiration['k0'])
+        assert strip['side'][at_k0].tolist() == [b'C', b'P'] and len(strip) == expiration['count']
+        assert set(strip['side'][:at_k0[0]].tolist()) == {b'P'} and set(strip['side'][at_k0[1] + 1:].tolist()) == {b'C'}
+        assert np.all(np.diff(strip['strike']) >= 0)
+
+    # Memory mapped, read only, and identical once loaded back
+    loaded = VarianceSurface.load(surface.save(str(tmp_path / 'SPY.surface')))
+    assert not loaded.strikes.flags.writeable
+    assert loaded.expirations.tobytes() == surface.expirations.tobytes() and loaded.strikes.tobytes() == surface.strikes.tobytes()
+    assert (loaded.symbol, loaded.as_of) == ('SPY', now + 60)
+
+    # Shared with another process without serializing the arrays
+    shared_memory = surface.share()
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(_contributions_of, shared_memory.name).result() == float(surface.strikes['contribution'].sum())
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    # Every expiration from 1 day on, each with its own forward level
+    every_expiration = vixvol.variance_surface('SPY', r=4.87, as_of=now + 60, all_expirations=True)
+    assert every_expiration.expirations['days_to_expiration'].tolist() == [3, 10, 17, 24, 31, 38, 45, 59, 87]
+
+
+SHARE_AND_ATTACH = """
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from vix.surface import VarianceSurface, EXPIRATION, STRIKE
+from tests.test_surface import _contributions_of
+
+if __name__ == '__main__':
+    surface = VarianceSurface(np.zeros(2, dtype=EXPIRATION), np.ones(8, dtype=STRIKE), 'SPY', 0.0)
+    shared_memory = surface.share()
+    attached = VarianceSurface.attach(shared_memory.name)
+    assert attached.strikes.tobytes() == surface.strikes.tobytes()
+    attached.close()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        executor.submit(_contributions_of, shared_memory.name).result()
+    shared_memory.close()
+    shared_memory.unlink()
+"""
+
+
+def test_attaching_leaves_the_owner_registration_alone(tmp_path):
+    # The resource tracker complains on stderr, (at exit), about blocks it was asked to forget twice or which leaked
+    script = tmp_path / 'share.py'
+    script.write_text(SHARE_AND_ATTACH)
+    completed = subprocess.run([sys.executable, str(script)], cwd=os.getcwd(), env={**os.environ, 'PYTHONPATH': os.getcwd()}, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0 and completed.stderr == ''
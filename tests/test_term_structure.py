@@ -0,0 +1,48 @@
+import pytest
+from math import e
+from vix.vix import Vix
+from vix.options.chain import OptionChain
+from vix.options.options import determine_forward_level_strike
+from vix.vectorized_volatility import VectorizedVolatility
+from vix.http.td_ameritrade import TDAmeritrade
+from tests.helpers import build_td_response
+
+
+def test_term_structure_from_one_variance_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responses = {
+        'SPY': build_td_response(symbol='SPY', spot=400.0, strike_step=5.0, days=[3, 10, 17, 24, 31, 38, 45, 59, 87, 122, 150, 192]),
+        'THIN': build_td_response(symbol='THIN', days=[3, 10]),
+    }
+    windows = []
+
+    def get_parsed_option_chain(td, time_range, **kwargs):
+        windows.append((time_range[1] - time_range[0]).days)
+        return OptionChain.from_td_response(responses[td.ticker], **kwargs)
+
+    monkeypatch.setattr(TDAmeritrade, 'get_parsed_option_chain', get_parsed_option_chain)
+
+    vixvol = Vix(td_api_key='', debug=True)
+    batch = vixvol.term_structure(['SPY', 'THIN'], r=0.04)
+
+    # Enough months of expirations for the 6 month horizon, and every one of them got a variance
+    assert min(windows) > 184
+    table = batch['variances']['SPY']
+    assert table['days_to_expiration'].tolist() == [3, 10, 17, 24, 31, 38, 45, 59, 87, 122, 150, 192]
+    assert list(table['error']) == [None] * 12
+
+    # Each expiration with its own forward level, like a term of the per-ticker engines
+    chain = OptionChain.from_td_response(responses['SPY'])
+    for i, options in enumerate(chain):
+        forward_level = determine_forward_level_strike({'nearTerm': options, 'nextTerm': options})['nearTerm']
+        f = forward_level['strikePrice'] + pow(e, 0.04 * table['t'][i]) * (forward_level['call'] - forward_level['put'])
+        assert table['variance'][i] == pytest.approx(VectorizedVolatility().term_variance(f, table['t'][i], 0.04, options), rel=1e-12)
+
+    assert set(batch['results']['SPY']) == {9, 30, 93, 184}
+    assert all(18 < vix < 22 for vix in batch['results']['SPY'].values())  # Priced with a flat 20% volatility
+    assert batch['results']['SPY'][30] == pytest.approx(vixvol.calculate('SPY', r=0.04), abs=0.1)
+    assert 'SPY' not in batch['errors']
+
+    assert set(batch['results']['THIN']) == {9}
+    assert set(batch['errors']['THIN']) == {30, 93, 184}
+    assert vixvol.metrics.export(step='term_structure')[0]['expirations'] == 14
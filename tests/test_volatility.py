@@ -0,0 +1,71 @@
+import os
+import json
+import datetime
+import pytest
+from vix.options.chain import OptionChain
+from vix.options.expirations import Expirations
+from vix.options.options import determine_forward_level_strike
+from vix.math import calculate_t, calculate_f
+from vix.volatility import Volatility
+from vix.vectorized_volatility import VectorizedVolatility
+from vix.batched_volatility import BatchedVolatility
+from vix.vix import Vix
+from tests.helpers import build_td_response
+
+FIXTURE = 'tests/fixtures/sample_td_spx_response.json'
+
+
+def _compare_engines(response: dict, r: float = 4.87):
+    chain = OptionChain.from_td_response(response)
+    selected_chain = Expirations().find_option_terms(chain)
+    t, _tminutes = calculate_t(selected_chain)
+    f = calculate_f(t, r, determine_forward_level_strike(selected_chain))
+
+    expected = Volatility().calculate(f, t, r, selected_chain)
+    actual = VectorizedVolatility().calculate(f, t, r, selected_chain)
+
+    for term in ['nearTerm', 'nextTerm']:
+        assert actual[term] == pytest.approx(expected[term], rel=1e-12)
+
+
+def test_engines_match_on_synthetic_chain():
+    _compare_engines(build_td_response())
+    _compare_engines(build_td_response(spot=150.0, strike_step=2.5, sigma=0.6))
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE), reason='TD Ameritrade sample response not available')
+def test_engines_match_on_fixture():
+    with open(FIXTURE, 'r') as f:
+        _compare_engines(json.loads(f.read()))
+
+
+def test_batched_engine_matches_per_ticker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = datetime.datetime.now()
+    responses = {
+        'SPX': build_td_response(now=now),
+        'SPY': build_td_response(symbol='SPY', spot=400.0, strike_step=5.0, now=now),
+        'AAPL': build_td_response(symbol='AAPL', spot=150.0, strike_step=2.5, sigma=0.6, now=now),
+        'TSLA': build_td_response(symbol='TSLA', spot=250.0, strike_step=2.5, strike_count=160, sigma=0.9, now=now),
+        'DEAD': build_td_response(symbol='DEAD', spot=150.0, strike_step=2.5, now=now),
+    }
+    # No bids at all, the zero bid truncation finds nothing next to K0.
+    for side_map in ['callExpDateMap', 'putExpDateMap']:
+        for strikes in responses['DEAD'][side_map].values():
+            for contracts in strikes.values():
+                contracts[0]['bid'] = 0.0
+
+    selected_chains = {
+        ticker: Expirations().find_option_terms(OptionChain.from_td_response(response))
+        for ticker, response in responses.items()
+    }
+    vixvol = Vix(td_api_key='', debug=True)
+    as_of = now.timestamp()
+
+    batch = BatchedVolatility().calculate(selected_chains, 4.87, as_of)
+
+    assert set(batch['results']) == {'SPX', 'SPY', 'AAPL', 'TSLA'}
+    assert 'No strikes with a bid and ask' in batch['errors']['DEAD']
+    for ticker, vix in batch['results'].items():
+        chain = OptionChain.from_td_response(responses[ticker])
+        assert vix == vixvol.calculate_chain(chain, 4.87, ticker, as_of=as_of)
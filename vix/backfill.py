@@ -0,0 +1,167 @@
+import os
+import datetime
+import numpy as np
+from vix.vix import Vix
+from vix.math import term_rate
+from vix.options.expirations import Expirations
+from vix.providers.snapshots import SnapshotProvider
+
+
+class Backfill:
+    """
+    Computes historical VIX values over recorded chain snapshots, (see SnapshotProvider), for many tickers at once.
+
+    Every snapshot is calculated as of its own time: T is measured from when it was taken, and r is the rate published
+    on that day, (per term when Vix has a yield curve covering the day, see Vix.get_term_rates()). Snapshots are split into chunks of consecutive files which worker processes load and calculate on
+    their own. Only paths go to the workers and only values come back, so with binary snapshots a backfill is
+    bound by how fast the files can be read rather than by the calculation.
+
+    Results are columns, (timestamp, ticker, vix, r, error), sorted by ticker then time, r being the near-term rate, and can be written to a
+    .npz file with one array per column. When the Vix has a result_store, each worker also stores the values of its
+    chunk, with their provenance, in one batch.
+    """
+
+    def __init__(self, vix: Vix, provider: SnapshotProvider = None, max_workers: int = None, chunk_size: int = 256):
+        """
+        Parameters
+        ----------
+        vix         :Vix
+        provider    :SnapshotProvider
+                    Defaults to the Vix's provider.
+        max_workers :int
+                    Number of processes, defaults to the number of CPUs. 1 runs the backfill in this process.
+        chunk_size  :int
+                    Snapshots per task sent to a worker.
+        """
+        self.vix = vix
+        self.provider = provider or vix.provider
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        if not isinstance(self.provider, SnapshotProvider):
+            raise Exception(f"Backfills run on recorded snapshots, not on {type(self.provider).__name__}. Pass a SnapshotProvider.")
+
+    def run(self, tickers: list = None, start: float = None, end: float = None, r: float = None, output: str = None) -> dict:
+        """
+        Parameters
+        ----------
+        tickers     :list
+                    Defaults to every ticker the provider has snapshots of.
+        start       :float
+        end         :float
+                    Unix timestamps, inclusive.
+        r           :float
+                    Risk-free rate for every snapshot. By default, the rates published on the day of each snapshot.
+        output      :str
+                    Path of a .npz file to write the columns to.
+
+        Returns
+        -------
+        columns     :dict
+                    {'timestamp', 'ticker', 'vix', 'r', 'error'} numpy arrays. vix is nan where error is set.
+        """
+        tasks = self.__tasks(tickers or self.provider.tickers(), start, end)
+        rates = self.__rates(tasks, r)
+        chunks = [
+            [(snapshot_time, ticker, path, rates[snapshot_time]) for snapshot_time, ticker, path in tasks[i:i + self.chunk_size]]
+            for i in range(0, len(tasks), self.chunk_size)
+        ]
+
+        # The workers store their chunks in a database set up once, here
+        if (self.vix.get_result_store() is not None):
+            self.vix.get_result_store().create()
+
+        rows = []
+        if ((self.max_workers == 1) or (len(chunks) <= 1)):
+            for chunk in chunks:
+                rows += _backfill_chunk(self.vix, self.provider, chunk)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                for chunk_rows in pool.map(_backfill_chunk, [self.vix] * len(chunks), [self.provider] * len(chunks), chunks):
+                    rows += chunk_rows
+
+        columns = self.__columns(rows)
+        if output:
+            write_backfill(output, columns)
+
+        return columns
+
+    def __tasks(self, tickers: list, start: float, end: float) -> list:
+        # (snapshot_time, ticker, path), in time order so each chunk reads files written around the same time.
+        tasks = []
+        for ticker in tickers:
+            times, paths = self.provider.snapshots(ticker)
+            for snapshot_time, path in zip(times, paths):
+                if ((start is not None) and (snapshot_time < start)): continue
+                if ((end is not None) and (snapshot_time > end)): continue
+                tasks.append((snapshot_time, ticker, path))
+
+        return sorted(tasks)
+
+    def __rates(self, tasks: list, r: float) -> dict:
+        # One rate per day, looked up once here rather than in every worker. None when the yield curve covers the day,
+        # the workers then interpolate the rates of each snapshot's terms.
+        rates = {}
+        by_day = {}
+        for snapshot_time, _ticker, _path in tasks:
+            if (r is None):
+                day = datetime.datetime.fromtimestamp(snapshot_time).date()
+                if (day not in by_day):
+                    by_day[day] = self.vix.get_shared_rate(as_of=snapshot_time)
+                rates[snapshot_time] = by_day[day]
+            else:
+                rates[snapshot_time] = r
+
+        return rates
+
+    def __columns(self, rows: list) -> dict:
+        rows = sorted(rows, key=lambda row: (row[1], row[0]))
+
+        return {
+            'timestamp': np.array([row[0] for row in rows], dtype=np.float64),
+            'ticker': np.array([row[1] for row in rows], dtype=str),
+            'vix': np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64),
+            'r': np.array([np.nan if not row[3] else row[3] for row in rows], dtype=np.float64),
+            'error': np.array([row[4] or '' for row in rows], dtype=str),
+        }
+
+
+def write_backfill(path: str, columns: dict):
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    np.savez(path, **columns)
+
+
+def read_backfill(path: str) -> dict:
+    with np.load(path) as data:
+        return {column: data[column] for column in data.files}
+
+
+def _backfill_chunk(vix: Vix, provider: SnapshotProvider, chunk: list) -> list:
+    # Runs in a worker process, so it has to live at module level to be picklable.
+    rows = []
+    results = []
+    for snapshot_time, ticker, path, r in chunk:
+        try:
+            if ((r is not None) and (not r)):
+                raise Exception('No risk-free rate for the day of the snapshot.')
+
+            chain = provider.load(path, snapshot_time, Expirations.min_days_to_expiration, Expirations.max_days_to_expiration)
+            if (r is None):
+                r = vix.get_term_rates(Expirations().find_option_terms(chain), as_of=snapshot_time)
+
+            results.append(vix.calculate_chain_result(chain, r, ticker, as_of=snapshot_time))
+            rows.append((snapshot_time, ticker, results[-1]['vix'], term_rate(r, 'nearTerm'), None))
+        except Exception as e:
+            rows.append((snapshot_time, ticker, None, term_rate(r, 'nearTerm') if r else r, str(e.args[0]) if e.args else repr(e)))
+            results.append({'ticker': ticker, 'timestamp': snapshot_time, 'error': rows[-1][4], 'snapshot_time': snapshot_time})
+
+    if (vix.get_result_store() is not None):
+        vix.get_result_store().insert_many(results)
+
+    # A worker's metrics records aren't sent back, a backfill makes far too many of them.
+    if vix.metrics.detached:
+        vix.metrics.clear()
+    return rows
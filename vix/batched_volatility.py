@@ -0,0 +1,323 @@
+import numpy as np
+from math import e
+from vix.math import calculation_time, calculate_term_t
+from vix.options.options import forward_level_rows
+
+TERMS = ['nearTerm', 'nextTerm']
+SIDES = ['call', 'put']
+COLUMNS = ['strikes', 'bid', 'ask', 'last', 'mid']
+
+
+class BatchedVolatility:
+    """
+    Steps 4 through 8 of the VIX equation, (T, the forward level, K0, the zero bid truncation, ∆Ki contributions and
+    the interpolation to 30 days), for many tickers in one pass.
+
+    The selected chains of every ticker are packed into flat arrays, one segment per term: term i of the batch is the
+    near-term of ticker i // 2 when i is even, its next-term otherwise. Each step is then an array operation over the
+    whole batch, so the Python work per ticker is limited to packing its columns. A ticker which fails a step is
+    reported in errors and carried along as padding, it does not stop the rest of the batch.
+
+    Produces the same values as Vix.calculate_chain() with either engine, quirks included, (ex: F of both terms is
+    computed from the near-term forward level strike).
+    """
+
+    def calculate(self, selected_chains: dict, r: float, as_of: float = None) -> dict:
+        """
+        Parameters
+        ----------
+        selected_chains :dict
+                        {ticker: selected_chain}, see Expirations.find_option_terms()
+        r               :float | dict
+                        Risk-free rate shared by every ticker, or {expiration_timestamp: r}, (ex: from a YieldCurve).
+        as_of           :float
+                        Unix timestamp T is measured from, now by default.
+
+        Returns
+        -------
+        batch           :dict
+                        {'results': {ticker: vix}, 'errors': {ticker: message}}
+
+        The number of strikes kept in each term's strip is left in self.strikes_retained, as {ticker: {term: count}}.
+        """
+        tickers = list(selected_chains)
+        batch = {'results': {}, 'errors': {}}
+        self.strikes_retained = {}
+        if not tickers: return batch
+
+        packed = self.pack([selected_chains[ticker] for ticker in tickers])
+        t, tminutes, growth = self.__calculate_t(packed, r, as_of)
+
+        with np.errstate(all='ignore'):  # Failed terms are computed on padding, and masked at the end
+            f = self.__calculate_f(packed, growth)
+            k0, call_k0, put_k0 = self.__calculate_k0(packed, f)
+            call_bound, put_bound = self.__truncate(packed, call_k0, put_k0)
+            vol, retained, _strips = self.__calculate_variance(packed, f, t, growth, k0, call_k0, put_k0, call_bound, put_bound)
+            vix = self.__equation(vol, t, tminutes)
+
+        failed = packed['error'][0::2]
+        failed = np.where(failed == None, packed['error'][1::2], failed)
+
+        for i, ticker in enumerate(tickers):
+            if (failed[i] is None) and np.isnan(vix[i]):
+                failed[i] = 'math domain error'  # The interpolated variance is negative, like math.sqrt() raises
+
+            if (failed[i] is None):
+                batch['results'][ticker] = round(float(vix[i]), 3)  # Python's round(), np.round() can differ on the last digit
+                self.strikes_retained[ticker] = {'nearTerm': int(retained[2 * i]), 'nextTerm': int(retained[2 * i + 1])}
+            else:
+                batch['errors'][ticker] = failed[i]
+
+        return batch
+
+    def variances(self, terms: list, r: float | dict, as_of: float = None, shared_strike: bool = False, strips: bool = False) -> dict:
+        """
+        Steps 4 through 7 for any list of terms, (ex: every expiration of a chain, see TermStructure), each with the
+        forward level strike of its own expiration, as the whitepaper describes. With shared_strike, terms are
+        (near, next) pairs computed exactly like calculate() does.
+
+        Returns
+        -------
+        variances       :dict
+                        {'variance', 't', 'tminutes', 'strikes_retained', 'error'}, arrays aligned on terms. error is
+                        None for the terms which were calculated, the message of the step which failed otherwise.
+                        With strips, also 'f', 'k0', 'r' and 'strips': every term's strip back to back,
+                        {'start', 'strikes', 'quotes', 'delta_k', 'contributions'}, see VarianceSurface.
+        """
+        if not terms:
+            empty = np.empty(0)
+            variances = {'variance': empty, 't': empty, 'tminutes': empty, 'strikes_retained': empty, 'error': np.empty(0, dtype=object)}
+            if strips:
+                variances.update({'f': empty, 'k0': empty, 'r': empty})
+                variances['strips'] = {name: empty for name in ['start', 'strikes', 'quotes', 'delta_k', 'contributions']}
+            return variances
+
+        packed = self.pack_terms(terms)
+        t, tminutes, growth = self.__calculate_t(packed, r, as_of)
+
+        with np.errstate(all='ignore'):
+            f = self.__calculate_f(packed, growth, shared_strike=shared_strike)
+            k0, call_k0, put_k0 = self.__calculate_k0(packed, f)
+            call_bound, put_bound = self.__truncate(packed, call_k0, put_k0)
+            vol, retained, term_strips = self.__calculate_variance(packed, f, t, growth, k0, call_k0, put_k0, call_bound, put_bound)
+
+        variances = {'variance': vol, 't': t, 'tminutes': tminutes, 'strikes_retained': retained, 'error': packed['error']}
+        if strips:
+            rates = np.array([(r[expiration] if isinstance(r, dict) else r) for expiration in packed['expirations'].tolist()], dtype=np.float64)
+            variances.update({'f': f, 'k0': k0, 'r': rates, 'strips': term_strips})
+        return variances
+
+    def pack(self, selected_chains: list) -> dict:
+        return self.pack_terms([selected_chain[term] for selected_chain in selected_chains for term in TERMS])
+
+    def pack_terms(self, terms: list) -> dict:
+        """
+        Concatenates the columns of every term into one array per side and column.
+
+        Each side ends with a padding row which belongs to no term, so a lookup that runs off the end of a term lands
+        on it, and is masked, instead of being bounds checked. Strikes are also given integer keys,
+        (term * number of distinct strikes + rank of the strike), which sort like (term, strike), so a single
+        searchsorted() finds a strike within its own term for every term at once.
+        """
+        distinct = np.unique(np.concatenate([getattr(term, side).strikes for term in terms for side in SIDES]))
+
+        packed = {
+            'terms': terms,
+            'expirations': np.array([term.expiration_timestamp for term in terms], dtype=np.int64),
+            'distinct': distinct,
+            'error': np.full(len(terms), None, dtype=object),
+        }
+
+        for side in SIDES:
+            columns = [getattr(term, side) for term in terms]
+            lengths = np.array([len(column) for column in columns], dtype=np.int64)
+            end = np.cumsum(lengths)
+
+            packed[side] = {
+                'start': end - lengths,
+                'end': end,
+                'segment': np.append(np.repeat(np.arange(len(terms)), lengths), len(terms)),
+            }
+            for name in COLUMNS:
+                padding = np.nan if (name == 'strikes') else 0.0
+                packed[side][name] = np.append(np.concatenate([getattr(column, name) for column in columns]).astype(np.float64), padding)
+
+            ranks = np.searchsorted(distinct, packed[side]['strikes'][:-1])
+            packed[side]['key'] = np.append(packed[side]['segment'][:-1] * len(distinct) + ranks, np.iinfo(np.int64).max)
+
+        return packed
+
+    def __fail(self, packed: dict, mask: np.ndarray, message: str):
+        # Only the first error of a term is kept, later steps fail on its padding too.
+        error = packed['error']
+        error[mask & (error == None)] = message
+
+    def __strike_keys(self, packed: dict, strikes: np.ndarray, side: str = 'left') -> np.ndarray:
+        # Keys of one strike per term. With side='right', a strike which isn't listed gets the key of the one below it.
+        ranks = np.searchsorted(packed['distinct'], strikes, side=side)
+        if (side == 'right'): ranks -= 1
+        return np.arange(len(strikes)) * len(packed['distinct']) + ranks
+
+    def __calculate_t(self, packed: dict, r: float, as_of: float = None) -> tuple:
+        # Step 4, T and e**(rT) once per distinct expiration, they are shared by most tickers of a batch.
+        now, minutes_to_midnight = calculation_time(as_of)
+        expirations, first, inverse = np.unique(packed['expirations'], return_index=True, return_inverse=True)
+
+        t = np.empty(len(expirations))
+        tminutes = np.empty(len(expirations))
+        growth = np.empty(len(expirations))
+        for i, (term, expiration) in enumerate(zip(first.tolist(), expirations.tolist())):
+            t[i], tminutes[i] = calculate_term_t(packed['terms'][term].expiration_datetime_zone, now, minutes_to_midnight)
+            growth[i] = pow(e, (r[expiration] if isinstance(r, dict) else r) * t[i])
+
+        return t[inverse], tminutes[inverse], growth[inverse]
+
+    def __calculate_f(self, packed: dict, growth: np.ndarray, shared_strike: bool = True) -> np.ndarray:
+        # Steps 5 and 6, see determine_forward_level_strike() and calculate_f()
+        # With shared_strike, terms are (near, next) pairs and both use the near-term strike, like calculate_f().
+        call = packed['call']
+        put = packed['put']
+        n_terms = len(packed['terms'])
+
+        # Calls and puts quoted at the same strike. The padding row is never priced, it only keeps c from being empty.
+        p = np.searchsorted(put['key'], call['key'])
+        c = np.flatnonzero(put['key'][p] == call['key'])
+        p = p[c]
+
+        rows = forward_level_rows(call['segment'][c], call['last'][c], put['last'][p], n_terms)
+        found = (rows >= 0)
+        row = np.maximum(rows, 0)
+
+        strike = np.where(found, call['strikes'][c[row]], np.nan)
+        difference = np.where(found, call['last'][c[row]] - put['last'][p[row]], np.nan)
+        self.__fail(packed, ~found, 'No call and put quoted at the same strike to determine the forward level.')
+
+        # F = Strike Price + eRT × (Call Price – Put Price), with the near-term strike for both terms
+        if shared_strike:
+            strike = np.repeat(strike[0::2], 2)
+        return strike + growth * difference
+
+    def __calculate_k0(self, packed: dict, f: np.ndarray) -> tuple:
+        # The first strike below the forward level, looked up on the puts first, like VectorizedVolatility.
+        call = packed['call']
+        put = packed['put']
+        keys = self.__strike_keys(packed, np.trunc(f), side='right')
+
+        k0 = np.full(len(f), np.nan)
+        for side in [call, put]:
+            i = np.searchsorted(side['key'], keys, side='right') - 1
+            found = (i >= side['start']) & (i < side['end'])
+            k0 = np.where(found, side['strikes'][i], k0)
+        self.__fail(packed, np.isnan(k0) | np.isnan(f), 'No strike found below the forward level.')
+
+        keys = self.__strike_keys(packed, k0)
+        call_k0 = np.searchsorted(call['key'], keys)
+        put_k0 = np.searchsorted(put['key'], keys)
+        self.__fail(packed, (call['key'][call_k0] != keys) | (put['key'][put_k0] != keys), 'K0 is not quoted on both calls and puts.')
+
+        return k0, call_k0, put_k0
+
+    def __truncate(self, packed: dict, call_k0: np.ndarray, put_k0: np.ndarray) -> tuple:
+        """
+        Step 7, the zero bid truncation of every term at once, see VectorizedVolatility.__truncate().
+        Counting zeros from K0 is a difference of a running count, (zeros_before), taken at each strike and at K0.
+        """
+        bounds = []
+        for side, k0, walk in [(packed['call'], call_k0, 1), (packed['put'], put_k0, -1)]:
+            index = np.arange(len(side['strikes']))
+            zero = (side['bid'] == 0) | (side['ask'] == 0)
+            zeros_before = np.concatenate(([0], np.cumsum(zero)))
+
+            # K0 of each row's term, the padding row is its own K0.
+            row_k0 = np.append(k0, len(index) - 1)[side['segment']]
+
+            if (walk == 1):  # Calls, walking up from K0
+                zeros = zeros_before[index] - zeros_before[row_k0]
+                included = np.flatnonzero(~zero & (index >= row_k0) & (zeros < 2))
+                included = np.concatenate(([-1], included))
+                bound = included[np.searchsorted(included, side['end']) - 1]
+                found = (bound >= k0)
+            else:  # Puts, walking down from K0
+                zeros = zeros_before[row_k0 + 1] - zeros_before[index + 1]
+                included = np.flatnonzero(~zero & (index <= row_k0) & (zeros < 2))
+                included = np.concatenate((included, [len(index)]))
+                bound = included[np.searchsorted(included, side['start'])]
+                found = (bound <= k0)
+
+            self.__fail(packed, ~found, 'No strikes with a bid and ask found next to K0.')
+            bounds.append(np.where(found, bound, k0))
+
+        return bounds[0], bounds[1]
+
+    def __calculate_variance(self, packed: dict, f: np.ndarray, t: np.ndarray, growth: np.ndarray, k0: np.ndarray,
+                             call_k0: np.ndarray, put_k0: np.ndarray, call_bound: np.ndarray, put_bound: np.ndarray) -> tuple:
+        """
+        Lays out every term's strip back to back, (puts below K0, K0 twice, calls above K0), then ∆Ki, the
+        contributions and their sum per term. Failed terms are reduced to K0 twice, so every strip has at least 2 strikes.
+        """
+        call = packed['call']
+        put = packed['put']
+        failed = (packed['error'] != None)
+
+        n_put = np.where(failed, 0, put_k0 - put_bound)
+        n_call = np.where(failed, 0, call_bound - call_k0)
+        lengths = n_put + 2 + n_call
+        start = np.cumsum(lengths) - lengths
+
+        strikes = np.empty(lengths.sum())
+        quotes = np.empty(lengths.sum())
+
+        # "The K0 put and call prices are averaged to produce a single value."
+        put_call_avg = (call['mid'][call_k0] + put['mid'][put_k0]) / 2
+        for offset in [0, 1]:
+            strikes[start + n_put + offset] = k0
+            quotes[start + n_put + offset] = put_call_avg
+
+        for side, source, destination, count in [(put, put_bound, start, n_put), (call, call_k0 + 1, start + n_put + 2, n_call)]:
+            rows = _ragged_arange(source, count)
+            strikes[_ragged_arange(destination, count)] = side['strikes'][rows]
+            quotes[_ragged_arange(destination, count)] = side['mid'][rows]
+
+        # ∆Ki, with the edges of each strip taking the difference to their only neighbour
+        end = start + lengths - 1
+        delta_k = np.empty_like(strikes)
+        delta_k[1:-1] = (strikes[2:] - strikes[:-2]) / 2
+        delta_k[start] = strikes[start + 1] - strikes[start]
+        delta_k[end] = strikes[end] - strikes[end - 1]
+
+        weights = delta_k / np.square(strikes) * quotes
+        weight_sum = np.add.reduceat(weights, start)
+
+        # 2/T ∑∆Ki/Ki**2 e**(rt) * q - 1/T (F/K0 - 1)**2
+        sigma_KcT = 2/t * growth * weight_sum
+        tK = 1/t * np.square((f / k0) - 1)
+
+        # The "Contribution by Strike" of each strike, ∆Ki/Ki**2 e**(rt) * q
+        strips = {
+            'start': start,
+            'strikes': strikes,
+            'quotes': quotes,
+            'delta_k': delta_k,
+            'contributions': weights * np.repeat(growth, lengths),
+        }
+
+        return np.abs(sigma_KcT - tK), lengths, strips
+
+    def __equation(self, vol: np.ndarray, t: np.ndarray, tminutes: np.ndarray) -> np.ndarray:
+        # Step 8, see calculate_vix(). Left unrounded.
+        v1, v2 = vol[0::2], vol[1::2]
+        t1, t2 = t[0::2], t[1::2]
+        nT1, nT2 = tminutes[0::2], tminutes[1::2]
+
+        minYear = 525600  # Minutes in a year
+        minMonth = 43200  # minutes in a month
+
+        return 100 * np.sqrt(
+            (t1 * v1 * ((nT2 - minMonth) / (nT2 - nT1)) + t2 * v2 * ((minMonth - nT1) / (nT2 - nT1))) * minYear / minMonth
+        )
+
+
+def _ragged_arange(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # np.concatenate([np.arange(start, start + length) for start, length in zip(starts, lengths)]), without the loop.
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
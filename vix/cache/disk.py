@@ -0,0 +1,165 @@
+import os
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+TEMPORARY_PREFIX = '.tmp-'
+
+
+class DiskCache:
+    """
+    A directory of cached files with a time to live, a maximum total size, and least recently used eviction.
+
+    Files are written to a temporary file in the same directory and renamed into place, so concurrent workers never
+    read a half written file. Freshness is based on a file's modification time (when it was written), and recency on
+    its access time, which we set ourselves on every hit rather than relying on how the disk is mounted.
+    """
+
+    def __init__(self, directory: str, ttl: float = None, max_bytes: int = None):
+        """
+        Parameters
+        ----------
+        directory   :str
+        ttl         :float
+                    Seconds a file stays fresh after being written. None never expires.
+        max_bytes   :int
+                    Maximum total size of the directory. Least recently used files are evicted past it.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'writes': 0}
+        self.__lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> str | None:
+        """
+        Returns the path of a fresh cached file, or None. Expired files are deleted.
+        """
+        path = self.path(name)
+        try:
+            modified = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.__count('misses')
+            return None
+
+        now = time.time()
+        if ((self.ttl is not None) and (now - modified > self.ttl)):
+            self.__remove(path)
+            self.__count('expired')
+            self.__count('misses')
+            return None
+
+        try:
+            os.utime(path, (now, modified))  # Marking as recently used, keeping the write time for the ttl.
+        except FileNotFoundError:  # Evicted by another worker in the meantime
+            self.__count('misses')
+            return None
+
+        self.__count('hits')
+        return path
+
+    def age(self, name: str) -> float | None:
+        try:
+            return time.time() - os.stat(self.path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def written_at(self, name: str) -> float | None:
+        try:
+            return os.stat(self.path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def writing(self, name: str):
+        """
+        Yields a temporary path to write to. When the block finishes without an exception, the file is
+        atomically renamed to name, otherwise it is discarded.
+
+            with cache.writing('SPY.json') as path:
+                with open(path, 'w') as f: ...
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(prefix=TEMPORARY_PREFIX, dir=self.directory)
+        os.close(fd)
+
+        try:
+            yield temporary_path
+            os.replace(temporary_path, self.path(name))
+        except BaseException:
+            self.__remove(temporary_path)
+            raise
+
+        self.__count('writes')
+        self.evict()
+
+    def write_bytes(self, name: str, data: bytes):
+        with self.writing(name) as path:
+            with open(path, 'wb') as f:
+                f.write(data)
+
+    def evict(self) -> int:
+        """
+        Deletes least recently used files until the directory fits in max_bytes. Returns the number of files deleted.
+        """
+        if (self.max_bytes is None): return 0
+
+        entries = []
+        total = 0
+        for entry, stat in self.__stats():
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        evicted = 0
+        for _accessed, size, path in sorted(entries):
+            if (total <= self.max_bytes):
+                break
+            self.__remove(path)
+            total -= size
+            evicted += 1
+
+        self.__count('evictions', evicted)
+        return evicted
+
+    def clear(self):
+        for entry in self.__entries():
+            self.__remove(entry.path)
+
+    def size(self) -> int:
+        return sum(stat.st_size for _entry, stat in self.__stats())
+
+    def __getstate__(self):
+        # Locks can't be pickled, (ex: when a Vix is sent to a worker process). The files are shared, the lock is per process.
+        state = self.__dict__.copy()
+        del state['_DiskCache__lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __entries(self) -> list:
+        if not os.path.exists(self.directory): return []
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.startswith(TEMPORARY_PREFIX)]
+
+    def __stats(self):
+        # (entry, stat) of every cached file, skipping the ones evicted by another worker since the directory was listed
+        for entry in self.__entries():
+            try:
+                yield entry, entry.stat()
+            except FileNotFoundError:
+                continue
+
+    def __remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def __count(self, stat: str, amount: int = 1):
+        with self.__lock:
+            self.stats[stat] += amount
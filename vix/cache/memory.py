@@ -0,0 +1,102 @@
+import time
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class MemoryCache:
+    """
+    Bounded, thread safe, in-process cache with a time to live and least recently used eviction.
+    Sits in front of the disk caches in long running processes, so a hot ticker is served straight from memory
+    without touching the filesystem or parsing anything.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = None):
+        """
+        Parameters
+        ----------
+        max_entries :int
+                    Least recently used entries are evicted past this size.
+        ttl         :float
+                    Seconds an entry stays fresh. None never expires.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        self.__entries = OrderedDict()  # key => (expires_at, value), expires_at on the monotonic clock
+        self.__lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.__lock:
+            entry = self.__entries.get(key, _MISSING)
+
+            if (entry is _MISSING):
+                self.stats['misses'] += 1
+                return default
+
+            expires_at, value = entry
+            if ((expires_at is not None) and (time.monotonic() > expires_at)):
+                del self.__entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return default
+
+            self.__entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key, value, created: float = None):
+        """
+        created is the unix timestamp the value was made at, (ex: a chain's snapshot_time), when it is older than now.
+        The value is then only fresh for the rest of its ttl, not for a whole new one.
+        """
+        if (self.max_entries <= 0): return
+
+        expires_at = None
+        if (self.ttl is not None):
+            age = 0 if (created is None) else max(time.time() - created, 0)
+            expires_at = time.monotonic() + self.ttl - age
+
+        with self.__lock:
+            self.__entries[key] = (expires_at, value)
+            self.__entries.move_to_end(key)
+
+            while (len(self.__entries) > self.max_entries):
+                self.__entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get_or_set(self, key, build):
+        """
+        Returns the cached value for key, or calls build() and caches its result.
+        """
+        value = self.get(key, _MISSING)
+        if (value is _MISSING):
+            value = build()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def __getstate__(self):
+        # Locks can't be pickled, (ex: when a Vix is sent to a worker process). The copy starts out empty.
+        state = self.__dict__.copy()
+        state['_MemoryCache__entries'] = OrderedDict()
+        del state['_MemoryCache__lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
@@ -0,0 +1,88 @@
+import time
+import hashlib
+from vix.cache.disk import DiskCache
+from vix.cache.memory import MemoryCache
+from vix.options.chain import OptionChain
+from vix.options.binary import write_binary_chain, read_binary_chain
+
+CACHE_DIRECTORY = 'storage/cache/strips'
+CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+
+class StripCache:
+    """
+    Memoizes the near-term and next-term expirations selected from a chain, (the output of Expirations.find_option_terms()).
+    Recomputing a ticker while its chain snapshot is still fresh, (ex: as T shrinks through the day), then skips loading
+    the whole chain and selecting expirations, and only reruns the time, forward level and variance steps.
+
+    Strips are kept in memory and persisted in the binary chain format, keyed by ticker, requested date range and
+    scope, (the identity of the provider the chains come from, see ChainProvider.identity()), as every Vix shares the
+    directory. Each records the snapshot time of the chain it was selected from, and is fresh for ttl seconds after it.
+    """
+
+    def __init__(self, ttl: float, memory_size: int = 128, directory: str = CACHE_DIRECTORY, max_bytes: int = CACHE_MAX_BYTES,
+                 scope: str = ''):
+        self.ttl = ttl
+        self.scope = scope
+        self.memory = MemoryCache(max_entries=memory_size, ttl=ttl)
+        self.disk_cache = DiskCache(directory, ttl=ttl, max_bytes=max_bytes)
+
+    def get(self, ticker: str, time_range: list) -> tuple[dict, float] | None:
+        """
+        Returns
+        -------
+        strips      :tuple
+                    (selected_chain, snapshot_time), or None when there are no fresh strips for the ticker.
+        """
+        key = self.__key(ticker, time_range)
+
+        strips = self.memory.get(key)
+        if (strips and self.__fresh(strips[1])):
+            return strips
+
+        path = self.disk_cache.get(self.__name(key))
+        if not path: return None
+
+        try:
+            chain = read_binary_chain(path)
+        except Exception as e:
+            print('Error when reading strip cache: ', e)
+            return None
+
+        if ((not chain) or (len(chain) != 2) or (not self.__fresh(chain.snapshot_time))):
+            return None
+
+        strips = ({'nearTerm': chain.terms[0], 'nextTerm': chain.terms[1]}, chain.snapshot_time)
+        self.memory.set(key, strips)
+        return strips
+
+    def set(self, ticker: str, time_range: list, selected_chain: dict, snapshot_time: float) -> bool:
+        if (snapshot_time is None): return False  # We can't tell when strips without a snapshot go stale
+
+        key = self.__key(ticker, time_range)
+        self.memory.set(key, (selected_chain, snapshot_time))
+
+        chain = OptionChain(
+            symbol=ticker,
+            terms=[selected_chain['nearTerm'], selected_chain['nextTerm']],
+            snapshot_time=snapshot_time,
+        )
+        try:
+            with self.disk_cache.writing(self.__name(key)) as path:
+                write_binary_chain(chain, path)
+            return True
+        except Exception as e:
+            print('Error when caching strips: ', e)
+            return False
+
+    def __fresh(self, snapshot_time: float) -> bool:
+        if (snapshot_time is None): return False
+        return (self.ttl is None) or (time.time() - snapshot_time <= self.ttl)
+
+    def __key(self, ticker: str, time_range: list) -> tuple:
+        return (ticker, time_range[0].strftime('%Y-%m-%d'), time_range[1].strftime('%Y-%m-%d'), self.scope)
+
+    def __name(self, key: tuple) -> str:
+        # The scope may hold paths, only a digest of it goes in the file name
+        scope = hashlib.blake2b(key[-1].encode('utf-8'), digest_size=8).hexdigest()
+        return f"{'_'.join(key[:-1])}_{scope}.bin"
@@ -0,0 +1,136 @@
+import asyncio
+import requests
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.options.chain import OptionChain, PRUNE_BAND
+from vix.cache.disk import DiskCache
+from vix.metrics import Metrics
+from vix.http.session import build_session, should_retry, backoff_delay, DEFAULT_TIMEOUT
+
+
+class AsyncChainFetcher:
+    """
+    Fetches option chains for many tickers concurrently.
+    Requests run on worker threads through one pooled keep-alive session, while the event loop bounds how many are
+    in flight at once, and handles retries with backoff on 429/5xx without holding a thread while waiting.
+    Chains are yielded as they arrive, so the calculation can start on the first ticker while the rest download.
+    Each response is parsed incrementally into an OptionChain on a worker thread as it downloads, and cached, the same
+    way TDAmeritrade.get_parsed_option_chain() does.
+    Each fetch is recorded in metrics as an 'option_chain' step, with its source and the bytes downloaded.
+    With debug, every ticker gets the sample response, without any request, like TDAmeritrade(debug=True).
+    """
+
+    def __init__(self, api_key: str, concurrency: int = 8, cache: bool = True, timeout: tuple = DEFAULT_TIMEOUT,
+                 retries: int = 3, backoff: float = 0.5, base_url: str = None, disk_cache: DiskCache = None,
+                 metrics: Metrics = None, cache_format: str = 'binary', prune_band: float = PRUNE_BAND, debug: bool = False):
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.disk_cache = disk_cache
+        self.session = build_session(pool_size=concurrency)
+        self.metrics = metrics or Metrics()
+        self.cache_format = cache_format
+        self.prune_band = prune_band
+        self.debug = debug
+
+    async def fetch(self, ticker: str, time_range: list, semaphore: asyncio.Semaphore = None, record: dict = None,
+                    min_days: int = None, max_days: int = None) -> OptionChain:
+        """
+        Fetches a single option chain, from the cache when possible.
+        record, when given, is filled with the chain's source and bytes_fetched.
+
+        Returns
+        -------
+        chain       :OptionChain
+                    Same as TDAmeritrade.get_parsed_option_chain(), only expirations within min_days/max_days are kept.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        record = {} if (record is None) else record
+        td = self.__client(ticker)
+
+        if self.debug:
+            chain = await asyncio.to_thread(td.get_parsed_option_chain, time_range, min_days, max_days)
+            record.update({'source': td.source, 'bytes_fetched': 0})
+            return chain
+
+        # Memory mapped binary caches first, then JSON caches, like TDAmeritrade.get_parsed_option_chain()
+        cached_chain = await asyncio.to_thread(td.get_cached_parsed_option_chain, time_range, min_days, max_days)
+        if cached_chain:
+            record.update({'source': td.source, 'cache': 'hit', 'bytes_fetched': 0})
+            return cached_chain
+
+        record.update({'source': 'network', 'cache': 'miss', 'bytes_fetched': 0})
+
+        url = td.parsed_option_chain_url(time_range, min_days, max_days)
+
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                try:
+                    response = await asyncio.to_thread(self.session.get, url, timeout=self.timeout, stream=True)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if (attempt == self.retries):
+                        raise Exception('TDAmeritrade API Error: ', e)
+                    response = None
+
+            # Sleeping outside of the semaphore so other tickers can use the slot
+            if (response is None):
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                continue
+            if (should_retry(response) and attempt < self.retries):
+                response.close()
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, response))
+                continue
+            break
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            response.close()
+            raise Exception('TDAmeritrade API Error: ', e)
+
+        # The body downloads while it is parsed, so it still counts against the requests in flight
+        async with semaphore:
+            try:
+                chain = await asyncio.to_thread(td.read_option_chain, response, time_range, min_days, max_days)
+            finally:
+                response.close()
+
+        record['bytes_fetched'] = td.bytes_fetched
+        return chain
+
+    async def stream(self, tickers: list, time_range: list, min_days: int = None, max_days: int = None):
+        """
+        Yields (ticker, chain, error) in the order the chains arrive. error is None on success,
+        otherwise chain is None and error is the exception message.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(ticker):
+            try:
+                with self.metrics.step('option_chain', ticker=ticker) as record:
+                    chain = await self.fetch(ticker, time_range, semaphore, record, min_days, max_days)
+                    record['expirations'] = len(chain)
+                    return ticker, chain, None
+            except Exception as e:
+                return ticker, None, ' '.join(str(arg) for arg in e.args) or repr(e)
+
+        for next_result in asyncio.as_completed([fetch_one(ticker) for ticker in tickers]):
+            yield await next_result
+
+    def __client(self, ticker: str) -> TDAmeritrade:
+        kwargs = {'base_url': self.base_url} if self.base_url else {}
+        return TDAmeritrade(
+            ticker=ticker,
+            api_key=self.api_key,
+            cache=self.cache,
+            debug=self.debug,
+            session=self.session,
+            timeout=self.timeout,
+            disk_cache=self.disk_cache,
+            cache_format=self.cache_format,
+            prune_band=self.prune_band,
+            **kwargs
+        )
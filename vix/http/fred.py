@@ -1,26 +1,39 @@
-from bs4 import BeautifulSoup
-import os
 import sys
 import json
-import requests
+import bisect
 import datetime
+from vix.http.session import shared_session, get_with_retry
+from vix.cache.disk import DiskCache
+
+CACHE_DIRECTORY = 'storage/cache/rates'
+CACHE_TTL = 24 * 60 * 60  # One day
+CACHE_MAX_BYTES = 4 * 1024 ** 2
+HISTORY_URL = 'https://fred.stlouisfed.org/graph/fredgraph.csv?id=DTB3'
+
+_rate_history = {}  # Cache name => ([dates], [rates]), the history is parsed once per process
 
 
 class Fred:
     """
     Rates are automatically cached for one day, as the Fred website only updates once per day anyway.
+    After scrape_3m_treasury(), source is where the rate came from, ('sample', 'disk_cache', 'network' or 'history').
+    BeautifulSoup and requests are only imported when the website is actually scraped.
+
+    With as_of, (a unix timestamp), the rate is the one published on that day, looked up in the full DTB3 series.
     """
-    def __init__(self, debug: bool = False, cache: bool = True):
+    def __init__(self, debug: bool = False, cache: bool = True, disk_cache: DiskCache = None, as_of: float = None):
         self.debug = debug
         self.cache = cache
-        self.timestamp = datetime.datetime.now()
+        self.timestamp = datetime.datetime.fromtimestamp(as_of) if (as_of is not None) else datetime.datetime.now()
+        self.disk_cache = disk_cache or DiskCache(CACHE_DIRECTORY, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES)
+        self.source = None
 
     def send_request(self, url: str) -> any:
+        import requests
         headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
 
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
+            response = get_with_retry(shared_session(), url, headers=headers)
 
         except requests.exceptions.RequestException as e:
             print('Error when parsing Fred website: ', e)
@@ -30,31 +43,81 @@ class Fred:
 
     def scrape_3m_treasury(self) -> float:
         """
-        Scrapes the St Louis Fed website for the current 3m treasury yield.
+        Scrapes the St Louis Fed website for the current 3m treasury yield, (or the historical yield on a past as_of).
         """
 
-        if self.debug: return 4.87
+        if self.debug:
+            self.source = 'sample'
+            return 4.87
 
         if self.cache:
             cached_rates = self.__check_rates_cache()
-            if cached_rates: return float(cached_rates['rate'])
+            if cached_rates:
+                self.source = 'disk_cache'
+                return float(cached_rates['rate'])
+
+        if (self.timestamp.date() < datetime.date.today()):
+            self.source = 'history'
+            treasury_rate = self.historical_3m_treasury(self.timestamp.date())
+            if treasury_rate: self.__cache_rates_data(treasury_rate)
+            return treasury_rate
+
+        self.source = 'network'
 
         url = 'https://fred.stlouisfed.org/series/DTB3'
         response = self.send_request(url)
         if (not response): return False
 
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.text, 'html.parser')
         treasury_rate = soup.find("span", {"class": "series-meta-observation-value"}).text
         self.__cache_rates_data(float(treasury_rate))
         return float(treasury_rate)
 
+    def historical_3m_treasury(self, date: datetime.date) -> float:
+        """
+        The 3m treasury yield on date, or the last one published before it, (weekends and holidays have none).
+        The whole DTB3 series is downloaded as CSV, (once a day at most), and parsed once per process.
+        """
+        history = self.__rate_history()
+        if (not history): return False
+
+        dates, rates = history
+        i = bisect.bisect_right(dates, date.strftime('%Y-%m-%d'))
+        if (i == 0):
+            print('Error when looking up the 3m treasury yield history: No rate published before ', date)
+            return False
+
+        return rates[i - 1]
+
+    def __rate_history(self) -> tuple[list, list] | bool:
+        name = f"rates_history_{datetime.date.today().strftime('%Y-%m-%d')}.csv"
+        if (name in _rate_history): return _rate_history[name]
+
+        cache_file = self.disk_cache.get(name) if self.cache else None
+        if cache_file:
+            with open(cache_file, 'r') as f:
+                text = f.read()
+        else:
+            response = self.send_request(HISTORY_URL)
+            if (not response): return False
+            text = response.text
+            if self.cache:
+                self.disk_cache.write_bytes(name, text.encode('utf-8'))
+
+        dates = []
+        rates = []
+        for line in text.splitlines()[1:]:  # DATE,DTB3 header
+            date, _, value = line.partition(',')
+            if (value.strip() in ['', '.']): continue  # Days without an observation
+            dates.append(date.strip())
+            rates.append(float(value))
+
+        _rate_history[name] = (dates, rates)
+        return dates, rates
+
     def __cache_rates_data(self, value: float) -> bool:
-        cache_directory = 'storage/cache/rates/'
         timestamp_string = datetime.datetime.strftime(self.timestamp, '%Y-%m-%d')
-        cache_file = f"{cache_directory}/rates_{timestamp_string}.json"
-
-        if os.path.exists(cache_directory) == False:
-            os.makedirs(cache_directory)
 
         cache_data = {
             'rate': value,
@@ -62,21 +125,17 @@ class Fred:
         }
 
         try:
-            with open(cache_file, 'w') as f:
-                f.write(json.dumps(cache_data))
+            self.disk_cache.write_bytes(f"rates_{timestamp_string}.json", json.dumps(cache_data).encode('utf-8'))
             return True
         except Exception as e:
             print('Error when caching rates data: ', e)
             return False
 
     def __check_rates_cache(self) -> dict | bool:
-        cache_directory = 'storage/cache/rates/'
         timestamp_string = datetime.datetime.strftime(self.timestamp, '%Y-%m-%d')
-        cache_file = f"{cache_directory}/rates_{timestamp_string}.json"
-
-        if not os.path.exists(cache_directory): return False
+        cache_file = self.disk_cache.get(f"rates_{timestamp_string}.json")
 
-        if os.path.exists(cache_file):
+        if cache_file:
             try:
                 with open(cache_file, 'r') as f:
                     return json.loads(f.read())
@@ -95,6 +154,7 @@ class Fred:
         response = self.send_request(url)
 
         try:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(response.text, 'html.parser')
             spx_vix = soup.find("span", {"class": "series-meta-observation-value"}).text
         except Exception as e:
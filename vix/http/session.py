@@ -0,0 +1,72 @@
+import time
+
+# requests is only imported once a request is actually sent, so runs served from the caches never load it.
+
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) seconds. Option chains can be ~10MB, so the read timeout is generous.
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+_shared_session = None
+
+
+def build_session(pool_size: int = 10) -> 'requests.Session':
+    """
+    A requests Session keeps connections alive and reuses them across requests to the same host,
+    instead of opening a new connection (and TLS handshake) for every call to requests.get().
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def shared_session() -> 'requests.Session':
+    """
+    One session per process, so every TDAmeritrade and Fred instance reuses the same connection pool.
+    """
+    global _shared_session
+    if (_shared_session is None):
+        _shared_session = build_session()
+    return _shared_session
+
+
+def should_retry(response: 'requests.Response') -> bool:
+    return response.status_code in RETRY_STATUSES
+
+
+def backoff_delay(attempt: int, backoff: float, response: 'requests.Response' = None) -> float:
+    """
+    Exponential backoff, (backoff, 2*backoff, 4*backoff...), unless the server tells us how long to wait.
+    """
+    if (response is not None):
+        retry_after = response.headers.get('Retry-After')
+        if (retry_after and retry_after.isdigit()):
+            return float(retry_after)
+
+    return backoff * pow(2, attempt)
+
+
+def get_with_retry(session: 'requests.Session', url: str, retries: int = 3, backoff: float = 0.5, timeout: tuple = DEFAULT_TIMEOUT, **kwargs) -> 'requests.Response':
+    """
+    GET a url, retrying with backoff on 429/5xx responses and connection errors.
+    Raises requests.exceptions.RequestException once the retries are exhausted.
+    """
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if (attempt == retries): raise
+            time.sleep(backoff_delay(attempt, backoff))
+            continue
+
+        if (should_retry(response) and attempt < retries):
+            time.sleep(backoff_delay(attempt, backoff, response))
+            continue
+
+        response.raise_for_status()
+        return response
@@ -1,23 +1,56 @@
+import time
 import datetime
-import requests
 import json
-import os
+from vix.http.session import shared_session, get_with_retry, DEFAULT_TIMEOUT
+from vix.options.chain import OptionChain, PRUNE_BAND
+from vix.options.stream import parse_option_chain_file, parse_option_chain_chunks, CHUNK_SIZE
+from vix.options.binary import write_binary_chain, read_binary_chain
+from vix.cache.disk import DiskCache
+
+CACHE_DIRECTORY = 'storage/cache/td'
+CACHE_TTL = 24 * 60 * 60  # One day
+CACHE_MAX_BYTES = 2 * 1024 ** 3
 
 
 class TDAmeritrade:
     """
     Responses from TD Ameritrade are cached in storage/cache/td/. 
     These responses can be pretty large, like 10MB large, so we generally don't want to be fetching them everytime.
-    We will refer to the cached response for 1 day, and then fetch a new one to keep the data accurate.
+    We will refer to the cached response for 1 day, and then fetch a new one to keep the data accurate. Pass a DiskCache
+    with a shorter ttl, (ex: a few minutes), for intraday chains.
     When using the cached data, you will still notice differences in the responses; this is because time is a factor.
+
+    With cache_format='binary', (the default), parsed chains are cached as memory mapped numpy columns, (.bin),
+    which load without decoding any JSON. Existing .json caches are still read as a fallback. A binary cache only holds
+    the expirations and strikes it was requested with, so its name has the days to expiration window and prune band,
+    and calls with different windows, (ex: the VIX and term structures), each keep their own.
+
+    After get_parsed_option_chain(), source is where the chain came from, ('sample', 'binary_cache', 'json_cache' or
+    'network'), and bytes_fetched is the size of the response downloaded for it.
+
+    Chains are trimmed as early as possible. With binary caching, (or no caching), the request itself only asks for
+    the expirations within the days to expiration window, and while parsing, the deep out of the money strikes the VIX
+    never reaches are dropped, (see OptionTerm.pruned()), so only the pruned chain is ever cached. prune_band=None keeps
+    every strike. JSON caches hold the raw response, which is requested whole since any window can be read from it.
     """
 
-    def __init__(self, ticker: str, api_key: str, cache: bool = True, debug: bool = False):
+    def __init__(self, ticker: str, api_key: str, cache: bool = True, debug: bool = False, session: 'requests.Session' = None,
+                 timeout: tuple = DEFAULT_TIMEOUT, retries: int = 3, base_url: str = 'https://api.tdameritrade.com/v1/marketdata',
+                 cache_format: str = 'binary', disk_cache: DiskCache = None, prune_band: float = PRUNE_BAND):
         self.ticker = ticker
         self.api_key = api_key
         self.cache = cache
         self.debug = debug
-        self.domain = 'api.tdameritrade.com/v1/marketdata'
+        self.session = session
+        self.timeout = timeout
+        self.retries = retries
+        self.base_url = base_url
+        self.sample_response_path = 'tests/fixtures/sample_td_spx_response.json'
+        self.cache_format = cache_format
+        self.disk_cache = disk_cache or DiskCache(CACHE_DIRECTORY, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES)
+        self.prune_band = prune_band
+        self.source = None
+        self.bytes_fetched = 0
 
     def get_option_chain(self, time_range: list) -> dict:
         """
@@ -37,22 +70,153 @@ class TDAmeritrade:
 
         if self.debug: return self.__return_sample_response()
 
+        cached_data = self.get_cached_option_chain(time_range)
+        if cached_data: return cached_data
+
+        try:
+            response = get_with_retry(self.__session(), self.option_chain_url(time_range), retries=self.retries, timeout=self.timeout)
+        except Exception as e:
+            raise Exception('TDAmeritrade API Error: ', e)
+
+        return self.parse_option_chain_response(response, time_range)
+
+    def get_parsed_option_chain(self, time_range: list, min_days: int = None, max_days: int = None) -> OptionChain:
+        """
+        Same as get_option_chain(), but returns a columnar OptionChain. The response, (or cached response), is parsed
+        incrementally and never held in memory as a whole, and only expirations within min_days/max_days are kept.
+
+        Parameters
+        ----------
+        time_range  :list
+                    List containing [from_date, to_date], each as datetime.datetime
+        min_days    :int
+        max_days    :int
+                    Window on days to expiration.
+
+        Returns
+        -------
+        chain       :OptionChain
+        """
+        if self.debug:
+            self.source = 'sample'
+            return parse_option_chain_file(self.sample_response_path, min_days, max_days, self.prune_band)
+
+        cached_chain = self.get_cached_parsed_option_chain(time_range, min_days, max_days)
+        if cached_chain: return cached_chain
+
+        try:
+            response = get_with_retry(self.__session(), self.parsed_option_chain_url(time_range, min_days, max_days), retries=self.retries, timeout=self.timeout, stream=True)
+        except Exception as e:
+            raise Exception('TDAmeritrade API Error: ', e)
+
+        return self.read_option_chain(response, time_range, min_days, max_days)
+
+    def read_option_chain(self, response: 'requests.Response', time_range: list, min_days: int = None, max_days: int = None) -> OptionChain:
+        """
+        Parses a streamed chain response, (requested with stream=True), as it downloads, and caches it, see
+        get_parsed_option_chain(). Split from it so the async fetcher can send requests itself.
+        """
         formatted_time_range = self.__format_date(time_range)
-        from_date, to_date = formatted_time_range
+        binary = ((not self.cache) or (self.cache_format == 'binary'))
+        snapshot_time = time.time()
+        self.source = 'network'
 
-        cached_data = self.__check_cache(self.ticker, formatted_time_range)
-        if cached_data: return cached_data
+        if binary:
+            chain = parse_option_chain_chunks(self.__count_bytes(response.iter_content(CHUNK_SIZE)), min_days, max_days, self.prune_band)
+            chain.snapshot_time = snapshot_time
+            if self.cache:
+                self.__cache_binary(chain, formatted_time_range, min_days, max_days)
+            return chain
+
+        # Writing the response straight to the cache, then parsing it from disk.
+        cache_name = self.__cache_name(self.ticker, formatted_time_range)
+        with self.disk_cache.writing(cache_name) as path:
+            with open(path, 'wb') as f:
+                for chunk in self.__count_bytes(response.iter_content(CHUNK_SIZE)):
+                    f.write(chunk)
+
+            # Parsing before the file is moved into place, so a bad response is never cached
+            chain = parse_option_chain_file(path, min_days, max_days, self.prune_band)
+            chain.snapshot_time = snapshot_time
+            return chain
 
-        url = f"https://{self.domain}/chains?apikey={self.api_key}&symbol={self.ticker}&from_date={from_date}&to_date={to_date}"
+    def get_cached_parsed_option_chain(self, time_range: list, min_days: int = None, max_days: int = None) -> OptionChain | bool:
+        if not self.cache: return False
+        return self.__check_parsed_cache(self.__format_date(time_range), min_days, max_days)
 
+    def __check_parsed_cache(self, time_range: tuple, min_days: int, max_days: int) -> OptionChain | bool:
+        """
+        Binary caches first, then JSON caches. A JSON cache hit is converted to binary so the next read is fast.
+        """
+        # The cache of this window, or the one of every expiration, (see get_cached_option_chain()), which covers it
+        for window in dict.fromkeys([(min_days, max_days), (None, None)]):
+            binary_file = self.disk_cache.get(self.__binary_cache_name(time_range, *window))
+            if not binary_file: continue
+
+            try:
+                chain = read_binary_chain(binary_file, min_days, max_days, self.prune_band)
+                if chain:
+                    self.source = 'binary_cache'
+                    return chain
+            except Exception as e:
+                print('Error when reading binary TD Ameritrade cache: ', e)
+
+        json_file = self.disk_cache.get(self.__cache_name(self.ticker, time_range))
+        if json_file:
+            chain = parse_option_chain_file(json_file, min_days, max_days, self.prune_band)
+            chain.snapshot_time = self.disk_cache.written_at(self.__cache_name(self.ticker, time_range))
+            self.source = 'json_cache'
+            if (self.cache_format == 'binary'):
+                self.__cache_binary(chain, time_range, min_days, max_days)
+            return chain
+
+        return False
+
+    def __session(self) -> 'requests.Session':
+        # The shared session, (and requests with it), is only created once a chain isn't in the cache.
+        if (self.session is None):
+            self.session = shared_session()
+        return self.session
+
+    def __count_bytes(self, chunks):
+        for chunk in chunks:
+            self.bytes_fetched += len(chunk)
+            yield chunk
+
+    def __cache_binary(self, chain: OptionChain, time_range: tuple, min_days: int = None, max_days: int = None) -> bool:
+        try:
+            with self.disk_cache.writing(self.__binary_cache_name(time_range, min_days, max_days)) as path:
+                write_binary_chain(chain, path, min_days, max_days, self.prune_band)
+            return True
+        except Exception as e:
+            print('Error when caching TD Ameritrade response: ', e)
+            return False
+
+    def parsed_option_chain_url(self, time_range: list, min_days: int = None, max_days: int = None) -> str:
+        # Only the expirations in the window are requested, unless the raw response is cached for any window
+        if ((not self.cache) or (self.cache_format == 'binary')):
+            time_range = request_range(time_range, min_days, max_days)
+        return self.option_chain_url(time_range)
+
+    def option_chain_url(self, time_range: list) -> str:
+        from_date, to_date = self.__format_date(time_range)
+        return f"{self.base_url}/chains?apikey={self.api_key}&symbol={self.ticker}&fromDate={from_date}&toDate={to_date}"
+
+    def get_cached_option_chain(self, time_range: list) -> dict | bool:
+        if not self.cache: return False
+        return self.__check_cache(self.ticker, self.__format_date(time_range))
+
+    def parse_option_chain_response(self, response: 'requests.Response', time_range: list) -> dict:
+        """
+        Decodes a chain response, and caches it if caching is enabled.
+        Split from get_option_chain() so the async fetcher can send requests itself.
+        """
         try:
-            response = requests.get(url)
-            response.raise_for_status()
             chain = response.json()
 
             if isinstance(chain, dict):
                 if self.cache:
-                    self.__cache_response(self.ticker, chain, formatted_time_range)
+                    self.__cache_response(self.ticker, chain, self.__format_date(time_range))
                 return chain
 
             else:
@@ -74,11 +238,9 @@ class TDAmeritrade:
         chain   :dict
                 The response from the TD Ameritrade API
         """
-        cache_directory = 'storage/cache/td/'
-        filename = f"{ticker}_{'_'.join(time_range)}.json"
-        cache_file = f"{cache_directory}/{filename}"
+        cache_file = self.disk_cache.get(self.__cache_name(ticker, time_range))
 
-        if os.path.exists(cache_file):
+        if cache_file:
             with open(cache_file, 'r') as f:
                 return json.loads(f.read())
         else:
@@ -100,23 +262,29 @@ class TDAmeritrade:
         bool    :bool
                 True if the response was cached successfully, False otherwise.
         """
-        cache_directory = 'storage/cache/td/'
-        filename = f"{ticker}_{'_'.join(time_range)}.json"
-        cache_file = f"{cache_directory}/{filename}"
-
-        if os.path.exists(cache_directory) == False:
-            os.makedirs(cache_directory)
-
         try:
-            with open(cache_file, 'w') as f:
-                f.write(json.dumps(chain))
-            return True
+            self.disk_cache.write_bytes(self.__cache_name(ticker, time_range), json.dumps(chain).encode('utf-8'))
         except Exception as e:
             print('Error when caching TD Ameritrade response: ', e)
             return False
 
+        # The binary cache holds every expiration, it is what get_parsed_option_chain() reads.
+        if (self.cache_format == 'binary'):
+            return self.__cache_binary(OptionChain.from_td_response(chain, prune_band=self.prune_band), time_range)
+
+        return True
+
+    def __cache_name(self, ticker: str, time_range: tuple, extension: str = 'json') -> str:
+        return f"{ticker}_{'_'.join(time_range)}.{extension}"
+
+    def __binary_cache_name(self, time_range: tuple, min_days: int = None, max_days: int = None) -> str:
+        # Ex: SPY_2023-03-01_2023-06-01_8-120d_p0.1.bin
+        window = '-'.join('any' if (days is None) else str(days) for days in [min_days, max_days])
+        band = 'unpruned' if (self.prune_band is None) else f"p{self.prune_band}"
+        return self.__cache_name(self.ticker, time_range + (f"{window}d", band), 'bin')
+
     def __return_sample_response(self):
-        txtfile = open('tests/fixtures/sample_td_spx_response.json', "r")
+        txtfile = open(self.sample_response_path, "r")
         return json.loads(txtfile.read())
 
     def __format_date(self, dates: list) -> tuple:
@@ -126,3 +294,17 @@ class TDAmeritrade:
             results.append(fdate)
 
         return tuple(results)
+
+
+def request_range(time_range: list, min_days: int = None, max_days: int = None) -> list:
+    """
+    Narrows [from_date, to_date] to the expirations within the days to expiration window, with a day of slack on each
+    side, since TD Ameritrade counts days to expiration on its own clock.
+    """
+    from_date, to_date = time_range
+    if min_days:
+        from_date = max(from_date, time_range[0] + datetime.timedelta(days=min_days - 1))
+    if (max_days is not None):
+        to_date = min(to_date, time_range[0] + datetime.timedelta(days=max_days + 1))
+
+    return [from_date, to_date]
@@ -0,0 +1,245 @@
+import numpy as np
+from vix.options.chain import OptionTerm, OptionSide
+from vix.options.options import forward_level_rows
+from vix.math import calculate_t, calculate_f, calculate_vix, term_rate
+from vix.vectorized_volatility import VectorizedVolatility
+
+RESUM_EVERY = 1024  # Weight updates after which a term's running sum is summed again from its weights, so rounding can't drift
+
+
+class IncrementalVolatility:
+    """
+    Keeps the state of the VIX equation for one selected chain, and applies quote updates to it as they arrive, so a
+    tick-level VIX costs time proportional to the strikes a tick changed, not to the size of the chain.
+
+    Each term keeps its strip, (see VectorizedVolatility.term_strip()), with the weight ∆Ki/Ki**2 * q of every strike and
+    their running sum, the zero bid truncation bounds, and the call and put pairs the forward level is picked from.
+    An update which only moves a quote inside the strip changes one weight and the running sum. The strip is only
+    rebuilt when K0 changes, or when a bid or ask crosses zero where the truncation walks, (which can move a bound).
+    The forward level strike is only searched again when its own call and put prices move apart.
+
+    Produces the same variances as VectorizedVolatility on the updated chain, up to the rounding of the running sums.
+
+    Updates are dicts, (see vix.options.quotes):
+
+        {'expiration': '2023-03-09', 'side': 'call', 'strike': 3900.0, 'bid': 12.1, 'ask': 12.4, 'last': 12.3}
+
+    bid, ask and last are optional, a missing one keeps its previous value. Updates for other expirations, or for
+    strikes which aren't in the chain, are counted in self.stats['ignored'].
+    """
+
+    def __init__(self, selected_chain: dict, r: float | dict):
+        """
+        Parameters
+        ----------
+        selected_chain  :dict
+                        {'nearTerm': OptionTerm, 'nextTerm': OptionTerm}, copied, the chain itself is never modified.
+        r               :float | dict
+                        Risk-free rate, or one per term.
+        """
+        self.r = r
+        self.engine = VectorizedVolatility()
+        self.terms = {term: _TermState(options, self.engine) for term, options in selected_chain.items()}
+        self.selected_chain = {term: state.options for term, state in self.terms.items()}
+        self.stats = {'updates': 0, 'ignored': 0, 'weights_updated': 0, 'strips_built': 0, 'forward_searches': 0}
+
+        self.__expirations = {state.options.expiration_date: state for state in self.terms.values()}
+
+    def apply(self, updates: list) -> int:
+        """
+        Applies quote updates, returns how many of them were for the selected terms.
+        """
+        applied = 0
+        for update in updates:
+            state = self.__expirations.get(update['expiration'])
+            if ((state is None) or (not state.update(update, self.stats))):
+                self.stats['ignored'] += 1
+                continue
+            applied += 1
+
+        self.stats['updates'] += applied
+        return applied
+
+    def variances(self, as_of: float = None) -> tuple[dict, dict, dict]:
+        """
+        Returns
+        -------
+        variances   :tuple
+                    (vol, t, tminutes), each keyed by term, with T measured from as_of, (now by default).
+        """
+        t, tminutes = calculate_t(self.selected_chain, as_of)
+        f = calculate_f(t, self.r, self.forward_level())
+
+        vol = {}
+        for term, state in self.terms.items():
+            strip = state.strip(f[term], self.stats)
+            vol[term] = self.engine.strip_variance(strip, f[term], t[term], term_rate(self.r, term))
+
+        return vol, t, tminutes
+
+    def value(self, as_of: float = None) -> float:
+        return calculate_vix(*self.variances(as_of))
+
+    def forward_level(self) -> dict:
+        # Same shape as determine_forward_level_strike()
+        return {term: state.forward_level() for term, state in self.terms.items()}
+
+
+class _TermState:
+    """
+    Running state of one term. Quote columns are copies, updated in place.
+    """
+
+    def __init__(self, options: OptionTerm, engine: VectorizedVolatility):
+        self.engine = engine
+        self.options = OptionTerm(
+            expiration_date=options.expiration_date,
+            expiration_timestamp=options.expiration_timestamp,
+            days_to_expiration=options.days_to_expiration,
+            call=_copy(options.call),
+            put=_copy(options.put),
+        )
+        self.indexes = {side: {strike: i for i, strike in enumerate(option.strikes.tolist())} for side, option in self.options.sides().items()}
+
+        # Call and put pairs quoted at the same strike, the rows the forward level is picked from
+        self.common, self.common_call, self.common_put = np.intersect1d(self.options.call.strikes, self.options.put.strikes, return_indices=True)
+        self.rows = {strike: row for row, strike in enumerate(self.common.tolist())}
+        self.diff = _diff(self.options.call.last[self.common_call], self.options.put.last[self.common_put])
+        self.forward_row = -1
+        self.__search_forward_level()
+
+        self.__strip = None  # Built on the first strip(), and whenever an update can move a truncation bound
+        self.__resum = 0
+
+    def update(self, update: dict, stats: dict) -> bool:
+        side = str(update['side']).lower()
+        i = self.indexes.get(side, {}).get(float(update['strike']))
+        if (i is None): return False
+
+        option = self.options.call if (side == 'call') else self.options.put
+        was_zero = (option.bid[i] == 0) or (option.ask[i] == 0)
+        old_mid = option.mid[i]
+        old_last = option.last[i]
+
+        option.bid[i] = update.get('bid', option.bid[i])
+        option.ask[i] = update.get('ask', option.ask[i])
+        option.last[i] = update.get('last', option.last[i])
+        option.mid[i] = (option.bid[i] + option.ask[i]) / 2
+
+        if ((option.last[i] != old_last) and (option.strikes[i] in self.rows)):
+            self.__update_forward_level(self.rows[option.strikes[i]], stats)
+
+        if (self.__strip is None): return True
+
+        is_zero = (option.bid[i] == 0) or (option.ask[i] == 0)
+        if ((is_zero != was_zero) and self.__in_truncation(side, i)):
+            self.__strip = None
+        elif (option.mid[i] != old_mid):
+            self.__update_weight(side, i, stats)
+
+        return True
+
+    def strip(self, f: float, stats: dict) -> dict:
+        # Rebuilt when K0 moved with F, which is a binary search on the strikes
+        if ((self.__strip is None) or (self.__strip['k0'] != self.engine.k0(f, self.options))):
+            self.__build_strip(f)
+            stats['strips_built'] += 1
+
+        return self.__strip
+
+    def forward_level(self) -> dict:
+        if (self.forward_row < 0):
+            raise Exception('No call and put quoted at the same strike to determine the forward level.', self.options.expiration_date)
+
+        return {
+            'strikePrice': float(self.common[self.forward_row]),
+            'call': float(self.options.call.last[self.common_call[self.forward_row]]),
+            'put': float(self.options.put.last[self.common_put[self.forward_row]]),
+        }
+
+    def __build_strip(self, f: float):
+        strip = self.engine.term_strip(f, self.options)
+        call, put = self.options.call, self.options.put
+        k0 = strip['k0']
+
+        # Where the strip's arrays start and end in the columns, (puts below K0, K0 twice, calls above K0)
+        self.call_k0 = int(np.searchsorted(call.strikes, k0))
+        self.put_k0 = int(np.searchsorted(put.strikes, k0))
+        self.n_puts = int(np.searchsorted(strip['strikes'], k0))
+        self.put_bound = self.put_k0 - self.n_puts
+        self.call_bound = self.call_k0 + len(strip['strikes']) - self.n_puts - 2
+
+        # The truncation walks away from K0 until its second zero bid, so zero bids past it can't move a bound
+        call_zeros = np.flatnonzero((call.bid[self.call_k0:] == 0) | (call.ask[self.call_k0:] == 0))
+        put_zeros = np.flatnonzero((put.bid[self.put_k0::-1] == 0) | (put.ask[self.put_k0::-1] == 0))
+        self.call_limit = (self.call_k0 + int(call_zeros[1])) if (len(call_zeros) > 1) else len(call)
+        self.put_limit = (self.put_k0 - int(put_zeros[1])) if (len(put_zeros) > 1) else -1
+
+        self.__strip = strip
+        self.__resum = 0
+
+    def __in_truncation(self, side: str, i: int) -> bool:
+        if (side == 'call'):
+            return (self.call_k0 <= i <= self.call_limit)
+        return (self.put_limit <= i <= self.put_k0)
+
+    def __update_weight(self, side: str, i: int, stats: dict):
+        strip = self.__strip
+        call, put = self.options.call, self.options.put
+
+        if (i == (self.call_k0 if (side == 'call') else self.put_k0)):
+            # "The K0 put and call prices are averaged to produce a single value.", at both K0 positions of the strip
+            positions = [self.n_puts, self.n_puts + 1]
+            quote = (call.mid[self.call_k0] + put.mid[self.put_k0]) / 2
+        elif ((side == 'call') and (self.call_k0 < i <= self.call_bound)):
+            positions = [self.n_puts + 1 + i - self.call_k0]
+            quote = call.mid[i]
+        elif ((side == 'put') and (self.put_bound <= i < self.put_k0)):
+            positions = [i - self.put_bound]
+            quote = put.mid[i]
+        else:
+            return  # Outside of the strip
+
+        for position in positions:
+            strip['quotes'][position] = quote
+            weight = strip['delta_k'][position] / (strip['strikes'][position] ** 2) * quote
+            strip['weight_sum'] += float(weight - strip['weights'][position])
+            strip['weights'][position] = weight
+
+        self.__resum += 1
+        if (self.__resum >= RESUM_EVERY):
+            strip['weight_sum'] = float(np.sum(strip['weights']))
+            self.__resum = 0
+
+        stats['weights_updated'] += 1
+
+    def __update_forward_level(self, row: int, stats: dict):
+        previous = self.diff[row]
+        self.diff[row] = _diff(self.options.call.last[self.common_call[row]], self.options.put.last[self.common_put[row]])
+
+        if (row == self.forward_row):
+            # The smallest difference grew, another strike may have it now
+            if (self.diff[row] > previous):
+                self.__search_forward_level()
+                stats['forward_searches'] += 1
+            return
+
+        # On ties the highest strike wins, see forward_level_rows()
+        current = self.diff[self.forward_row] if (self.forward_row >= 0) else np.inf
+        if ((self.diff[row] < current) or ((self.diff[row] == current) and (row > self.forward_row) and np.isfinite(current))):
+            self.forward_row = row
+
+    def __search_forward_level(self):
+        segment = np.zeros(len(self.common), dtype=np.int64)
+        self.forward_row = int(forward_level_rows(segment, self.options.call.last[self.common_call], self.options.put.last[self.common_put], 1)[0])
+
+
+def _copy(side: OptionSide) -> OptionSide:
+    # Strikes never change, the quotes are written to
+    return OptionSide.from_columns(side.strikes, np.array(side.bid), np.array(side.ask), np.array(side.last), np.array(side.mid))
+
+
+def _diff(call_last, put_last):
+    # |call - put|, infinite where forward_level_rows() would skip the pair, (a zero or missing price)
+    valid = (call_last != 0) & (put_last != 0) & np.isfinite(call_last) & np.isfinite(put_last)
+    return np.where(valid, np.abs(np.subtract(call_last, put_last)), np.inf)
@@ -1,41 +1,66 @@
+import math
 import datetime
 from pytz import timezone
 from math import e
 
-def calculate_t(selected_chain: dict) -> tuple[dict, dict]:
+def calculate_t(selected_chain: dict, as_of: float = None) -> tuple[dict, dict]:
     """
     T = {MCurrent day + MSettlement day + MOther days}/ Minutes in a year 
     https://www.sfu.ca/~poitras/419_VIX.pdf (page 5)
+
+    as_of is the unix timestamp T is measured from, (ex: when a historical snapshot was taken), now by default.
     """
     # Fetching dates from selected_chain
     selected_dates = {
-        'nearTerm': selected_chain['nearTerm']['call']['dateInfo'],
-        'nextTerm': selected_chain['nextTerm']['call']['dateInfo']
+        'nearTerm': selected_chain['nearTerm'].expiration_datetime_zone,
+        'nextTerm': selected_chain['nextTerm'].expiration_datetime_zone
     }
 
-    # Some time variables we will need
-    now = timezone('US/Central').localize(datetime.datetime.now())
+    now, minutes_to_midnight = calculation_time(as_of)
+
+    t = {}
+    tminutes = {}
+
+    for term, date_time_zone in selected_dates.items():
+        t[term], tminutes[term] = calculate_term_t(date_time_zone, now, minutes_to_midnight)
+
+    return t, tminutes
+
+
+def calculation_time(as_of: float = None) -> tuple[datetime.datetime, float]:
+    """
+    The time T is measured from, (as_of or now, in US/Central), and the minutes left until midnight. MCurrentDay
+    """
+    now = timezone('US/Central').localize(datetime.datetime.fromtimestamp(as_of) if (as_of is not None) else datetime.datetime.now())
     midnight = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0)
     minutes_to_midnight = ((midnight - now).seconds / 60)  # MCurrentDay
+
+    return now, minutes_to_midnight
+
+
+def calculate_term_t(date_time_zone: datetime.datetime, now: datetime.datetime, minutes_to_midnight: float) -> tuple[float, float]:
+    """
+    T and the minutes to expiration of a single expiration, see calculate_t().
+    """
     minutes_in_year = 525600
 
-    t = {}
-    tminutes = {}
+    minutes_from_now = abs(date_time_zone - now).total_seconds()  # Calculating diff in seconds
+    minutes_to_expire = (minutes_from_now / 60)  # MOther days
 
-    for term, date_info in selected_dates.items():
-        minutes_from_now = abs(date_info['dateTimeZone'] - now).total_seconds()  # Calculating diff in seconds
-        minutes_to_expire = (minutes_from_now / 60)  # MOther days
-        
-        expiration_hour = date_info['dateTimeZone'].hour
-        minutes_to_settlement_day = (expiration_hour * 60) - 60 # 1 hour before opening or closing depending on the option
+    expiration_hour = date_time_zone.hour
+    minutes_to_settlement_day = (expiration_hour * 60) - 60 # 1 hour before opening or closing depending on the option
 
-        tminutes[term] = minutes_to_expire
-        t[term] = (minutes_to_midnight + minutes_to_settlement_day + minutes_to_expire) / minutes_in_year  # T equation
+    t = (minutes_to_midnight + minutes_to_settlement_day + minutes_to_expire) / minutes_in_year  # T equation
 
-    return t, tminutes
+    return t, minutes_to_expire
+
+
+def term_rate(r: float | dict, term: str) -> float:
+    # r is one rate for both terms, or a rate per term, {'nearTerm': r1, 'nextTerm': r2}, see YieldCurve.
+    return r[term] if isinstance(r, dict) else r
 
 
-def calculate_f(t: dict, r: float, forward_level: dict) -> dict:
+def calculate_f(t: dict, r: float | dict, forward_level: dict) -> dict:
     """
     F = Strike Price + eRT × (Call Price – Put Price)
     "Determine the forward SPX level, F, by identifying the strike price at which the
@@ -45,11 +70,35 @@ def calculate_f(t: dict, r: float, forward_level: dict) -> dict:
     """
     f = {}
 
-    strike_price = forward_level['nearTerm'][0]['strikePrice']
+    strike_price = forward_level['nearTerm']['strikePrice']
 
     for term in ['nearTerm', 'nextTerm']:
-        call_price = forward_level[term][0]['last']
-        put_price = forward_level[term][1]['last']
-        f[term] = strike_price + pow(e, r*t[term]) * (call_price - put_price)  # F equation
+        call_price = forward_level[term]['call']
+        put_price = forward_level[term]['put']
+        f[term] = strike_price + pow(e, term_rate(r, term)*t[term]) * (call_price - put_price)  # F equation
+
+    return f
+
+
+def calculate_vix(vol: dict, t: dict, tminutes: dict, horizon_minutes: float = 43200) -> float:
+    """
+    Interpolates the near-term and next-term variances to a constant 30 day maturity, (or horizon_minutes, ex: 12960
+    for a 9 day index, see TermStructure).
+    https://www.sfu.ca/~poitras/419_VIX.pdf (page 9)
+    """
+    v1 = vol['nearTerm']  # Volatility of near-term options
+    v2 = vol['nextTerm']  # Volatility of next-term options
+    t1 = t['nearTerm']  # Special VIX calculation for near-term options timing
+    t2 = t['nextTerm']  # Special VIX calculation for next-term options timing
+    nT1 = tminutes['nearTerm']  # Minutes to expiration
+    nT2 = tminutes['nextTerm']  # Minutes to expiration
+
+    minYear = 525600  # Minutes in a year
+    minHorizon = horizon_minutes  # minutes in a month, by default
+
+    # VIX Equation
+    vix = 100 * math.sqrt(
+        (t1 * v1 * ((nT2 - minHorizon) / (nT2 - nT1)) + t2 * v2 * ((minHorizon - nT1) / (nT2 - nT1))) * minYear / minHorizon
+    )
 
-    return f
\ No newline at end of file
+    return round(vix, 3)
@@ -0,0 +1,90 @@
+import time
+import json
+from collections import deque
+from contextlib import contextmanager
+
+
+class Metrics:
+    """
+    Records each step of a calculation as a plain dict: the step, the ticker, when it started, how long it took, and
+    whatever the step found on the way, (where the chain came from, bytes fetched, strikes considered and retained per term).
+
+    The most recent max_records are kept in memory for export(), and every record is passed to each hook as soon as it
+    is recorded, (ex: to log it, or to feed a metrics client).
+
+    A Metrics sent to a worker process leaves its hooks and records behind. Records made in the worker are returned
+    to the parent with the result, and recorded there, so hooks only ever run in the parent process.
+    """
+
+    def __init__(self, hooks: list = None, max_records: int = 10000):
+        """
+        Parameters
+        ----------
+        hooks       :list
+                    Callables, each called with every record.
+        max_records :int
+                    Older records are dropped past this size.
+        """
+        self.hooks = list(hooks or [])
+        self.max_records = max_records
+        self.records = deque(maxlen=max_records)
+        self.detached = False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    @contextmanager
+    def step(self, step: str, **fields):
+        """
+        Times the body of the with block. The record is yielded, so the step can add its own fields to it.
+        A step that raises is recorded with its error, and the exception is re-raised.
+        """
+        record = {'step': step, **fields, 'started_at': time.time()}
+        start = time.perf_counter()
+
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = str(e.args[0]) if e.args else repr(e)
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.record(record)
+
+    def record(self, record: dict):
+        self.records.append(record)
+
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                print('Error in metrics hook: ', e)
+
+    def export(self, step: str = None, ticker: str = None) -> list:
+        """
+        Returns
+        -------
+        records     :list
+                    Copies of the recorded dicts, oldest first, optionally only for one step and/or ticker.
+        """
+        return [
+            dict(record) for record in self.records
+            if ((step is None) or (record['step'] == step)) and ((ticker is None) or (record.get('ticker') == ticker))
+        ]
+
+    def write_jsonl(self, path: str) -> int:
+        """
+        Appends the records to path as JSON lines. Returns the number of records written.
+        """
+        records = self.export()
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        return len(records)
+
+    def clear(self):
+        self.records.clear()
+
+    def __getstate__(self):
+        # Hooks are often lambdas or hold clients, which can't be pickled, and the parent's records aren't needed.
+        return {'hooks': [], 'max_records': self.max_records, 'records': deque(maxlen=self.max_records), 'detached': True}
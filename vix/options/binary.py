@@ -0,0 +1,138 @@
+import os
+import json
+import struct
+from functools import partial
+import numpy as np
+from vix.options.chain import OptionChain, OptionTerm, OptionSide, in_window
+
+"""
+Compact binary format for parsed option chains.
+
+    MAGIC (8 bytes) | version (uint32) | header length (uint32) | header (JSON, utf-8) | padding | data
+
+The header holds the chain and expiration metadata, and the offset and size of each side's block in data.
+data is little-endian float64, one block per side of each expiration, laid out as 5 rows of equal length:
+strikes, bid, ask, last, mid. Blocks are read with np.memmap, so loading a chain is zero-copy and only touches
+the pages the calculation actually reads.
+"""
+
+MAGIC = b'VIXCHAIN'
+VERSION = 1
+ALIGNMENT = 64
+COLUMNS = ['strikes', 'bid', 'ask', 'last', 'mid']
+DTYPE = np.dtype('<f8')
+
+
+def write_binary_chain(chain: OptionChain, path: str, min_days: int = None, max_days: int = None, prune_band: float = None) -> bool:
+    """
+    Writes an OptionChain to path.
+
+    Parameters
+    ----------
+    chain       :OptionChain
+    path        :str
+    min_days    :int
+    max_days    :int
+                The days to expiration window the chain was parsed with, so readers know which expirations it covers.
+    prune_band  :float
+                The band the strikes were pruned with, (see OptionTerm.pruned()), None if they weren't.
+    """
+    header = {
+        'symbol': chain.symbol,
+        'underlyingPrice': chain.underlying_price,
+        'snapshotTime': chain.snapshot_time,
+        'minDays': min_days,
+        'maxDays': max_days,
+        'pruneBand': prune_band,
+        'terms': [],
+    }
+    blocks = []
+    offset = 0
+
+    for term in chain.terms:
+        entry = {
+            'expirationDate': term.expiration_date,
+            'expirationTimestamp': int(term.expiration_timestamp),
+            'daysToExpiration': int(term.days_to_expiration),
+        }
+        for side_name, side in term.sides().items():
+            count = len(side)
+            entry[side_name] = [offset, count]
+            blocks.append(np.stack([getattr(side, column) for column in COLUMNS]).astype(DTYPE) if count else np.empty((5, 0), DTYPE))
+            offset += len(COLUMNS) * count
+        header['terms'].append(entry)
+
+    encoded_header = json.dumps(header).encode('utf-8')
+    preamble = MAGIC + struct.pack('<II', VERSION, len(encoded_header)) + encoded_header
+    padding = b'\0' * (-len(preamble) % ALIGNMENT)
+
+    with open(path, 'wb') as f:
+        f.write(preamble)
+        f.write(padding)
+        for block in blocks:
+            f.write(np.ascontiguousarray(block).tobytes())
+
+    return True
+
+
+def read_binary_chain(path: str, min_days: int = None, max_days: int = None, prune_band: float = None) -> OptionChain | bool:
+    """
+    Memory maps a chain written by write_binary_chain().
+    Returns False when the file was written with a narrower days to expiration window than requested, or with its
+    strikes pruned closer to the underlying than prune_band.
+    """
+    with open(path, 'rb') as f:
+        if (f.read(len(MAGIC)) != MAGIC):
+            raise Exception('Not a binary option chain file.', path)
+        version, header_length = struct.unpack('<II', f.read(8))
+        if (version != VERSION):
+            raise Exception('Unsupported binary option chain version.', version)
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    if not _covers(header['minDays'], header['maxDays'], min_days, max_days):
+        return False
+    if not _covers_strikes(header.get('pruneBand'), prune_band):
+        return False
+
+    preamble_length = len(MAGIC) + 8 + header_length
+    data_offset = preamble_length + (-preamble_length % ALIGNMENT)
+    data_length = (os.path.getsize(path) - data_offset) // DTYPE.itemsize
+    data = np.memmap(path, dtype=DTYPE, mode='r', offset=data_offset, shape=(data_length,)) if data_length else np.empty(0, DTYPE)
+
+    terms = []
+    for entry in header['terms']:
+        if not in_window(entry['daysToExpiration'], min_days, max_days): continue
+
+        # Sides are only mapped once read, see OptionTerm
+        sides = {side_name: partial(_read_side, data, *entry[side_name]) for side_name in ['call', 'put']}
+
+        terms.append(OptionTerm(
+            expiration_date=entry['expirationDate'],
+            expiration_timestamp=entry['expirationTimestamp'],
+            days_to_expiration=entry['daysToExpiration'],
+            call=sides['call'],
+            put=sides['put'],
+        ))
+
+    return OptionChain(
+        symbol=header['symbol'],
+        terms=terms,
+        underlying_price=header['underlyingPrice'],
+        snapshot_time=header.get('snapshotTime') or os.path.getmtime(path),
+    )
+
+
+def _read_side(data: np.ndarray, offset: int, count: int) -> OptionSide:
+    block = data[offset:offset + len(COLUMNS) * count].reshape(len(COLUMNS), count)
+    return OptionSide.from_columns(*block)
+
+
+def _covers(stored_min: int, stored_max: int, min_days: int, max_days: int) -> bool:
+    if ((stored_min is not None) and ((min_days is None) or (min_days < stored_min))): return False
+    if ((stored_max is not None) and ((max_days is None) or (max_days > stored_max))): return False
+    return True
+
+
+def _covers_strikes(stored_band: float, prune_band: float) -> bool:
+    # A narrower band prunes at least as many strikes, so its chain is within the stored one
+    return ((stored_band is None) or ((prune_band is not None) and (prune_band <= stored_band)))
@@ -0,0 +1,274 @@
+import datetime
+import numpy as np
+from pytz import timezone
+
+PRUNE_BAND = 0.1  # Strikes within 10% of the underlying price are never pruned, see OptionTerm.pruned()
+
+
+class OptionSide:
+    """
+    Columnar quotes for one side (calls or puts) of a single expiration.
+    Every array is aligned on the same index and sorted by strike price, ascending.
+    """
+
+    def __init__(self, strikes, bid, ask, last):
+        strikes = np.asarray(strikes, dtype=np.float64)
+        order = np.argsort(strikes, kind='stable')
+
+        self.strikes = strikes[order]
+        self.bid = np.asarray(bid, dtype=np.float64)[order]
+        self.ask = np.asarray(ask, dtype=np.float64)[order]
+        self.last = np.asarray(last, dtype=np.float64)[order]
+        self.mid = (self.bid + self.ask) / 2
+
+    @classmethod
+    def from_columns(cls, strikes, bid, ask, last, mid) -> 'OptionSide':
+        """
+        Wraps columns which are already sorted by strike, without copying them. Used for memory mapped caches.
+        """
+        side = cls.__new__(cls)
+        side.strikes = strikes
+        side.bid = bid
+        side.ask = ask
+        side.last = last
+        side.mid = mid
+        return side
+
+    @classmethod
+    def from_td_strikes(cls, strikes: dict) -> 'OptionSide':
+        """
+        Builds the columns from one expiration of a TD Ameritrade exp date map.
+
+        Parameters
+        ----------
+        strikes     :dict
+                    {"3900.0": [{"bid": ..., "ask": ..., "last": ...}], ...}
+
+        Returns
+        -------
+        side        :OptionSide
+        """
+        size = len(strikes)
+        columns = np.empty((4, size), dtype=np.float64)
+
+        for i, (strike, details) in enumerate(strikes.items()):
+            # TD Ameritrade returns a list per strike, the first row is the standard contract.
+            row = details[0]
+            columns[0, i] = float(strike)
+            columns[1, i] = row['bid']
+            columns[2, i] = row['ask']
+            columns[3, i] = row['last']
+
+        return cls(columns[0], columns[1], columns[2], columns[3])
+
+    def __len__(self):
+        return len(self.strikes)
+
+
+class OptionTerm:
+    """
+    A single expiration of an option chain, with its calls and puts stored as columns.
+
+    call and put can also be given as functions which build the OptionSide, (ex: from a memory mapped file), they are
+    then only materialized the first time they are read. Most expirations of a chain are never selected.
+    """
+
+    def __init__(self, expiration_date: str, expiration_timestamp: int, days_to_expiration: int, call: OptionSide, put: OptionSide):
+        self.expiration_date = expiration_date  # Human readable, ex: "2023-03-09"
+        self.expiration_timestamp = expiration_timestamp  # Precise expiration in milliseconds
+        self.days_to_expiration = days_to_expiration
+        self.__sides = {'call': call, 'put': put}
+
+    @property
+    def call(self) -> OptionSide:
+        return self.__side('call')
+
+    @property
+    def put(self) -> OptionSide:
+        return self.__side('put')
+
+    @property
+    def expiration_datetime(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(float(self.expiration_timestamp / 1000))
+
+    @property
+    def expiration_datetime_zone(self) -> datetime.datetime:
+        return timezone('US/Central').localize(self.expiration_datetime)
+
+    def sides(self) -> dict:
+        return {'call': self.call, 'put': self.put}
+
+    def pruned(self, underlying_price: float, band: float = PRUNE_BAND) -> 'OptionTerm':
+        """
+        Drops the deep out of the money strikes the VIX never reaches. Walking away from K0, the zero bid truncation
+        stops at the second zero bid, (or ask), so past two consecutive zero quotes further from the underlying than
+        band, no strike can be part of a strip as long as K0 stays within the band. Calls above the first such pair and
+        puts below it are dropped, with the other side at the same strikes, which are deep in the money and can't be
+        the forward level strike either.
+
+        Returns the term itself when nothing is pruned.
+        """
+        call, put = self.call, self.put
+        high = _zero_pair(call.strikes, call.bid, call.ask, underlying_price * (1 + band), 1)
+        low = _zero_pair(put.strikes, put.bid, put.ask, underlying_price * (1 - band), -1)
+        if ((high is None) and (low is None)): return self
+
+        high = np.inf if (high is None) else high
+        low = -np.inf if (low is None) else low
+        sides = {}
+        for name, side in [('call', call), ('put', put)]:
+            keep = slice(int(np.searchsorted(side.strikes, low, side='left')), int(np.searchsorted(side.strikes, high, side='right')))
+            sides[name] = OptionSide.from_columns(side.strikes[keep], side.bid[keep], side.ask[keep], side.last[keep], side.mid[keep])
+
+        return OptionTerm(self.expiration_date, self.expiration_timestamp, self.days_to_expiration, sides['call'], sides['put'])
+
+    def __side(self, name: str) -> OptionSide:
+        side = self.__sides[name]
+        if not isinstance(side, OptionSide):
+            side = self.__sides[name] = side()
+        return side
+
+    def __getstate__(self):
+        # Loaders can't be sent to another process, the sides go materialized.
+        state = dict(self.__dict__)
+        state['_OptionTerm__sides'] = self.sides()
+        return state
+
+
+class OptionChain:
+    """
+    Parsed, columnar representation of an option chain.
+    The raw TD Ameritrade response is a dict of dicts of lists, ~10MB for SPX, and walking it on every step of the
+    VIX equation is expensive. We parse it exactly once into sorted numpy arrays per expiration, and every step of
+    Vix.calculate() reads from this object instead.
+    """
+
+    def __init__(self, symbol: str, terms: list, underlying_price: float = None, snapshot_time: float = None):
+        self.symbol = symbol
+        self.underlying_price = underlying_price
+        self.snapshot_time = snapshot_time  # When the quotes were fetched, as a unix timestamp
+        self.terms = sorted(terms, key=lambda term: term.expiration_timestamp)
+        self.__expiration_index = None
+
+    @property
+    def expiration_index(self) -> 'ExpirationIndex':
+        # Built on first use, and kept for as long as the chain is, (ex: in the memory cache).
+        if (self.__expiration_index is None):
+            self.__expiration_index = ExpirationIndex(self.terms)
+        return self.__expiration_index
+
+    def pruned(self, band: float = PRUNE_BAND) -> 'OptionChain':
+        """
+        The chain with every term pruned, see OptionTerm.pruned(). Chains without an underlying price are left whole.
+        """
+        if ((band is None) or (not self.underlying_price)): return self
+        terms = [term.pruned(self.underlying_price, band) for term in self.terms]
+        return OptionChain(self.symbol, terms, self.underlying_price, self.snapshot_time)
+
+    @classmethod
+    def from_td_response(cls, response: dict, min_days: int = None, max_days: int = None, prune_band: float = None) -> 'OptionChain':
+        """
+        Parameters
+        ----------
+        response    :dict
+                    Option chain response from the TD Ameritrade API.
+        min_days    :int
+        max_days    :int
+                    Optional window on days to expiration, expirations outside of it are not parsed.
+        prune_band  :float
+                    Prunes the strikes the VIX never reaches beyond this band around the underlying, see OptionTerm.pruned().
+
+        Returns
+        -------
+        chain       :OptionChain
+        """
+        terms = []
+        try:
+            call_map = response['callExpDateMap']
+            put_map = response['putExpDateMap']
+
+            for expiration, call_strikes in call_map.items():
+                expiration_date, expiration_timestamp, days_to_expiration = td_expiration_info(expiration, call_strikes)
+                if not in_window(days_to_expiration, min_days, max_days): continue
+
+                terms.append(OptionTerm(
+                    expiration_date=expiration_date,
+                    expiration_timestamp=expiration_timestamp,
+                    days_to_expiration=days_to_expiration,
+                    call=OptionSide.from_td_strikes(call_strikes),
+                    put=OptionSide.from_td_strikes(put_map.get(expiration, {})),
+                ))
+        except Exception as e:
+            raise Exception('There has been a change in the TD Ameritrade API. See OptionChain.from_td_response()', e)
+
+        chain = cls(
+            symbol=response.get('symbol'),
+            terms=terms,
+            underlying_price=response.get('underlyingPrice'),
+        )
+        return chain.pruned(prune_band)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        return iter(self.terms)
+
+
+class ExpirationIndex:
+    """
+    The days to expiration of a chain's expirations, sorted, with the position of each one in chain.terms.
+    Finding the first expiration in a range of days is a binary search instead of a scan of the chain.
+    """
+
+    def __init__(self, terms: list):
+        timestamps = np.array([term.expiration_timestamp for term in terms], dtype=np.int64)
+        days = np.array([term.days_to_expiration for term in terms], dtype=np.int64)
+
+        # An expiration listed twice keeps its last term. Terms are sorted by expiration, so duplicates are adjacent.
+        positions = np.flatnonzero(np.append(timestamps[1:] != timestamps[:-1], True)) if len(terms) else np.empty(0, np.int64)
+        order = np.argsort(days[positions], kind='stable')
+
+        self.days = days[positions][order]
+        self.positions = positions[order]
+
+    def first(self, min_days: int, max_days: int = None) -> int | None:
+        """
+        Index in self.days and self.positions of the first expiration with min_days to max_days days to expiration,
+        or None when there isn't one.
+        """
+        i = int(np.searchsorted(self.days, min_days, side='left'))
+        if ((i == len(self.days)) or ((max_days is not None) and (self.days[i] > max_days))):
+            return None
+        return i
+
+    def __len__(self):
+        return len(self.days)
+
+
+def td_expiration_info(expiration: str, strikes: dict) -> tuple[str, int, int]:
+    """
+    Returns (expiration_date, expiration_timestamp, days_to_expiration) for one expiration of a TD Ameritrade exp date map.
+    """
+    # Grabbing the first strike row in the chain because I can get the precise expiration from any strike.
+    # TD Ameritrade adds the expiration date to every row
+    first_strike = next(iter(strikes.values()))[0]
+    expiration_date = expiration.split(':')[0]  # Ex: "2023-03-09:1" Expiration with index (date:index)
+
+    return expiration_date, int(first_strike['expirationDate']), int(first_strike['daysToExpiration'])
+
+
+def _zero_pair(strikes: np.ndarray, bid: np.ndarray, ask: np.ndarray, limit: float, direction: int) -> float | None:
+    # The outer strike of the first two consecutive zero quotes past limit, walking up (1) or down (-1). None if there aren't any.
+    zero = ((bid == 0) | (ask == 0))[::direction]
+    strikes = strikes[::direction]
+    past = (strikes > limit) if (direction == 1) else (strikes < limit)
+
+    pairs = np.flatnonzero(zero[:-1] & zero[1:] & past[:-1])
+    return float(strikes[pairs[0] + 1]) if len(pairs) else None
+
+
+def in_window(days_to_expiration: int, min_days: int = None, max_days: int = None) -> bool:
+    if ((min_days is not None) and (days_to_expiration < min_days)): return False
+    if ((max_days is not None) and (days_to_expiration > max_days)): return False
+    return True
@@ -1,15 +1,16 @@
 import datetime
 import calendar
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
-def build_option_chain_time_range() -> list:
-    # Building a time_range to send to TD Ameritrade's API
-    today = datetime.datetime.now()
-    three_months_away = (today + relativedelta(months=+3))
-    three_months_away_days = calendar.monthrange(three_months_away.year, three_months_away.month)[1]
+def build_option_chain_time_range(as_of: float = None, months: int = 3) -> list:
+    # Building a time_range to send to TD Ameritrade's API, from today or from the as_of unix timestamp, to the end of the month months away
+    today = datetime.datetime.fromtimestamp(as_of) if (as_of is not None) else datetime.datetime.now()
+    months_away = (today + relativedelta(months=+months))
+    months_away_days = calendar.monthrange(months_away.year, months_away.month)[1]
     
     from_date = today
-    to_date = datetime.datetime(three_months_away.year, three_months_away.month, three_months_away_days)
+    to_date = datetime.datetime(months_away.year, months_away.month, months_away_days)
     time_range = [from_date, to_date]
 
     return time_range
@@ -21,51 +22,62 @@ def determine_forward_level_strike(selected_chain: dict) -> dict:
     absolute difference between the call and put prices is smallest."
     https://www.sfu.ca/~poitras/419_VIX.pdf
 
+    Calls and puts are aligned on their common strikes, and both terms go through a single forward_level_rows().
     """
-    strikes = {
-        'nearTerm': {},
-        'nextTerm': {}
-    }
-
-    price_diffs = {
-        'nearTerm': {},
-        'nextTerm': {}
-    }
-
-    # Collecting prices on call and put options with strike price as key.
-    for term, options in selected_chain.items():
-        for _side, option in options.items():
-            for strike, details in option['strikes'].items():
-
-                if (not strikes[term].get(strike, False)):
-                    strikes[term][strike] = []
-                    
-                strikes[term][strike].append(details[0]['last'])
-
-    # Collect price differences from call and put options.
-    for term, strike in strikes.items():
-        for strike_price, prices in strike.items():
-            if (len(prices) == 2):
-                p1 = prices[0]
-                p2 = prices[1]
-
-                if ((0 in [p1, p2]) == False):
-                    diff = abs(p1 - p2)
-                    price_diffs[term][diff] = strike_price
-
-    # Select the smallest price difference out of the bunch.
-    near_term_strike = price_diffs['nearTerm'][min(price_diffs['nearTerm'].keys())]
-    next_term_strike = price_diffs['nextTerm'][min(price_diffs['nextTerm'].keys())]
-
-    forwardLevel = {
-        'nearTerm': [
-            selected_chain['nearTerm']['call']['strikes'][near_term_strike][0],
-            selected_chain['nearTerm']['put']['strikes'][near_term_strike][0],
-        ],
-        'nextTerm': [
-            selected_chain['nextTerm']['call']['strikes'][next_term_strike][0],
-            selected_chain['nextTerm']['put']['strikes'][next_term_strike][0],
-        ]
-    }
-
-    return forwardLevel
\ No newline at end of file
+    terms = ['nearTerm', 'nextTerm']
+    strikes, call_last, put_last, segment = [], [], [], []
+
+    # Calls and puts with matching strikes, term after term
+    for i, term in enumerate(terms):
+        option_term = selected_chain[term]
+        common, c, p = np.intersect1d(option_term.call.strikes, option_term.put.strikes, return_indices=True)
+
+        strikes.append(common)
+        call_last.append(option_term.call.last[c])
+        put_last.append(option_term.put.last[p])
+        segment.append(np.full(len(common), i))
+
+    strikes = np.concatenate(strikes)
+    call_last = np.concatenate(call_last)
+    put_last = np.concatenate(put_last)
+    rows = forward_level_rows(np.concatenate(segment), call_last, put_last, len(terms))
+
+    forwardLevel = {}
+    for term, row in zip(terms, rows.tolist()):
+        if (row < 0):
+            raise Exception('No call and put quoted at the same strike to determine the forward level.', term)
+
+        forwardLevel[term] = {
+            'strikePrice': float(strikes[row]),
+            'call': float(call_last[row]),
+            'put': float(put_last[row]),
+        }
+
+    return forwardLevel
+
+
+def forward_level_rows(segment: np.ndarray, call_last: np.ndarray, put_last: np.ndarray, n_segments: int) -> np.ndarray:
+    """
+    Index of the row with the smallest absolute difference between the call and put prices in each segment, (ex: in
+    each term), or -1 for a segment without any row priced on both sides.
+
+    Rows are call and put pairs at the same strike, sorted by segment, then strike. Rows with a zero or missing last
+    price are skipped. On ties the highest strike wins, which is what the original implementation, (a dict keyed by
+    the difference, where later strikes overwrote earlier ones), ended up with.
+    """
+    rows = np.flatnonzero((call_last != 0) & (put_last != 0) & np.isfinite(call_last) & np.isfinite(put_last))
+    diff = np.abs(call_last[rows] - put_last[rows])
+    segment = segment[rows]
+
+    start = np.searchsorted(segment, np.arange(n_segments))
+    end = np.searchsorted(segment, np.arange(n_segments), side='right')
+    found = (end > start)
+
+    # The smallest difference of each segment, then the last row of the segment which has it
+    smallest = np.minimum.reduceat(np.append(diff, np.inf), start)
+    ties = np.flatnonzero(diff == smallest[segment])
+    last = ties[np.searchsorted(ties, end[found]) - 1]
+
+    forward_rows = np.full(n_segments, -1)
+    forward_rows[found] = rows[last]
+    return forward_rows
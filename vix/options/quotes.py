@@ -0,0 +1,64 @@
+import json
+
+QUOTE_FIELDS = ['bid', 'ask', 'last']
+
+
+def read_quote_updates(path: str):
+    """
+    Replays a file of quote updates, one JSON object per line, in the order they were recorded:
+
+        {"timestamp": 1678370400.25, "expiration": "2023-03-09", "side": "call", "strike": 3900.0, "bid": 12.1, "ask": 12.4}
+
+    Consecutive updates with the same timestamp form one tick. Blank lines are skipped.
+
+    Yields
+    ------
+    tick        :tuple
+                (timestamp, [updates]), see IncrementalVolatility.apply().
+    """
+    timestamp = None
+    updates = []
+
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip(): continue
+
+            try:
+                update = parse_quote_update(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                raise Exception(f"Invalid quote update on line {number} of {path}.", e)
+
+            if (updates and (update['timestamp'] != timestamp)):
+                yield timestamp, updates
+                updates = []
+
+            timestamp = update['timestamp']
+            updates.append(update)
+
+    if updates:
+        yield timestamp, updates
+
+
+def write_quote_updates(path: str, updates: list):
+    """
+    Appends quote updates to a replay file, (ex: when recording a stream).
+    """
+    with open(path, 'a') as f:
+        f.write(''.join(json.dumps(update) + '\n' for update in updates))
+
+
+def parse_quote_update(update: dict) -> dict:
+    parsed = {
+        'timestamp': float(update['timestamp']),
+        'expiration': str(update['expiration']),
+        'side': str(update['side']).lower(),
+        'strike': float(update['strike']),
+    }
+    if (parsed['side'] not in ['call', 'put']):
+        raise ValueError(f"Unknown side {update['side']}")
+
+    for field in QUOTE_FIELDS:
+        if (update.get(field) is not None):
+            parsed[field] = float(update[field])
+
+    return parsed
@@ -0,0 +1,168 @@
+import tempfile
+from vix.options.chain import OptionChain, OptionTerm, OptionSide, in_window
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024  # Responses bigger than this are spooled to a temporary file instead of memory
+
+# The only fields of a response which are read, everything else is skipped event by event
+EXP_DATE_MAPS = ['callExpDateMap', 'putExpDateMap']
+HEADER_FIELDS = ['symbol', 'underlyingPrice']
+QUOTE_FIELDS = ['bid', 'ask', 'last', 'expirationDate', 'daysToExpiration']
+CONTAINERS = ['start_map', 'start_array']
+
+
+def parse_option_chain_file(path: str, min_days: int = None, max_days: int = None, prune_band: float = None) -> OptionChain:
+    """
+    Parses a TD Ameritrade chain response saved on disk, without reading the whole file into memory.
+    """
+    with open(path, 'rb') as f:
+        return parse_option_chain_stream(f, min_days, max_days, prune_band)
+
+
+def parse_option_chain_chunks(chunks, min_days: int = None, max_days: int = None, prune_band: float = None) -> OptionChain:
+    """
+    Parses a response arriving in chunks, ex: requests' response.iter_content().
+    The chunks are spooled to a temporary file, (in memory while small), which is then parsed incrementally.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.seek(0)
+        return parse_option_chain_stream(f, min_days, max_days, prune_band)
+
+
+def parse_option_chain_stream(f, min_days: int = None, max_days: int = None, prune_band: float = None) -> OptionChain:
+    """
+    Incrementally parses a TD Ameritrade chain response into an OptionChain, in a single pass over its JSON events.
+    Only bid, ask, last and the strike of the first contract of each strike are kept, (plus the expiration fields of
+    the first contract of each expiration), every other field is skipped without being built. Expirations outside of
+    the min_days/max_days window are skipped as soon as their first contract tells their days to expiration.
+
+    Parameters
+    ----------
+    f           :file
+                Binary file containing the response.
+    min_days    :int
+    max_days    :int
+                Window on days to expiration.
+    prune_band  :float
+                Prunes the strikes the VIX never reaches, see OptionTerm.pruned(). None keeps every strike.
+
+    Returns
+    -------
+    chain       :OptionChain
+    """
+    # Imported on the first parse, so loading a chain from the binary cache never pays for it
+    import ijson
+
+    header = {}
+    exp_date_maps = {}
+
+    try:
+        events = ijson.basic_parse(f, use_float=True, buf_size=CHUNK_SIZE)
+        if (next(events)[0] != 'start_map'):
+            raise Exception('Error in parse_option_chain_stream(). Response is not a dict.')
+
+        for event, key in events:
+            if (event == 'end_map'): break
+
+            if (key in EXP_DATE_MAPS):
+                exp_date_maps[key] = _read_exp_date_map(events, min_days, max_days)
+                continue
+
+            event, value = next(events)
+            if (event in CONTAINERS):
+                _skip(events)
+            elif (key in HEADER_FIELDS):
+                header[key] = value
+
+        calls, puts = exp_date_maps['callExpDateMap'], exp_date_maps['putExpDateMap']
+
+    except ijson.JSONError as e:
+        raise Exception('Error in parse_option_chain_stream(). Response is not valid JSON.', e)
+    except (KeyError, IndexError, TypeError, StopIteration) as e:
+        raise Exception('There has been a change in the TD Ameritrade API. See parse_option_chain_stream()', e)
+
+    terms = []
+    for expiration, (expiration_timestamp, days_to_expiration, call) in calls.items():
+        terms.append(OptionTerm(
+            expiration_date=expiration.split(':')[0],  # Ex: "2023-03-09:1" Expiration with index (date:index)
+            expiration_timestamp=expiration_timestamp,
+            days_to_expiration=days_to_expiration,
+            call=call,
+            put=puts[expiration][2] if (expiration in puts) else OptionSide([], [], [], []),
+        ))
+
+    return OptionChain(symbol=header.get('symbol'), terms=terms, underlying_price=header.get('underlyingPrice')).pruned(prune_band)
+
+
+
+def _read_exp_date_map(events, min_days: int, max_days: int) -> dict:
+    # {"2023-03-09:1": {"3900.0": [{contract}, ...], ...}, ...} => {expiration: (expiration_timestamp, days_to_expiration, side)}
+    terms = {}
+    if (next(events)[0] != 'start_map'): raise TypeError('Exp date map is not a dict.')
+
+    for event, expiration in events:
+        if (event == 'end_map'): return terms
+
+        term = _read_expiration(events, min_days, max_days)
+        if term: terms[expiration] = term
+
+    raise StopIteration
+
+
+def _read_expiration(events, min_days: int, max_days: int) -> tuple | None:
+    # None when the expiration is outside of the window, the rest of it is skipped
+    if (next(events)[0] != 'start_map'): raise TypeError('Expiration is not a dict.')
+    strikes, bid, ask, last = [], [], [], []
+    first = None
+
+    for event, strike in events:
+        if (event == 'end_map'): break
+
+        # TD Ameritrade returns a list per strike, the first row is the standard contract.
+        if (next(events)[0] != 'start_array'): raise TypeError('Strike is not a list.')
+        row = _read_contract(events)
+        _skip(events)
+
+        if (first is None):
+            first = row
+            if not in_window(int(first['daysToExpiration']), min_days, max_days):
+                _skip(events)
+                return None
+
+        strikes.append(float(strike))
+        bid.append(row['bid'])
+        ask.append(row['ask'])
+        last.append(row['last'])
+
+    # Grabbing the first strike row in the chain because I can get the precise expiration from any strike.
+    return int(first['expirationDate']), int(first['daysToExpiration']), OptionSide(strikes, bid, ask, last)
+
+
+def _read_contract(events) -> dict:
+    # Only the QUOTE_FIELDS of the contract, nested fields, (ex: optionDeliverablesList), are skipped
+    if (next(events)[0] != 'start_map'): raise TypeError('Contract is not a dict.')
+    row = {}
+
+    for event, key in events:
+        if (event == 'end_map'): return row
+
+        event, value = next(events)
+        if (event in CONTAINERS):
+            _skip(events)
+        elif (key in QUOTE_FIELDS):
+            row[key] = value
+
+    raise StopIteration
+
+
+def _skip(events):
+    # Consumes events up to the end of the container we are in
+    depth = 1
+    for event, _value in events:
+        if (event in CONTAINERS):
+            depth += 1
+        elif (event in ['end_map', 'end_array']):
+            depth -= 1
+            if (depth == 0): return
@@ -0,0 +1,68 @@
+from abc import ABC, abstractmethod
+from vix.options.chain import OptionChain
+from vix.metrics import Metrics
+
+
+class ChainProvider(ABC):
+    """
+    Where Vix gets its option chains from.
+    A provider returns chains as columnar OptionChains, which is the only format every step after fetching reads,
+    so the engine doesn't know or care whether a chain came from an API, a cache, or a recorded snapshot.
+
+    Subclasses implement get_option_chain(), (a provider without it can't be constructed). stream() has a default
+    implementation on top of it.
+    """
+
+    def identity(self) -> str:
+        """
+        Where the chains come from, and how they are filtered. Caches of data derived from chains, (see StripCache),
+        are keyed by it, so two providers never serve each other's results. Subclasses add what sets their chains apart.
+        """
+        return type(self).__name__
+
+    @abstractmethod
+    def get_option_chain(self, ticker: str, time_range: list, min_days: int = None, max_days: int = None, record: dict = None,
+                         as_of: float = None) -> OptionChain:
+        """
+        Parameters
+        ----------
+        ticker      :str
+        time_range  :list
+                    [from_date, to_date], each as datetime.datetime
+        min_days    :int
+        max_days    :int
+                    Window on days to expiration, expirations outside of it may be left out.
+        record      :dict
+                    Metrics record of the fetch, filled with at least 'source' and 'bytes_fetched'.
+        as_of       :float
+                    Unix timestamp, the chain as it was at that time. Providers without history raise when it is given.
+
+        Returns
+        -------
+        chain       :OptionChain
+        """
+
+    async def stream(self, tickers: list, time_range: list, min_days: int = None, max_days: int = None,
+                     concurrency: int = 8, metrics: Metrics = None):
+        """
+        Yields (ticker, chain, error) in the order the chains become available. error is None on success,
+        otherwise chain is None and error is the exception message. Each fetch is recorded as an 'option_chain' step.
+
+        By default, get_option_chain() runs on up to concurrency worker threads.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+        metrics = metrics or Metrics()
+
+        async def fetch_one(ticker):
+            async with semaphore:
+                try:
+                    with metrics.step('option_chain', ticker=ticker) as record:
+                        chain = await asyncio.to_thread(self.get_option_chain, ticker, time_range, min_days, max_days, record)
+                        return ticker, chain, None
+                except Exception as e:
+                    return ticker, None, ' '.join(str(arg) for arg in e.args) or repr(e)
+
+        for next_result in asyncio.as_completed([fetch_one(ticker) for ticker in tickers]):
+            yield await next_result
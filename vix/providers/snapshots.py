@@ -0,0 +1,145 @@
+import os
+import json
+import heapq
+import bisect
+import datetime
+from vix.options.chain import OptionChain
+from vix.options.stream import parse_option_chain_file
+from vix.options.binary import write_binary_chain, read_binary_chain
+from vix.providers.provider import ChainProvider
+
+SNAPSHOT_FORMAT = '%Y%m%dT%H%M%SZ'  # UTC
+EXTENSIONS = ['bin', 'json']  # In order of preference when a snapshot is saved in both formats
+
+
+class SnapshotProvider(ChainProvider):
+    """
+    Option chains recorded on disk, for backtests and load tests without any network.
+
+    Snapshots are stored one file per ticker and time:
+
+        {directory}/{ticker}/{YYYYmmddTHHMMSSZ}.bin     Binary chain, (see vix.options.binary), memory mapped on read.
+        {directory}/{ticker}/{YYYYmmddTHHMMSSZ}.json    Raw TD Ameritrade response, parsed incrementally.
+
+    get_option_chain() returns the latest snapshot taken at or before as_of, (the latest one when as_of is None),
+    and replay() iterates every snapshot of many tickers in time order. The snapshot time in the file name becomes the
+    chain's snapshot_time. The requested time range is ignored, a snapshot holds whatever expirations were recorded.
+    """
+
+    def __init__(self, directory: str, as_of: float = None):
+        """
+        Parameters
+        ----------
+        directory   :str
+        as_of       :float
+                    Unix timestamp, snapshots taken after it are ignored.
+        """
+        self.directory = directory
+        self.as_of = as_of
+        self.__index = {}  # ticker => (directory mtime, [snapshot times], [paths])
+
+    def identity(self) -> str:
+        return f"{super().identity()}_{os.path.abspath(self.directory)}" + ('' if (self.as_of is None) else f"_{self.as_of}")
+
+    def get_option_chain(self, ticker: str, time_range: list = None, min_days: int = None, max_days: int = None, record: dict = None,
+                         as_of: float = None) -> OptionChain:
+        record = {} if (record is None) else record
+        as_of = self.as_of if (as_of is None) else as_of
+        times, paths = self.snapshots(ticker)
+
+        i = len(times) if (as_of is None) else bisect.bisect_right(times, as_of)
+        if (i == 0):
+            raise Exception(f"No snapshot of {ticker} in {self.directory}" + (f" before {as_of}." if as_of else '.'))
+
+        record['source'] = 'snapshot'
+        record['bytes_fetched'] = 0
+        record['snapshot_time'] = times[i - 1]
+        return self.load(paths[i - 1], times[i - 1], min_days, max_days)
+
+    def replay(self, tickers: list = None, start: float = None, end: float = None, min_days: int = None, max_days: int = None):
+        """
+        Yields (snapshot_time, ticker, chain) for every snapshot of tickers, (every recorded ticker by default),
+        from start to end inclusive, in time order. Chains are loaded one at a time, as they are yielded.
+        """
+        def snapshots_of(ticker):
+            times, paths = self.snapshots(ticker)
+            lower = 0 if (start is None) else bisect.bisect_left(times, start)
+            upper = len(times) if (end is None) else bisect.bisect_right(times, end)
+            for i in range(lower, upper):
+                yield times[i], ticker, paths[i]
+
+        for snapshot_time, ticker, path in heapq.merge(*[snapshots_of(ticker) for ticker in (tickers or self.tickers())]):
+            yield snapshot_time, ticker, self.load(path, snapshot_time, min_days, max_days)
+
+    def load(self, path: str, snapshot_time: float, min_days: int = None, max_days: int = None) -> OptionChain:
+        chain = None
+        if path.endswith('.bin'):
+            chain = read_binary_chain(path, min_days, max_days)
+
+            # Recorded with a narrower days to expiration window than requested, the raw response may have it all.
+            if (not chain) and os.path.exists(path[:-len('bin')] + 'json'):
+                path = path[:-len('bin')] + 'json'
+            elif (not chain):
+                raise Exception('Snapshot does not cover the requested days to expiration.', path)
+
+        if (not chain):
+            chain = parse_option_chain_file(path, min_days, max_days)
+
+        chain.snapshot_time = snapshot_time
+        return chain
+
+    def save(self, ticker: str, chain: OptionChain | dict, snapshot_time: float) -> str:
+        """
+        Records a snapshot. A parsed OptionChain is saved in the binary format, a raw TD Ameritrade response as JSON.
+        Returns the path of the snapshot.
+        """
+        stamp = datetime.datetime.fromtimestamp(snapshot_time, tz=datetime.timezone.utc).strftime(SNAPSHOT_FORMAT)
+        directory = os.path.join(self.directory, ticker)
+        os.makedirs(directory, exist_ok=True)
+
+        if isinstance(chain, OptionChain):
+            path = os.path.join(directory, f"{stamp}.bin")
+            write_binary_chain(chain, path)
+        else:
+            path = os.path.join(directory, f"{stamp}.json")
+            with open(path, 'w') as f:
+                json.dump(chain, f)
+
+        return path
+
+    def snapshots(self, ticker: str) -> tuple[list, list]:
+        """
+        Returns
+        -------
+        snapshots   :tuple
+                    ([snapshot times], [paths]), sorted by time. Listed once, and again only when the directory changes.
+        """
+        directory = os.path.join(self.directory, ticker)
+        if not os.path.isdir(directory): return [], []
+
+        mtime = os.stat(directory).st_mtime_ns
+        indexed = self.__index.get(ticker)
+        if (indexed and indexed[0] == mtime):
+            return indexed[1], indexed[2]
+
+        snapshots = {}
+        for name in os.listdir(directory):
+            stamp, _, extension = name.partition('.')
+            if (extension not in EXTENSIONS): continue
+            try:
+                snapshot_time = datetime.datetime.strptime(stamp, SNAPSHOT_FORMAT).replace(tzinfo=datetime.timezone.utc).timestamp()
+            except ValueError:
+                continue
+
+            current = snapshots.get(snapshot_time)
+            if (current is None) or (EXTENSIONS.index(extension) < EXTENSIONS.index(current.rpartition('.')[2])):
+                snapshots[snapshot_time] = os.path.join(directory, name)
+
+        times = sorted(snapshots)
+        paths = [snapshots[snapshot_time] for snapshot_time in times]
+        self.__index[ticker] = (mtime, times, paths)
+        return times, paths
+
+    def tickers(self) -> list:
+        if not os.path.isdir(self.directory): return []
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, name)))
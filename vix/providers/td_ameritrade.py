@@ -0,0 +1,67 @@
+from vix.http.td_ameritrade import TDAmeritrade
+from vix.cache.disk import DiskCache
+from vix.metrics import Metrics
+from vix.options.chain import OptionChain, PRUNE_BAND
+from vix.providers.provider import ChainProvider
+
+
+class TDAmeritradeProvider(ChainProvider):
+    """
+    Option chains from the TD Ameritrade API, through the chain caches, see TDAmeritrade.
+    This is the provider Vix uses unless it is given another one.
+    """
+
+    def __init__(self, api_key: str, cache: bool = True, debug: bool = False, cache_format: str = 'binary', disk_cache: DiskCache = None,
+                 prune_band: float = PRUNE_BAND):
+        self.api_key = api_key
+        self.cache = cache
+        self.debug = debug
+        self.cache_format = cache_format
+        self.disk_cache = disk_cache
+        self.prune_band = prune_band
+
+    def identity(self) -> str:
+        # The sample response isn't the live chain, and strikes pruned with another band aren't the same strips
+        return f"{super().identity()}{'_sample' if self.debug else ''}_prune{self.prune_band}"
+
+    def get_option_chain(self, ticker: str, time_range: list, min_days: int = None, max_days: int = None, record: dict = None,
+                         as_of: float = None) -> OptionChain:
+        if (as_of is not None):
+            raise Exception('TD Ameritrade only provides current option chains. Use a SnapshotProvider for historical chains.')
+
+        record = {} if (record is None) else record
+        td = TDAmeritrade(
+            ticker=ticker,
+            api_key=self.api_key,
+            cache=self.cache,
+            debug=self.debug,
+            cache_format=self.cache_format,
+            disk_cache=self.disk_cache,
+            prune_band=self.prune_band,
+        )
+
+        chain = td.get_parsed_option_chain(time_range, min_days=min_days, max_days=max_days)
+        record['source'] = td.source
+        record['bytes_fetched'] = td.bytes_fetched
+        return chain
+
+    async def stream(self, tickers: list, time_range: list, min_days: int = None, max_days: int = None,
+                     concurrency: int = 8, metrics: Metrics = None):
+        """
+        Downloads the chains concurrently with AsyncChainFetcher, which parses each one on a worker thread as it downloads.
+        """
+        from vix.http.async_chains import AsyncChainFetcher
+
+        fetcher = AsyncChainFetcher(
+            api_key=self.api_key,
+            concurrency=concurrency,
+            cache=self.cache,
+            disk_cache=self.disk_cache,
+            metrics=metrics or Metrics(),
+            cache_format=self.cache_format,
+            prune_band=self.prune_band,
+            debug=self.debug,
+        )
+
+        async for ticker, chain, error in fetcher.stream(tickers, time_range, min_days, max_days):
+            yield ticker, chain, error
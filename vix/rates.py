@@ -0,0 +1,144 @@
+import re
+import csv
+import json
+import datetime
+import numpy as np
+
+YIELD_CURVE_PATH = 'storage/rates/yield_curve.csv'
+MAX_AGE_DAYS = 7  # A curve without a row this recent, (ex: a file which wasn't updated), isn't used for the day
+THREE_MONTHS = 91  # Days, the maturity of the 3m treasury yield, (FRED series DTB3)
+
+# FRED T-bill series, (ex: https://fred.stlouisfed.org/graph/fredgraph.csv?id=DTB4WK,DTB3,DTB6,DTB1YR), by maturity in days
+FRED_SERIES = {'DTB4WK': 28, 'DTB3': 91, 'DTB6': 182, 'DTB1YR': 364}
+UNITS = {'d': 1, 'w': 7, 'm': 365 / 12, 'y': 365}
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y']
+
+
+class YieldCurve:
+    """
+    Daily T-bill yield curves, loaded from a local file into arrays: sorted dates, and one row of rates per date with
+    one column per maturity. Rates are percents, like the ones Fred scrapes.
+
+    rate() finds the row of a date with a binary search, (the latest row on or before it), and interpolates linearly
+    between maturities, so each term of the VIX gets the rate of a T-bill maturing when its options expire, as the
+    whitepaper describes. Before the shortest maturity and past the longest, the nearest rate is used.
+
+    Files can be:
+
+        CSV     A date column, then one column per maturity. Maturities are labels like '1 Mo', '13 Wk', '1 Yr', (the
+                Treasury's daily yield curve files), or FRED series names, (DTB4WK, DTB3, DTB6, DTB1YR).
+                Empty cells and '.' are missing rates.
+        JSON    {"2023-01-03": {"1 Mo": 4.17, "3 Mo": 4.53, ...}, ...}
+
+    Dates are either YYYY-mm-dd or mm/dd/YYYY.
+    """
+
+    def __init__(self, dates: list, maturities: list, rates, max_age_days: int = MAX_AGE_DAYS):
+        """
+        Parameters
+        ----------
+        dates           :list
+                        datetime.date of each row, in any order. A date listed twice keeps its last row.
+        maturities      :list
+                        Days to maturity of each column.
+        rates           :array
+                        Rates in percents, (dates, maturities), nan where a rate is missing.
+        max_age_days    :int
+                        Days a row is used for, after its date. Past it, the curve doesn't cover the day.
+        """
+        dates = np.array(dates, dtype='datetime64[D]')
+        rates = np.asarray(rates, dtype=np.float64).reshape(len(dates), len(maturities))
+
+        by_date = np.argsort(dates, kind='stable')
+        dates, rates = dates[by_date], rates[by_date]
+        keep = np.append(dates[1:] != dates[:-1], True) & ~np.isnan(rates).all(axis=1)
+
+        by_maturity = np.argsort(maturities, kind='stable')
+        self.dates = dates[keep]
+        self.maturities = np.asarray(maturities, dtype=np.float64)[by_maturity]
+        self.rates = rates[keep][:, by_maturity]
+        self.max_age_days = max_age_days
+
+    @classmethod
+    def load(cls, path: str, max_age_days: int = MAX_AGE_DAYS) -> 'YieldCurve':
+        if path.endswith('.json'):
+            with open(path, 'r') as f:
+                curves = json.load(f)
+
+            labels = sorted({label for curve in curves.values() for label in curve})
+            rows = [[curve.get(label) for label in labels] for curve in curves.values()]
+            dates = list(curves)
+        else:
+            with open(path, 'r', newline='') as f:
+                header, *lines = [line for line in csv.reader(f) if line]
+
+            labels = header[1:]
+            rows = [line[1:] for line in lines]
+            dates = [line[0] for line in lines]
+
+        # Columns which aren't maturities, (ex: a notes column), are left out.
+        columns = [(i, maturity_days(label)) for i, label in enumerate(labels) if maturity_days(label)]
+        if not columns:
+            raise Exception('No maturity columns found in the yield curve file.', path)
+
+        rates = [[_rate(row[i] if (i < len(row)) else None) for i, _days in columns] for row in rows]
+        return cls([_date(date) for date in dates], [days for _i, days in columns], rates, max_age_days)
+
+    def covers(self, date: datetime.date = None) -> bool:
+        return (self.__row(date) is not None)
+
+    def rate(self, days: float, date: datetime.date = None) -> float | None:
+        """
+        The rate for a maturity of days, on date, (today by default). None when the curve doesn't cover the date.
+        """
+        i = self.__row(date)
+        if (i is None): return None
+
+        known = ~np.isnan(self.rates[i])
+        return float(np.interp(days, self.maturities[known], self.rates[i][known]))
+
+    def term_rates(self, selected_chain: dict, date: datetime.date = None) -> dict | None:
+        """
+        {'nearTerm': r1, 'nextTerm': r2}, each at its term's days to expiration. None when the curve doesn't cover the date.
+        """
+        if not self.covers(date): return None
+        return {term: self.rate(options.days_to_expiration, date) for term, options in selected_chain.items()}
+
+    def __row(self, date: datetime.date = None) -> int | None:
+        day = np.datetime64(date or datetime.date.today(), 'D')
+        i = int(np.searchsorted(self.dates, day, side='right')) - 1
+        if ((i < 0) or ((day - self.dates[i]).astype(int) > self.max_age_days)):
+            return None
+        return i
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def maturity_days(label: str) -> float | None:
+    """
+    Days to maturity of a column label, ex: '3 Mo' => 91.25, '13 Wk' => 91, 'DTB3' => 91. None if it isn't one.
+    """
+    label = label.strip()
+    if (label.upper() in FRED_SERIES):
+        return FRED_SERIES[label.upper()]
+
+    match = re.match(r'^(\d+(?:\.\d+)?)\s*([a-zA-Z])', label)
+    if (not match) or (match.group(2).lower() not in UNITS):
+        return None
+    return float(match.group(1)) * UNITS[match.group(2).lower()]
+
+
+def _date(value: str) -> datetime.date:
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+    raise Exception('Unknown date format in the yield curve file.', value)
+
+
+def _rate(value) -> float:
+    if (value is None) or (str(value).strip() in ['', '.', 'N/A']):
+        return np.nan
+    return float(value)
@@ -0,0 +1,204 @@
+import os
+import time
+import threading
+
+RESULTS_PATH = 'storage/results/vix.sqlite3'
+
+# One row per computed value. The provenance columns are what it was computed from: the snapshot time of the chain,
+# the near-term and next-term expirations, (in milliseconds), the rate each of them was discounted with, and the engine.
+COLUMNS = ['ticker', 'timestamp', 'vix', 'error', 'snapshot_time', 'near_expiration', 'next_expiration', 'near_rate', 'next_rate', 'engine']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    ticker TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    vix REAL,
+    error TEXT,
+    snapshot_time REAL,
+    near_expiration INTEGER,
+    next_expiration INTEGER,
+    near_rate REAL,
+    next_rate REAL,
+    engine TEXT,
+    PRIMARY KEY (ticker, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_timestamp ON results (timestamp);
+CREATE TABLE IF NOT EXISTS tickers (ticker TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+
+# Rows are only replaced by values, or errors by errors
+UPSERT = f"""
+INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})
+ON CONFLICT (ticker, timestamp) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in COLUMNS[2:])}
+WHERE excluded.error IS NULL OR results.error IS NOT NULL
+"""
+
+
+class ResultStore:
+    """
+    Computed VIX values, with the provenance of their inputs, in a local SQLite database, (storage/results/ by default).
+
+    Rows are keyed by ticker and timestamp, (the time the value is as of), so a ticker's values over a period are one
+    range of the primary key, and the latest value of every ticker at a time is one lookup per ticker, see at().
+    Storing a value again for the same ticker and timestamp replaces it, with its provenance. An error never replaces a
+    value though, (ex: a recalculation which failed to fetch the chain), only another error, see UPSERT.
+
+    insert_many() writes a batch in a single transaction. The database is in WAL mode, so worker processes can each
+    insert their own batches while others read, writers wait on each other for up to timeout seconds. A store can be
+    sent to worker processes, each one opens its own connection. create() it before sending it, the workers then open
+    plain connections instead of all setting up the database at once. Likewise every thread using the store, (ex: the
+    request threads of a VixService), gets its own connection.
+    """
+
+    def __init__(self, path: str = RESULTS_PATH, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self.__local = threading.local()  # .connection of each thread
+        self.__created = False
+
+    def create(self) -> 'ResultStore':
+        """
+        Switches the database to WAL mode and creates its tables, once. Safe to run from many processes at the same
+        time, each step waits for the database like a write would.
+        """
+        if self.__created: return self
+
+        directory = os.path.dirname(self.path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        import sqlite3
+        connection = self.__open()
+
+        # Changing the journal mode needs the database to itself, and doesn't wait on the busy timeout.
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+                break
+            except sqlite3.OperationalError:
+                if (time.monotonic() > deadline): raise
+                time.sleep(0.01)
+
+        # BEGIN IMMEDIATE takes the write lock up front, (waiting on the busy timeout), so creating the tables can't
+        # fail half way because another process is doing the same.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in SCHEMA.split(';'):
+                if statement.strip(): connection.execute(statement)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+        self.__created = True
+        return self
+
+    def insert(self, result: dict) -> int:
+        return self.insert_many([result])
+
+    def insert_many(self, results: list) -> int:
+        """
+        Parameters
+        ----------
+        results     :list
+                    Dicts with the COLUMNS as keys, (ex: from Vix.calculate_result()), missing ones are stored as NULL.
+
+        Returns
+        -------
+        count       :int
+                    Number of rows written, errors which didn't replace a stored value are left out.
+        """
+        rows = [tuple(result.get(column) for column in COLUMNS) for result in results]
+        if not rows: return 0
+
+        connection = self.__connect()
+        with connection:
+            written = connection.executemany(UPSERT, rows).rowcount
+            connection.executemany('INSERT OR IGNORE INTO tickers (ticker) VALUES (?)', {(row[0],) for row in rows})
+
+        return written
+
+    def at(self, timestamp: float, tickers: list = None, within: float = None) -> list:
+        """
+        The latest row of every ticker at timestamp, (ex: for a dashboard of every ticker at a time).
+
+        Parameters
+        ----------
+        timestamp   :float
+                    Unix timestamp, rows after it are left out.
+        tickers     :list
+                    Defaults to every ticker in the store.
+        within      :float
+                    Seconds, tickers without a row that recent are left out.
+
+        Returns
+        -------
+        rows        :list
+                    Dicts with the COLUMNS as keys, sorted by ticker.
+        """
+        start = -float('inf') if (within is None) else timestamp - within
+        query = f"""
+            SELECT {', '.join(f'results.{column}' for column in COLUMNS)} FROM tickers
+            JOIN results ON results.ticker = tickers.ticker AND results.timestamp = (
+                SELECT MAX(latest.timestamp) FROM results AS latest
+                WHERE latest.ticker = tickers.ticker AND latest.timestamp BETWEEN ? AND ?
+            )
+        """
+        parameters = [start, timestamp]
+        if (tickers is not None):
+            query += f" WHERE tickers.ticker IN ({', '.join('?' * len(tickers))})"
+            parameters += list(tickers)
+
+        return self.__select(query + ' ORDER BY tickers.ticker', parameters)
+
+    def history(self, ticker: str = None, start: float = None, end: float = None) -> list:
+        """
+        Rows of a ticker, (or of every ticker), from start to end inclusive, in time order.
+        """
+        conditions = ['timestamp BETWEEN ? AND ?']
+        parameters = [-float('inf') if (start is None) else start, float('inf') if (end is None) else end]
+        if (ticker is not None):
+            conditions.insert(0, 'ticker = ?')
+            parameters.insert(0, ticker)
+
+        return self.__select(f"SELECT {', '.join(COLUMNS)} FROM results WHERE {' AND '.join(conditions)} ORDER BY timestamp, ticker", parameters)
+
+    def tickers(self) -> list:
+        return [row[0] for row in self.__connect().execute('SELECT ticker FROM tickers ORDER BY ticker')]
+
+    def close(self):
+        # Closes the connection of the calling thread
+        connection = getattr(self.__local, 'connection', None)
+        if connection:
+            connection.close()
+            self.__local.connection = None
+
+    def __select(self, query: str, parameters: list) -> list:
+        return [dict(zip(COLUMNS, row)) for row in self.__connect().execute(query, parameters)]
+
+    def __connect(self) -> 'sqlite3.Connection':
+        if not self.__created:
+            self.create()
+        return self.__open()
+
+    def __open(self) -> 'sqlite3.Connection':
+        # sqlite3 is only imported once the database is used, (ex: run.py imports RESULTS_PATH on every run)
+        import sqlite3
+
+        # sqlite3 connections can only be used by the thread which opened them
+        connection = getattr(self.__local, 'connection', None)
+        if (connection is None):
+            connection = self.__local.connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA synchronous=NORMAL')
+
+        return connection
+
+    def __getstate__(self):
+        # Connections can't be pickled, a worker process opens its own
+        state = self.__dict__.copy()
+        del state['_ResultStore__local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__local = threading.local()
@@ -0,0 +1,111 @@
+import time
+from vix.vix import Vix
+from vix.math import calculate_t, calculate_f, calculate_vix, term_rate
+from vix.options.chain import OptionTerm
+from vix.options.options import determine_forward_level_strike
+from vix.vectorized_volatility import VectorizedVolatility
+from vix.timeseries import TimeSeriesStore
+
+
+class VixScheduler:
+    """
+    Recomputes the VIX of a set of tickers at a fixed interval, and appends each value to a TimeSeriesStore.
+
+    Runs in a single long lived process, so imports, caches and parsed chains stay warm between ticks.
+    Chains are only fetched again once the Vix chain cache ttl has passed, (set it to the staleness you can accept),
+    and each term's strip of strikes is only rebuilt when the term comes from a new snapshot of the chain, or its K0
+    changed since the last tick. Otherwise a tick only recomputes T, F and the variance from the memoized strip.
+    Strips are only kept for the terms and tickers of the last tick, so expirations rolling off don't pile up.
+    """
+
+    def __init__(self, vix: Vix, tickers: list, interval: float = 60, store: TimeSeriesStore = None):
+        self.vix = vix
+        self.tickers = tickers
+        self.interval = interval
+        self.store = store or TimeSeriesStore()
+        self.engine = VectorizedVolatility()
+        self.stats = {'ticks': 0, 'strips_built': 0, 'strips_reused': 0, 'errors': 0}
+        self.__strips = {}  # ticker => {expiration_timestamp: (snapshot_time, strip)}
+
+    def run(self, iterations: int = None, on_tick=None):
+        """
+        Runs a tick every interval seconds, forever or for a number of iterations.
+        Ticks are aligned to the start time, a slow tick delays the next one rather than causing drift.
+        on_tick, when given, is called with the results of each tick.
+        """
+        start = time.time()
+        tick = 0
+
+        while ((iterations is None) or (tick < iterations)):
+            results = self.tick()
+            if on_tick: on_tick(results)
+            tick += 1
+
+            next_tick = start + tick * self.interval
+            delay = next_tick - time.time()
+            if ((delay > 0) and ((iterations is None) or (tick < iterations))):
+                time.sleep(delay)
+
+    def tick(self, as_of: float = None) -> dict:
+        """
+        Recomputes every ticker once, on the current chains.
+
+        Parameters
+        ----------
+        as_of       :float
+                    Unix timestamp T is measured from, (and the values are stored at), now by default.
+
+        Returns
+        -------
+        results     :dict
+                    {ticker: vix}, tickers which failed are left out and printed.
+        """
+        timestamp = time.time() if (as_of is None) else as_of
+        r = self.vix.get_shared_rate(as_of)
+        results = {}
+
+        for ticker in set(self.__strips) - set(self.tickers):
+            del self.__strips[ticker]
+
+        for ticker in self.tickers:
+            try:
+                results[ticker] = self.calculate(ticker, r, as_of)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error when calculating {ticker}: ", e.args[0] if e.args else e)
+                continue
+
+            self.store.append(ticker, timestamp, results[ticker])
+
+        self.stats['ticks'] += 1
+        return results
+
+    def calculate(self, ticker: str, r: float | dict = None, as_of: float = None) -> float:
+        selected_chain, snapshot_time = self.vix.select_chain(ticker)
+        if (r is None):
+            r = self.vix.get_term_rates(selected_chain, as_of)
+
+        t, tminutes = calculate_t(selected_chain, as_of)
+        f = calculate_f(t, r, determine_forward_level_strike(selected_chain))
+
+        # Only the strips of the terms selected now are kept
+        memoized = self.__strips.get(ticker, {})
+        strips = {}
+
+        vol = {}
+        for term, options in selected_chain.items():
+            strips[options.expiration_timestamp] = self.__get_strip(memoized.get(options.expiration_timestamp), options, f[term], snapshot_time)
+            vol[term] = self.engine.strip_variance(strips[options.expiration_timestamp][1], f[term], t[term], term_rate(r, term))
+
+        self.__strips[ticker] = strips
+        return calculate_vix(vol, t, tminutes)
+
+    def __get_strip(self, memoized: tuple, options: OptionTerm, f: float, snapshot_time: float) -> tuple:
+        # The snapshot time versions the quotes of a term, there is no need to look at them. Chains without one are
+        # always rebuilt, we can't tell whether they changed.
+        if (memoized and (snapshot_time is not None) and (memoized[0] == snapshot_time) and (memoized[1]['k0'] == self.engine.k0(f, options))):
+            self.stats['strips_reused'] += 1
+            return memoized
+
+        self.stats['strips_built'] += 1
+        return snapshot_time, self.engine.term_strip(f, options)
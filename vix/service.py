@@ -0,0 +1,252 @@
+import json
+import time
+import datetime
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from vix.vix import Vix
+
+
+class Coalescer:
+    """
+    Runs a function at most once per key at a time. A caller asking for a key which is already being computed waits
+    for that computation and gets its result, (or its exception), instead of starting another one.
+    Nothing is kept once the computation is done, the Vix caches take it from there.
+    """
+
+    def __init__(self):
+        self.stats = {'calls': 0, 'coalesced': 0}
+        self.__lock = threading.Lock()
+        self.__pending = {}  # key => _Call
+
+    def run(self, key, fn, *args, **kwargs):
+        with self.__lock:
+            call = self.__pending.get(key)
+            leader = (call is None)
+            if leader:
+                call = self.__pending[key] = _Call()
+                self.stats['calls'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if (call.error is not None):
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__pending[key]
+            call.done.set()
+
+    def run_many(self, keys: list, fn) -> dict:
+        """
+        run() for every key of a batch at once. Keys which are already being computed are waited on, fn is called once
+        with the others, (ex: one batch of the tickers nobody else is fetching), and returns {key: result}.
+        A result which is an exception is raised to the callers waiting on its key, fn raising fails all of its keys.
+
+        Returns
+        -------
+        outcomes    :dict
+                    {key: result or exception}, in the order of keys.
+        """
+        calls = {}
+        led = {}
+        with self.__lock:
+            for key in dict.fromkeys(keys):
+                call = self.__pending.get(key)
+                if (call is None):
+                    call = self.__pending[key] = led[key] = _Call()
+                    self.stats['calls'] += 1
+                else:
+                    self.stats['coalesced'] += 1
+                calls[key] = call
+
+        if led:
+            try:
+                results = fn(list(led))
+                for key, call in led.items():
+                    if isinstance(results[key], Exception): call.error = results[key]
+                    else: call.result = results[key]
+            except Exception as e:
+                for call in led.values(): call.error = e
+                raise
+            finally:
+                with self.__lock:
+                    for key in led: del self.__pending[key]
+                for call in led.values(): call.done.set()
+
+        for call in calls.values(): call.done.wait()
+        return {key: call.result if (call.error is None) else call.error for key, call in calls.items()}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class VixService:
+    """
+    Serves the VIX over HTTP/JSON from one long lived Vix, so parsed chains, rates and memoized strips stay warm in
+    memory between requests, and no request pays for process startup or imports.
+
+        GET  /vix/{ticker}?as_of=&r=            {"ticker": "SPY", "vix": 18.42}
+        GET  /vix?tickers=SPY,AAPL&as_of=&r=    {"results": {ticker: vix}, "errors": {ticker: message}}
+        POST /vix {"tickers": [...], "as_of": ..., "r": ...}
+        GET  /health                            Uptime, request counts and cache statistics
+
+    as_of is a unix timestamp or an ISO date and time, (see Vix.calculate()), r a rate in percents, both optional.
+    Concurrent requests for the same ticker with the same as_of and r share one fetch and calculation, see Coalescer,
+    whether they are single tickers or part of overlapping batches. A batch only calculates the tickers nobody else is
+    calculating, through Vix.calculate_batch(), and waits on the others.
+    """
+
+    def __init__(self, vix: Vix, host: str = '127.0.0.1', port: int = 8080, log: bool = False):
+        """
+        Parameters
+        ----------
+        vix         :Vix
+        host        :str
+        port        :int
+                    0 picks a free port, see self.port once started.
+        log         :bool
+                    Print a line per request.
+        """
+        self.vix = vix
+        self.log = log
+        self.coalescer = Coalescer()
+        self.started_at = time.time()
+        self.stats = {'requests': 0, 'errors': 0}
+        self.__lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self.host, self.port = self.server.server_address[:2]
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self) -> threading.Thread:
+        # Serves on a background thread, (ex: in tests, or next to a scheduler).
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calculate(self, ticker: str, r: float = None, as_of: float = None) -> float:
+        return self.coalescer.run((ticker, r, as_of), self.vix.calculate, ticker, r=r, as_of=as_of)
+
+    def calculate_batch(self, tickers: list, r: float = None, as_of: float = None) -> dict:
+        def calculate(keys: list) -> dict:
+            batch = self.vix.calculate_batch([ticker for ticker, _r, _as_of in keys], r=r, as_of=as_of)
+            return {key: batch['results'][key[0]] if (key[0] in batch['results']) else Exception(batch['errors'][key[0]]) for key in keys}
+
+        batch = {'results': {}, 'errors': {}}
+        for (ticker, _r, _as_of), outcome in self.coalescer.run_many([(ticker, r, as_of) for ticker in tickers], calculate).items():
+            if isinstance(outcome, Exception):
+                batch['errors'][ticker] = str(outcome.args[0]) if outcome.args else repr(outcome)
+            else:
+                batch['results'][ticker] = outcome
+        return batch
+
+    def count(self, status: int):
+        with self.__lock:
+            self.stats['requests'] += 1
+            if (status >= 400): self.stats['errors'] += 1
+
+    def health(self) -> dict:
+        return {
+            'uptime': time.time() - self.started_at,
+            **self.stats,
+            **self.coalescer.stats,
+            'caches': self.vix.cache_stats(),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+
+        if (parts == ['health']):
+            return self.__respond(200, self.server.service.health())
+        if (parts[:1] != ['vix']) or (len(parts) > 2):
+            return self.__respond(404, {'error': f"Unknown path {url.path}"})
+
+        tickers = parts[1:] or [ticker for ticker in query.get('tickers', '').split(',') if ticker]
+        self.__calculate(tickers, query, single=(len(parts) == 2))
+
+    def do_POST(self):
+        if (urlparse(self.path).path.rstrip('/') != '/vix'):
+            return self.__respond(404, {'error': f"Unknown path {self.path}"})
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            return self.__respond(400, {'error': f"Invalid JSON body: {e}"})
+
+        if not isinstance(body, dict):
+            return self.__respond(400, {'error': 'The body must be a JSON object.'})
+        if not isinstance(body.get('tickers', []), list):
+            return self.__respond(400, {'error': 'tickers must be a list, (ex: ["SPY"]).'})
+
+        self.__calculate(body.get('tickers', []), body, single=False)
+
+    def __calculate(self, tickers: list, options: dict, single: bool):
+        service = self.server.service
+
+        try:
+            tickers = [ticker.upper() for ticker in tickers]
+            r = float(options['r']) if (options.get('r') is not None) else None
+            as_of = _timestamp(options['as_of']) if (options.get('as_of') is not None) else None
+            if not tickers: raise ValueError('No tickers requested.')
+        except (ValueError, TypeError, AttributeError) as e:
+            return self.__respond(400, {'error': str(e)})
+
+        if not single:
+            try:
+                return self.__respond(200, service.calculate_batch(tickers, r, as_of))
+            except Exception as e:  # Only the batch as a whole, (ex: the rate lookup), fails this way
+                return self.__respond(500, {'error': str(e.args[0]) if e.args else repr(e)})
+
+        try:
+            self.__respond(200, {'ticker': tickers[0], 'vix': service.calculate(tickers[0], r, as_of)})
+        except Exception as e:
+            self.__respond(422, {'ticker': tickers[0], 'error': str(e.args[0]) if e.args else repr(e)})
+
+    def __respond(self, status: int, body: dict):
+        self.server.service.count(status)
+
+        encoded = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        if self.server.service.log:
+            super().log_message(format, *args)
+
+
+def _timestamp(value) -> float:
+    # A unix timestamp, or an ISO date and time, (ex: 2023-03-09T15:00:00), in local time like the rest of Vix.
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
@@ -0,0 +1,228 @@
+import sys
+import json
+import struct
+import threading
+import numpy as np
+
+"""
+Binary format of a VarianceSurface, the same bytes in a file or in shared memory.
+
+    MAGIC (8 bytes) | version (uint32) | header length (uint32) | header (JSON, utf-8) | padding | expirations | padding | strikes
+
+expirations and strikes are the little-endian structured arrays EXPIRATION and STRIKE, each starting on an ALIGNMENT
+boundary, so readers map them in place with np.frombuffer() instead of deserializing anything.
+"""
+
+MAGIC = b'VIXSURF\0'
+VERSION = 1
+ALIGNMENT = 64
+
+# One row per expiration. start and count locate its strikes.
+EXPIRATION = np.dtype([
+    ('expiration_timestamp', '<i8'),  # Milliseconds
+    ('days_to_expiration', '<i8'),
+    ('t', '<f8'),
+    ('tminutes', '<f8'),
+    ('r', '<f8'),
+    ('f', '<f8'),
+    ('k0', '<f8'),
+    ('variance', '<f8'),
+    ('start', '<i8'),
+    ('count', '<i8'),
+])
+
+# One row per strike of each expiration's strip, sorted by strike: puts below K0, the K0 call, the K0 put, calls above K0.
+STRIKE = np.dtype([
+    ('expiration', '<i8'),  # Row in the expirations array
+    ('side', 'S1'),  # b'C' or b'P'
+    ('strike', '<f8'),
+    ('quote', '<f8'),  # Mid-quote, the average of the K0 call and put at K0
+    ('delta_k', '<f8'),
+    ('contribution', '<f8'),  # ∆Ki/Ki**2 e**(rt) * q
+])
+
+
+class VarianceSurface:
+    """
+    Everything the variance of each expiration is computed from, kept instead of discarded: T, r, F, K0 and the
+    variance per expiration, and the strip of each one with the ∆Ki, quote and contribution of every strike.
+
+        variance = 2/T ∑contribution - 1/T (F/K0 - 1)**2
+
+    Surfaces can be saved to a file, or put in shared memory, and read by other processes without copying or parsing,
+    see save(), load(), share() and attach(). expiration_errors holds {expiration_timestamp: message} for expirations
+    which couldn't be calculated, they have no row.
+    """
+
+    def __init__(self, expirations: np.ndarray, strikes: np.ndarray, symbol: str = None, as_of: float = None, expiration_errors: dict = None):
+        self.expirations = expirations
+        self.strikes = strikes
+        self.symbol = symbol
+        self.as_of = as_of
+        self.expiration_errors = expiration_errors or {}
+        self.shared_memory = None  # Set by attach(), the arrays are views on it
+
+    @classmethod
+    def from_variances(cls, terms: list, variances: dict, symbol: str = None, as_of: float = None) -> 'VarianceSurface':
+        """
+        Builds the surface from BatchedVolatility.variances(terms, ..., strips=True).
+        """
+        calculated = np.flatnonzero(variances['error'] == None)
+        strips = variances['strips']
+        lengths = variances['strikes_retained'][calculated].astype(np.int64)
+
+        expirations = np.zeros(len(calculated), dtype=EXPIRATION)
+        expirations['expiration_timestamp'] = [terms[i].expiration_timestamp for i in calculated.tolist()]
+        expirations['days_to_expiration'] = [terms[i].days_to_expiration for i in calculated.tolist()]
+        for name in ['t', 'tminutes', 'r', 'f', 'k0', 'variance']:
+            expirations[name] = variances[name][calculated]
+        expirations['count'] = lengths
+        expirations['start'] = np.cumsum(lengths) - lengths
+
+        # The rows of the calculated strips, out of every term's strip laid back to back
+        rows = np.repeat(strips['start'][calculated] - expirations['start'], lengths) + np.arange(lengths.sum())
+
+        strikes = np.zeros(len(rows), dtype=STRIKE)
+        strikes['expiration'] = np.repeat(np.arange(len(calculated)), lengths)
+        strikes['strike'] = strips['strikes'][rows]
+        strikes['quote'] = strips['quotes'][rows]
+        strikes['delta_k'] = strips['delta_k'][rows]
+        strikes['contribution'] = strips['contributions'][rows]
+
+        # Strikes below K0 are puts and above it calls. K0 is listed twice, its call then its put.
+        below_k0 = (strikes['strike'] < np.repeat(expirations['k0'], lengths))
+        strikes['side'] = np.where(below_k0, b'P', b'C')
+        if len(calculated):
+            strikes['side'][expirations['start'] + np.add.reduceat(below_k0, expirations['start']) + 1] = b'P'
+
+        errors = {int(terms[i].expiration_timestamp): variances['error'][i] for i in np.flatnonzero(variances['error'] != None).tolist()}
+        return cls(expirations, strikes, symbol, as_of, errors)
+
+    def strip(self, i: int) -> np.ndarray:
+        # The strikes of the expiration in row i
+        return self.strikes[self.expirations['start'][i]:self.expirations['start'][i] + self.expirations['count'][i]]
+
+    def to_bytes(self) -> bytes:
+        preamble, strikes_offset = self.__preamble()
+        return b''.join([
+            preamble,
+            np.ascontiguousarray(self.expirations, dtype=EXPIRATION).tobytes(),
+            b'\0' * (strikes_offset - len(preamble) - self.expirations.nbytes),
+            np.ascontiguousarray(self.strikes, dtype=STRIKE).tobytes(),
+        ])
+
+    def save(self, path: str) -> str:
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'VarianceSurface':
+        # The arrays are read only views on the memory mapped file
+        return cls.from_buffer(np.memmap(path, dtype=np.uint8, mode='r'))
+
+    def share(self, name: str = None) -> 'SharedMemory':
+        """
+        Copies the surface into a new block of shared memory, other processes attach() to it by its name.
+        The caller owns the block: close() it when done, and unlink() it once no process needs it anymore.
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        data = self.to_bytes()
+        shared_memory = SharedMemory(name=name, create=True, size=len(data))
+        shared_memory.buf[:len(data)] = data
+        return shared_memory
+
+    @classmethod
+    def attach(cls, name: str) -> 'VarianceSurface':
+        """
+        Reads a surface put in shared memory by share(), without copying it. The block stays open for as long as the
+        surface, (see self.shared_memory), and is left for its owner to unlink.
+        """
+        shared_memory = _attach_untracked(name)
+        surface = cls.from_buffer(shared_memory.buf)
+        surface.shared_memory = shared_memory
+        return surface
+
+    def close(self):
+        # The arrays are views on the shared memory, which can't be closed while they exist
+        self.expirations = self.strikes = None
+        if self.shared_memory:
+            self.shared_memory.close()
+            self.shared_memory = None
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'VarianceSurface':
+        view = memoryview(buffer)
+        if (bytes(view[:len(MAGIC)]) != MAGIC):
+            raise Exception('Not a variance surface.')
+
+        version, header_length = struct.unpack('<II', bytes(view[len(MAGIC):len(MAGIC) + 8]))
+        if (version != VERSION):
+            raise Exception('Unsupported variance surface version.', version)
+
+        header = json.loads(bytes(view[len(MAGIC) + 8:len(MAGIC) + 8 + header_length]).decode('utf-8'))
+        expirations = np.frombuffer(buffer, dtype=EXPIRATION, count=header['expirations'], offset=header['expirationsOffset'])
+        strikes = np.frombuffer(buffer, dtype=STRIKE, count=header['strikes'], offset=header['strikesOffset'])
+
+        errors = {int(expiration): message for expiration, message in header['expirationErrors'].items()}
+        return cls(expirations, strikes, header['symbol'], header['asOf'], errors)
+
+    def __preamble(self) -> tuple[bytes, int]:
+        # The header holds the offsets of the arrays, which depend on the length of the header itself
+        header = {
+            'symbol': self.symbol,
+            'asOf': self.as_of,
+            'expirations': len(self.expirations),
+            'strikes': len(self.strikes),
+            'expirationErrors': {str(expiration): message for expiration, message in self.expiration_errors.items()},
+            'expirationsOffset': 0,
+            'strikesOffset': 0,
+        }
+
+        while True:
+            encoded_header = json.dumps(header).encode('utf-8')
+            preamble = MAGIC + struct.pack('<II', VERSION, len(encoded_header)) + encoded_header
+            expirations_offset = _align(len(preamble))
+            strikes_offset = _align(expirations_offset + self.expirations.nbytes)
+
+            if ((header['expirationsOffset'], header['strikesOffset']) == (expirations_offset, strikes_offset)):
+                return preamble + b'\0' * (expirations_offset - len(preamble)), strikes_offset
+            header['expirationsOffset'], header['strikesOffset'] = expirations_offset, strikes_offset
+
+    def __len__(self):
+        return len(self.expirations)
+
+
+_attaching = threading.Lock()
+
+
+def _attach_untracked(name: str) -> 'SharedMemory':
+    # Only the owner of a block tracks it, the resource tracker unlinks the blocks still registered when it exits.
+    from multiprocessing.shared_memory import SharedMemory
+
+    if (sys.version_info >= (3, 13)):
+        return SharedMemory(name=name, track=False)
+
+    # Before 3.13 attaching registers the block too. Unregistering it afterwards would also drop the owner's
+    # registration whenever we share its tracker, (the owner's own process, or its worker processes), so the
+    # registration of this block is skipped instead.
+    from multiprocessing import resource_tracker
+
+    with _attaching:
+        register = resource_tracker.register
+
+        def register_others(resource: str, rtype: str):
+            if (rtype != 'shared_memory') or (resource.lstrip('/') != name.lstrip('/')):
+                register(resource, rtype)
+
+        resource_tracker.register = register_others
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % ALIGNMENT)
+
@@ -0,0 +1,112 @@
+import numpy as np
+from vix.math import calculate_vix
+from vix.options.chain import OptionChain
+from vix.batched_volatility import BatchedVolatility
+
+HORIZONS = [9, 30, 93, 184]  # Days, the horizons of VIX9D, VIX, VIX3M and VIX6M
+MINUTES_IN_DAY = 1440
+
+
+class TermStructure:
+    """
+    Constant maturity volatility indices at any set of horizons, (ex: 9 days, 30 days, 3 and 6 months), from one pass
+    over the chains.
+
+    The variance of every expiration of every chain is computed once, in a single BatchedVolatility.variances() pass,
+    into a table per chain. Each horizon is then the VIX interpolation, (see calculate_vix()), between the two
+    expirations of the table on either side of it, so adding a horizon costs nothing but that interpolation.
+
+    Each expiration uses the forward level strike of its own calls and puts, so the 30 day value can differ slightly
+    from Vix.calculate(), which selects its terms by the VIX expiration rules and uses the near-term strike for both.
+    """
+
+    min_days_to_expiration = 1  # Expirations on their last day are left out, their T is mostly the time to midnight
+
+    def calculate(self, chains: dict, r: float | dict, horizons: list = HORIZONS, as_of: float = None) -> dict:
+        """
+        Parameters
+        ----------
+        chains      :dict
+                    {ticker: OptionChain}
+        r           :float | dict
+                    Risk-free rate, or {expiration_timestamp: r}, (ex: from a YieldCurve).
+        horizons    :list
+                    Days to a constant maturity.
+        as_of       :float
+                    Unix timestamp T is measured from, now by default.
+
+        Returns
+        -------
+        batch       :dict
+                    {'results': {ticker: {horizon: vix}}, 'errors': {ticker: {horizon: message}},
+                     'variances': {ticker: table}}, see variance_table() for the tables.
+        """
+        expirations = {ticker: self.expirations(chain) for ticker, chain in chains.items()}
+        calculated = BatchedVolatility().variances([term for terms in expirations.values() for term in terms], r, as_of)
+
+        batch = {'results': {}, 'errors': {}, 'variances': {}}
+        start = 0
+        for ticker, terms in expirations.items():
+            rows = slice(start, start + len(terms))
+            start += len(terms)
+
+            table = self.variance_table(terms, {name: column[rows] for name, column in calculated.items()})
+            batch['variances'][ticker] = table
+            batch['results'][ticker], errors = self.interpolate(table, horizons)
+            if errors:
+                batch['errors'][ticker] = errors
+
+        return batch
+
+    def expirations(self, chain: OptionChain) -> list:
+        # Every distinct expiration of the chain, sorted by days to expiration
+        index = chain.expiration_index
+        first = index.first(self.min_days_to_expiration)
+        if (first is None): return []
+
+        return [chain.terms[position] for position in index.positions[first:].tolist()]
+
+    def variance_table(self, terms: list, calculated: dict) -> dict:
+        """
+        Returns
+        -------
+        table       :dict
+                    Arrays aligned on the expirations: 'expiration_timestamp', 'days_to_expiration', 't', 'tminutes',
+                    'variance', 'strikes_retained' and 'error', (None, or why the expiration has no variance).
+        """
+        return {
+            'expiration_timestamp': np.array([term.expiration_timestamp for term in terms], dtype=np.int64),
+            'days_to_expiration': np.array([term.days_to_expiration for term in terms], dtype=np.int64),
+            **calculated,
+        }
+
+    def interpolate(self, table: dict, horizons: list) -> tuple[dict, dict]:
+        """
+        Returns
+        -------
+        interpolated    :tuple
+                        ({horizon: vix}, {horizon: message}), each horizon is in one of the two.
+        """
+        valid = np.flatnonzero(table['error'] == None)
+        valid = valid[np.argsort(table['tminutes'][valid], kind='stable')]
+        tminutes = table['tminutes'][valid]
+
+        results = {}
+        errors = {}
+        for horizon in horizons:
+            minutes = horizon * MINUTES_IN_DAY
+            if ((len(valid) < 2) or (minutes < tminutes[0]) or (minutes > tminutes[-1])):
+                errors[horizon] = f"No expirations on both sides of {horizon} days."
+                continue
+
+            # The expirations right before and after the horizon, as the near and next terms
+            i = min(max(int(np.searchsorted(tminutes, minutes)), 1), len(valid) - 1)
+            lower, upper = int(valid[i - 1]), int(valid[i])
+            terms = lambda column: {'nearTerm': float(table[column][lower]), 'nextTerm': float(table[column][upper])}
+
+            try:
+                results[horizon] = calculate_vix(terms('variance'), terms('t'), terms('tminutes'), minutes)
+            except ValueError as e:
+                errors[horizon] = str(e)
+
+        return results, errors
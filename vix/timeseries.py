@@ -0,0 +1,49 @@
+import os
+import numpy as np
+
+RECORD = np.dtype([('timestamp', '<f8'), ('vix', '<f8')])
+
+
+class TimeSeriesStore:
+    """
+    Append-only store of VIX values over time, one file per ticker under storage/timeseries/.
+    Each record is a fixed 16 bytes, (unix timestamp, vix), so appending is a single write and reading a whole
+    series is a single np.fromfile(). Records are appended in time order, so range reads are a binary search.
+    """
+
+    def __init__(self, directory: str = 'storage/timeseries'):
+        self.directory = directory
+
+    def append(self, ticker: str, timestamp: float, vix: float):
+        self.append_many(ticker, [(timestamp, vix)])
+
+    def append_many(self, ticker: str, records: list):
+        os.makedirs(self.directory, exist_ok=True)
+        data = np.array(records, dtype=RECORD)
+
+        # A single write in append mode, so concurrent writers never interleave within a record.
+        with open(self.__path(ticker), 'ab') as f:
+            f.write(data.tobytes())
+
+    def read(self, ticker: str, start: float = None, end: float = None) -> np.ndarray:
+        """
+        Returns
+        -------
+        series      :np.ndarray
+                    Structured array with 'timestamp' and 'vix' fields, from start to end inclusive.
+        """
+        path = self.__path(ticker)
+        if not os.path.exists(path): return np.empty(0, dtype=RECORD)
+
+        series = np.fromfile(path, dtype=RECORD)
+        lower = 0 if start is None else np.searchsorted(series['timestamp'], start, side='left')
+        upper = len(series) if end is None else np.searchsorted(series['timestamp'], end, side='right')
+
+        return series[lower:upper]
+
+    def tickers(self) -> list:
+        if not os.path.exists(self.directory): return []
+        return sorted(name[:-len('.bin')] for name in os.listdir(self.directory) if name.endswith('.bin'))
+
+    def __path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{ticker}.bin")
@@ -0,0 +1,131 @@
+import numpy as np
+from math import e
+from vix.options.chain import OptionTerm
+from vix.math import term_rate
+
+
+class VectorizedVolatility:
+    """
+    Array implementation of Volatility.calculate().
+    Each step of the loop implementation (K0, the zero bid truncation, the VIX strip and ∆Ki contributions) is
+    computed with numpy over the columnar OptionTerm, and produces the same variances as Volatility.
+    """
+
+    def calculate(self, f: dict, t: dict, r: float | dict, selected_chain: dict) -> dict:
+        """
+        f = forward level
+        t = time to expiration
+        r = risk free rate, or one per term
+        selected_chain = selected option chain
+
+        The number of strikes kept in each term's strip is left in self.strikes_retained.
+        """
+
+        vol = {}
+        self.strikes_retained = {}
+        for term, options in selected_chain.items():
+            strip = self.term_strip(f[term], options)
+            vol[term] = self.strip_variance(strip, f[term], t[term], term_rate(r, term))
+            self.strikes_retained[term] = len(strip['strikes'])
+
+        return vol
+
+    def term_variance(self, f: float, t: float, r: float, options: OptionTerm) -> float:
+        return self.strip_variance(self.term_strip(f, options), f, t, r)
+
+    def term_strip(self, f: float, options: OptionTerm) -> dict:
+        """
+        The part of a term's variance which only depends on its quotes and K0: the strip of strikes between the zero bid
+        truncation bounds, their ∆Ki, quotes, and ∑∆Ki/Ki**2 * q. T and r only come in through strip_variance(), so a
+        strip can be reused as time passes, for as long as the quotes and K0 stay the same.
+        """
+        k0, call_k0, put_k0 = self.__calculateK0(options, float(int(f)))
+
+        call = options.call
+        put = options.put
+
+        # "The K0 put and call prices are averaged to produce a single value."
+        put_call_avg = (call.mid[call_k0] + put.mid[put_k0]) / 2
+
+        # Out of the money calls walking up from K0, out of the money puts walking down from K0.
+        call_bound = call_k0 + self.__truncate(call.bid[call_k0:], call.ask[call_k0:])
+        put_bound = put_k0 - self.__truncate(put.bid[put_k0::-1], put.ask[put_k0::-1])
+
+        # Same ordering as sorting the loop implementation's chain: puts below K0, the K0 call, the K0 put, calls above K0.
+        strikes = np.concatenate((put.strikes[put_bound:put_k0], [k0, k0], call.strikes[call_k0 + 1:call_bound + 1]))
+        quotes = np.concatenate((put.mid[put_bound:put_k0], [put_call_avg, put_call_avg], call.mid[call_k0 + 1:call_bound + 1]))
+        delta_k = self.__calculate_delta_k(strikes)
+
+        # ∆Ki/Ki**2 * q, e**(rt) is applied in strip_variance()
+        weights = delta_k / np.square(strikes) * quotes
+
+        return {
+            'k0': k0,
+            'strikes': strikes,
+            'quotes': quotes,
+            'delta_k': delta_k,
+            'weights': weights,
+            'weight_sum': float(np.sum(weights)),
+        }
+
+    def strip_variance(self, strip: dict, f: float, t: float, r: float) -> float:
+        # The following is essentially the VIX formula
+        # 2/T ∑∆Ki/Ki**2 e**(rt) * q
+        sigma_KcT = (2/t * pow(e, r*t) * strip['weight_sum'])
+        tK = 1/float(t) * pow(((float(f) / float(strip['k0'])) - 1), 2)
+
+        return abs(sigma_KcT - tK)
+
+    def k0(self, f: float, options: OptionTerm) -> float:
+        """
+        K0 for a forward level, without building the strip. Used to check whether a strip is still valid for a new F.
+        """
+        return self.__calculateK0(options, float(int(f)))[0]
+
+    def __calculateK0(self, options: OptionTerm, min_forward_level: float) -> tuple[float, int, int]:
+        # The first strike below the forward index level, F. The loop implementation ends on the put side.
+        for side in [options.put, options.call]:
+            i = int(np.searchsorted(side.strikes, min_forward_level, side='right')) - 1
+            if (i >= 0):
+                k0 = float(side.strikes[i])
+                break
+        else:
+            raise Exception('No strike found below the forward level.', min_forward_level)
+
+        call_k0 = self.__strike_index(options.call.strikes, k0)
+        put_k0 = self.__strike_index(options.put.strikes, k0)
+
+        return k0, call_k0, put_k0
+
+    def __strike_index(self, strikes: np.ndarray, strike: float) -> int:
+        i = int(np.searchsorted(strikes, strike))
+        if (i == len(strikes) or strikes[i] != strike):
+            raise KeyError(strike)
+        return i
+
+    def __truncate(self, bid: np.ndarray, ask: np.ndarray) -> int:
+        """
+        Returns the offset from K0 of the last strike to include, walking away from K0.
+        Once two zero bids are encountered, no further strikes are considered. Matches Volatility.__calculate_bounds().
+        """
+        zero = (bid == 0) | (ask == 0)
+        zeros_before = np.cumsum(zero) - zero
+        included = np.flatnonzero(~zero & (zeros_before < 2))
+
+        if (len(included) == 0):
+            raise KeyError('No strikes with a bid and ask found next to K0.')
+
+        return int(included[-1])
+
+    def __calculate_delta_k(self, strikes: np.ndarray) -> np.ndarray:
+        """
+        Determining ∆Ki
+        Half the difference between the strike prices on either side of Ki, and at the upper and lower
+        edges of the strip, the difference between Ki and the adjacent strike price.
+        """
+        delta_k = np.empty_like(strikes)
+        delta_k[0] = strikes[1] - strikes[0]
+        delta_k[-1] = strikes[-1] - strikes[-2]
+        delta_k[1:-1] = (strikes[2:] - strikes[:-2]) / 2
+
+        return delta_k
@@ -1,10 +1,28 @@
-import math
+import os
+import time
+import datetime
+import threading
+from vix.http import fred as rates_cache_config, td_ameritrade as chain_cache_config
 from vix.http.fred import Fred
-from vix.http.td_ameritrade import TDAmeritrade
+from vix.cache.disk import DiskCache
+from vix.cache.memory import MemoryCache
+from vix.cache.strips import StripCache
+from vix.metrics import Metrics
+from vix.rates import YieldCurve, YIELD_CURVE_PATH, THREE_MONTHS
+from vix.providers.provider import ChainProvider
+from vix.providers.td_ameritrade import TDAmeritradeProvider
 from vix.options.options import *
 from vix.options.expirations import Expirations
+from vix.options.chain import OptionChain, PRUNE_BAND
 from vix.math import *
 from vix.volatility import Volatility
+from vix.vectorized_volatility import VectorizedVolatility
+from vix.batched_volatility import BatchedVolatility
+from vix.incremental_volatility import IncrementalVolatility
+from vix.term_structure import TermStructure, HORIZONS
+from vix.surface import VarianceSurface
+
+_opening_result_store = threading.Lock()
 
 
 class Vix:
@@ -15,81 +33,691 @@ class Vix:
 
     VIX Whitepaper:
     https://www.sfu.ca/~poitras/419_VIX.pdf
+
+    The variance of each term can be computed by two engines which produce the same results:
+    'numpy' (default) runs each step as array operations, 'python' is the original loop implementation.
+
+    Each step of a calculation is recorded in self.metrics, see Metrics. Pass a Metrics with hooks to receive
+    the records as they are made.
+
+    calculate_batch() runs many tickers together through BatchedVolatility, which computes every ticker's variances
+    and VIX in one pass of array operations, with the same results.
+
+    Each term gets its own risk-free rate, interpolated on a local yield curve file, (see YieldCurve), when there is one
+    for the day. Otherwise both terms use the 3m treasury yield scraped from FRED.
+
+    Chains come from a ChainProvider, TD Ameritrade by default. Pass a SnapshotProvider to run on recorded chains,
+    (ex: backtests, load tests), without any network.
+
+    Fetched chains are pruned of the deep out of the money strikes the VIX never reaches, (see OptionTerm.pruned()),
+    before they are cached. prune_band=None keeps every strike.
+
+    Pass a ResultStore, (or the path of its database), as result_store to keep every computed value, with the provenance of its inputs, (chain snapshot
+    time, selected expirations and rates), so it can be queried later instead of calculated again.
     """
 
-    def __init__(self, td_api_key: str, caching_enabled: bool = True, debug: bool = False):
+    engines = {
+        'numpy': VectorizedVolatility,
+        'python': Volatility,
+    }
+
+    def __init__(self, td_api_key: str, caching_enabled: bool = True, debug: bool = False, engine: str = 'numpy', cache_format: str = 'binary',
+                 chain_cache_ttl: float = chain_cache_config.CACHE_TTL, chain_cache_max_bytes: int = chain_cache_config.CACHE_MAX_BYTES,
+                 memory_cache_size: int = 128, metrics: Metrics = None, provider: ChainProvider = None,
+                 yield_curve: YieldCurve | str = YIELD_CURVE_PATH, prune_band: float = PRUNE_BAND, result_store: 'ResultStore | str' = None):
+        if (engine not in self.engines):
+            raise Exception(f"Unknown volatility engine '{engine}'. Choose from: {', '.join(self.engines)}")
+
         self.api_key = td_api_key
         self.caching_enabled = caching_enabled
         self.debug = debug
+        self.engine = engine
+        self.cache_format = cache_format
+        self.prune_band = prune_band
+        self.chain_cache = DiskCache(chain_cache_config.CACHE_DIRECTORY, ttl=chain_cache_ttl, max_bytes=chain_cache_max_bytes)
+        self.rates_cache = DiskCache(rates_cache_config.CACHE_DIRECTORY, ttl=rates_cache_config.CACHE_TTL, max_bytes=rates_cache_config.CACHE_MAX_BYTES)
+
+        # Parsed chains and rates are also kept in memory, so a long lived Vix never goes back to disk for a hot ticker.
+        # memory_cache_size=0 disables this.
+        self.chain_memory = MemoryCache(max_entries=memory_cache_size, ttl=chain_cache_ttl)
+        self.rates_memory = MemoryCache(max_entries=min(memory_cache_size, 8), ttl=rates_cache_config.CACHE_TTL)
+
+        self.metrics = metrics or Metrics()
 
-    def calculate(self, ticker):
+        # A YieldCurve, or the path of its file, only loaded once a rate is needed. None to always use FRED.
+        self.yield_curve = yield_curve
+
+        # Where computed values are stored, a ResultStore or the path of its database, only opened once a value is
+        # stored. None keeps nothing.
+        self.result_store = result_store
+
+        self.__default_provider = (provider is None)
+        self.provider = provider or TDAmeritradeProvider(
+            api_key=td_api_key,
+            cache=caching_enabled,
+            debug=debug,
+            cache_format=cache_format,
+            disk_cache=self.chain_cache,
+            prune_band=prune_band,
+        )
+
+        # The selected near-term and next-term strips are memoized per chain snapshot, and per provider, see StripCache.
+        self.strip_cache = StripCache(ttl=chain_cache_ttl, memory_size=memory_cache_size, scope=self.provider.identity())
+
+    def calculate(self, ticker, r: float = None, as_of: float = None):
         """
         Runs the VIX equation on a ticker.
 
         Parameters
         ----------
         ticker      :string
+        r           :float | dict
+                    Risk-free rate, or {'nearTerm': r1, 'nextTerm': r2}. By default, see get_term_rates().
+        as_of       :float
+                    Unix timestamp to calculate the VIX as of, now by default. The chain is the provider's chain as of
+                    that time, (see SnapshotProvider), T is measured from it, and r is the rate published on that day.
 
         Returns
         -------
         vix         :float
         """
+        result = self.calculate_result(ticker, r, as_of)
+        self.__store([result])
+        return result['vix']
 
-        chain = self.__build_option_chain(ticker)
+    def calculate_result(self, ticker: str, r: float | dict = None, as_of: float = None) -> dict:
+        """
+        Same as calculate(), but returns the value with the provenance of its inputs, and doesn't store it.
 
-        selected_chain = self.__get_near_next_term_options(chain)
+        Returns
+        -------
+        result      :dict
+                    {'ticker', 'timestamp', 'vix', 'error', 'snapshot_time', 'near_expiration', 'next_expiration',
+                     'near_rate', 'next_rate', 'engine'}, see ResultStore. timestamp is as_of, or when the calculation ran.
+        """
+        timestamp = time.time() if (as_of is None) else as_of
 
-        r = self.__get_risk_free_rate()
+        with self.metrics.step('calculate', ticker=ticker) as record:
+            selected_chain, snapshot_time = self.select_chain(ticker, as_of)
 
-        t, tminutes = self.__get_t1_t2(selected_chain)
+            if (r is None):
+                r = self.get_term_rates(selected_chain, as_of)
 
-        f = self.__get_forward_level(t, r, selected_chain)
+            record['vix'] = self.__calculate_selected_chain(selected_chain, r, ticker, as_of)
 
-        vol = self.__get_volatility(f, t, r, selected_chain)
+        return _result(ticker, timestamp, record['vix'], None, selected_chain, r, snapshot_time, self.engine)
 
-        vix = self.__equation(vol, t, tminutes)
+    def calculate_chain(self, chain: OptionChain, r: float | dict = None, ticker: str = None, as_of: float = None) -> float:
+        """
+        Runs steps 2 through 8 of the VIX equation on an already fetched option chain.
+        r is looked up for the selected terms when not given, see get_term_rates().
+        ticker only labels the metrics records, and defaults to the chain's symbol.
+        as_of is the unix timestamp T is measured from, (ex: the chain's snapshot_time), now by default.
+        """
+        result = self.calculate_chain_result(chain, r, ticker, as_of)
+        self.__store([result])
+        return result['vix']
+
+    def calculate_chain_result(self, chain: OptionChain, r: float | dict = None, ticker: str = None, as_of: float = None) -> dict:
+        # Same as calculate_chain(), with the provenance of the value, see calculate_result().
+        ticker = ticker or chain.symbol
+        timestamp = time.time() if (as_of is None) else as_of
+
+        with self.metrics.step('calculate', ticker=ticker) as record:
+            selected_chain = self.__get_near_next_term_options(ticker, chain)
+
+            if (r is None):
+                r = self.get_term_rates(selected_chain, as_of)
+
+            record['vix'] = self.__calculate_selected_chain(selected_chain, r, ticker, as_of)
+
+        return _result(ticker, timestamp, record['vix'], None, selected_chain, r, chain.snapshot_time, self.engine)
+
+    def __calculate_selected_chain(self, selected_chain: dict, r: float | dict, ticker: str = None, as_of: float = None) -> float:
+        with self.metrics.step('calculate_t', ticker=ticker):
+            t, tminutes = self.__get_t1_t2(selected_chain, as_of)
+
+        with self.metrics.step('forward_level', ticker=ticker) as record:
+            f = self.__get_forward_level(t, r, selected_chain)
+            record['f'] = f
+
+        with self.metrics.step('volatility', ticker=ticker, engine=self.engine) as record:
+            vol = self.__get_volatility(f, t, r, selected_chain, record)
+
+        with self.metrics.step('equation', ticker=ticker):
+            vix = self.__equation(vol, t, tminutes)
 
         return vix
 
-    def __build_option_chain(self, ticker: str) -> dict:
-        # Step 1: Fetch the option chain for the ticker.
+    def calculate_many(self, tickers: list, max_workers: int = None) -> dict:
+        """
+        Runs the VIX equation on many tickers, spread across a pool of processes.
+        The risk-free rate is looked up once and shared by every ticker, (see get_shared_rate()). A ticker that fails, (for example one without
+        enough option contracts), is reported in errors and does not stop the rest of the batch.
+
+        Parameters
+        ----------
+        tickers     :list
+        max_workers :int
+                    Number of processes, defaults to the number of CPUs. 1 runs the batch in this process.
+
+        Returns
+        -------
+        batch       :dict
+                    {'results': {ticker: vix}, 'errors': {ticker: message}}
+        """
+        r = self.get_shared_rate()
+        batch = {'results': {}, 'errors': {}}
+        results = []
+
+        if ((max_workers == 1) or (len(tickers) <= 1)):
+            for ticker in tickers:
+                self.__collect(batch, results, *_calculate_ticker(self, ticker, r))
+            self.__store(results)
+            return batch
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        # Each worker process builds its own Vix once, every task only sends a ticker and the rate
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_start_worker, initargs=(self.__worker_config(r),)) as pool:
+            futures = {pool.submit(_calculate_ticker_in_worker, ticker, r): ticker for ticker in tickers}
+
+            for future in as_completed(futures):
+                try:
+                    self.__collect(batch, results, *future.result())
+                except Exception as e:  # The worker process itself died
+                    batch['errors'][futures[future]] = str(e)
+
+        # The values computed by every worker are stored together, in one transaction
+        self.__store(results)
+        return batch
+
+    def calculate_batch(self, tickers: list, r: float = None, as_of: float = None) -> dict:
+        """
+        Same results as calculate_many(), computed in this process by BatchedVolatility: the selected strips of every
+        ticker go through steps 4 to 8 together, as arrays. When the chains are already cached, (ex: a tick over
+        hundreds of tickers), this costs far less than a calculation per ticker, and nothing is sent to other processes.
+
+        Parameters
+        ----------
+        tickers     :list
+        r           :float | dict
+                    Risk-free rate, or {expiration_timestamp: r}. By default, interpolated on the yield curve for
+                    every expiration, or FRED's 3m treasury yield, see get_shared_rate().
+        as_of       :float
+                    Unix timestamp to calculate the VIX as of, now by default, see calculate().
+
+        Returns
+        -------
+        batch       :dict
+                    {'results': {ticker: vix}, 'errors': {ticker: message}}
+        """
+        batch = {'results': {}, 'errors': {}}
+        timestamp = time.time() if (as_of is None) else as_of
+        selected_chains = {}
+        snapshot_times = {}
+
+        for ticker in tickers:
+            try:
+                selected_chains[ticker], snapshot_times[ticker] = self.select_chain(ticker, as_of)
+            except Exception as e:
+                batch['errors'][ticker] = str(e.args[0]) if e.args else repr(e)
+
+        if (r is None):
+            r = self.get_shared_rate(as_of)
+        if (r is None):
+            r = self.__expiration_rates([options for selected_chain in selected_chains.values() for options in selected_chain.values()], as_of)
+
+        with self.metrics.step('batch', tickers=len(selected_chains), engine='batched') as record:
+            engine = BatchedVolatility()
+            calculated = engine.calculate(selected_chains, r, as_of)
+            record['errors'] = len(calculated['errors'])
+            record['strikes_retained'] = sum(sum(terms.values()) for terms in engine.strikes_retained.values())
+
+        batch['results'].update(calculated['results'])
+        batch['errors'].update(calculated['errors'])
+
+        self.__store([
+            _result(ticker, timestamp, batch['results'].get(ticker), batch['errors'].get(ticker), selected_chains.get(ticker), r,
+                    snapshot_times.get(ticker), 'batched')
+            for ticker in tickers
+        ])
+        return batch
+
+    def term_structure(self, tickers: list, horizons: list = HORIZONS, r: float = None, as_of: float = None) -> dict:
+        """
+        Constant maturity indices of each ticker at every horizon, (ex: 9 and 30 days, 3 and 6 months), see TermStructure.
+        Each chain is fetched once, with enough months of expirations for the longest horizon, and the variance of
+        every expiration of every ticker is computed in a single pass.
+
+        Parameters
+        ----------
+        tickers     :list
+        horizons    :list
+                    Days to a constant maturity.
+        r           :float | dict
+                    Risk-free rate, or {expiration_timestamp: r}. By default, interpolated on the yield curve for
+                    every expiration, or FRED's 3m treasury yield, see get_shared_rate().
+        as_of       :float
+                    Unix timestamp to calculate the term structure as of, now by default, see calculate().
+
+        Returns
+        -------
+        batch       :dict
+                    {'results': {ticker: {horizon: vix}}, 'errors': {ticker: {horizon: message}}, 'variances': {ticker: table}}
+        """
+        months = max(3, -(-max(horizons) // 30) + 1)
+        chains = {}
+        failed = {}
+
+        for ticker in tickers:
+            try:
+                chains[ticker] = self.__build_option_chain(ticker, as_of, months, TermStructure.min_days_to_expiration, None)
+            except Exception as e:
+                failed[ticker] = {horizon: str(e.args[0]) if e.args else repr(e) for horizon in horizons}
+
+        if (r is None):
+            r = self.get_shared_rate(as_of)
+        if (r is None):
+            r = self.__expiration_rates([options for chain in chains.values() for options in chain], as_of)
+
+        with self.metrics.step('term_structure', tickers=len(chains), horizons=list(horizons)) as record:
+            batch = TermStructure().calculate(chains, r, horizons, as_of)
+            record['expirations'] = sum(len(table['variance']) for table in batch['variances'].values())
+
+        batch['errors'].update(failed)
+        return batch
+
+    def variance_surface(self, ticker: str, r: float | dict = None, as_of: float = None, all_expirations: bool = False) -> VarianceSurface:
+        """
+        T, r, F, K0, the variance and the strip of contributions of each expiration, see VarianceSurface.
+
+        By default, the near-term and next-term selected for the VIX, computed exactly like calculate() does. With
+        all_expirations, every expiration of the chain from 1 day on, each with its own forward level, like
+        term_structure(). The surface can then be saved, or shared with other processes, without recomputing anything.
+
+        Parameters
+        ----------
+        ticker              :str
+        r                   :float | dict
+                            Risk-free rate, or {'nearTerm': r1, 'nextTerm': r2}, (or {expiration_timestamp: r} with
+                            all_expirations). Looked up like calculate() and term_structure() when not given.
+        as_of               :float
+                            Unix timestamp to calculate the surface as of, now by default.
+        all_expirations     :bool
+
+        Returns
+        -------
+        surface             :VarianceSurface
+        """
+        with self.metrics.step('variance_surface', ticker=ticker) as record:
+            if all_expirations:
+                chain = self.__build_option_chain(ticker, as_of, 3, TermStructure.min_days_to_expiration, None)
+                terms = TermStructure().expirations(chain)
+                if (r is None):
+                    r = self.get_shared_rate(as_of)
+                if (r is None):
+                    r = self.__expiration_rates(terms, as_of)
+            else:
+                selected_chain = self.get_selected_chain(ticker, as_of)
+                terms = list(selected_chain.values())
+                if (r is None):
+                    r = self.get_term_rates(selected_chain, as_of)
+                r = {options.expiration_timestamp: term_rate(r, term) for term, options in selected_chain.items()}
+
+            variances = BatchedVolatility().variances(terms, r, as_of, shared_strike=(not all_expirations), strips=True)
+            surface = VarianceSurface.from_variances(terms, variances, ticker, as_of)
+            record['expirations'] = len(surface)
+            record['strikes'] = len(surface.strikes)
+
+        return surface
+
+    async def calculate_many_async(self, tickers: list, concurrency: int = 8, max_workers: int = None) -> dict:
+        """
+        Same as calculate_many(), but the option chains are downloaded concurrently, and each chain is handed to the
+        process pool as soon as it arrives. Network latency on the ~10MB responses overlaps with the calculation.
+
+        Parameters
+        ----------
+        tickers     :list
+        concurrency :int
+                    Maximum number of chain requests in flight.
+        max_workers :int
+                    Number of calculation processes, defaults to the number of CPUs.
+
+        Returns
+        -------
+        batch       :dict
+                    {'results': {ticker: vix}, 'errors': {ticker: message}}
+        """
+        # Only imported for batches, they take a while to import, (asyncio, multiprocessing).
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        r = await asyncio.to_thread(self.get_shared_rate)
+        batch = {'results': {}, 'errors': {}}
+        results = []
         time_range = build_option_chain_time_range()
 
-        td = TDAmeritrade(
-            ticker=ticker,
-            api_key=self.api_key,
-            cache=self.caching_enabled,
-            debug=self.debug,
-        )
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_start_worker, initargs=(self.__worker_config(r),)) as pool:
+            pending = {}
+            chains = self.provider.stream(
+                tickers,
+                time_range,
+                Expirations.min_days_to_expiration,
+                Expirations.max_days_to_expiration,
+                concurrency=concurrency,
+                metrics=self.metrics,
+            )
+
+            # The worker process receives the compact columnar chain, not the raw response.
+            async for ticker, chain, error in chains:
+                if (error is not None):
+                    batch['errors'][ticker] = error
+                    continue
+
+                pending[ticker] = loop.run_in_executor(pool, _calculate_chain_in_worker, ticker, chain, r)
+
+            for ticker, future in pending.items():
+                try:
+                    self.__collect(batch, results, *(await future))
+                except Exception as e:  # The worker process itself died
+                    batch['errors'][ticker] = str(e)
+
+        self.__store(results)
+        return batch
+
+    def replay(self, tickers: list = None, start: float = None, end: float = None, r: float = None):
+        """
+        Runs the VIX equation on every recorded snapshot of tickers, in time order, (see SnapshotProvider.replay()).
+
+        Parameters
+        ----------
+        tickers     :list
+                    Defaults to every ticker the provider has snapshots of.
+        start       :float
+        end         :float
+                    Unix timestamps, inclusive.
+        r           :float | dict
+                    Risk-free rate. By default, the rates of the day of each snapshot, see get_term_rates().
+
+        Yields
+        ------
+        result      :dict
+                    {'snapshot_time', 'ticker', 'vix', 'error'}, error is None unless the calculation failed.
+        """
+        if not hasattr(self.provider, 'replay'):
+            raise Exception(f"{type(self.provider).__name__} can't replay snapshots. Use a SnapshotProvider.")
+
+        snapshots = self.provider.replay(tickers, start, end, Expirations.min_days_to_expiration, Expirations.max_days_to_expiration)
+        for snapshot_time, ticker, chain in snapshots:
+            result = {'snapshot_time': snapshot_time, 'ticker': ticker, 'vix': None, 'error': None}
+            try:
+                result['vix'] = self.calculate_chain(chain, r, ticker, as_of=snapshot_time)
+            except Exception as e:
+                result['error'] = str(e.args[0]) if e.args else repr(e)
+            yield result
+
+    def stream_quotes(self, ticker: str, ticks, r: float | dict = None, as_of: float = None):
+        """
+        Publishes a tick-level VIX of a ticker: its chain is fetched once, then each tick of quote updates is applied to
+        an IncrementalVolatility, which only recomputes what the updated strikes change.
+
+        Parameters
+        ----------
+        ticker      :str
+        ticks       :iterable
+                    (timestamp, [updates]), ex: read_quote_updates() on a replay file.
+        r           :float | dict
+                    Risk-free rate, by default the rates of the selected terms, see get_term_rates().
+        as_of       :float
+                    Unix timestamp of the chain the updates apply to, now by default.
+
+        Yields
+        ------
+        result      :dict
+                    {'timestamp', 'ticker', 'vix', 'error'}, T is measured from each tick's timestamp.
+        """
+        selected_chain = self.get_selected_chain(ticker, as_of)
+        if (r is None):
+            r = self.get_term_rates(selected_chain, as_of)
+
+        engine = IncrementalVolatility(selected_chain, r)
+        with self.metrics.step('stream_quotes', ticker=ticker) as record:
+            for timestamp, updates in ticks:
+                result = {'timestamp': timestamp, 'ticker': ticker, 'vix': None, 'error': None}
+                try:
+                    engine.apply(updates)
+                    result['vix'] = engine.value(timestamp)
+                except Exception as e:
+                    result['error'] = str(e.args[0]) if e.args else repr(e)
+                yield result
+
+            record.update(engine.stats)
+
+    def __collect(self, batch: dict, results: list, ticker: str, result: dict, error: str, records: list = None):
+        # Records made in a worker process, (None when the ticker ran in this process and recorded them already).
+        for record in (records or []):
+            self.metrics.record(record)
+
+        if (error is None):
+            batch['results'][ticker] = result['vix']
+            results.append(result)
+        else:
+            batch['errors'][ticker] = error
+            results.append(_result(ticker, time.time(), None, error))
+
+    def __worker_config(self, r: float = None) -> dict:
+        # What a worker process needs to build a Vix calculating like this one, see _start_worker(). Caches, metrics
+        # and the result store stay in this process.
+        return {
+            'td_api_key': self.api_key,
+            'caching_enabled': self.caching_enabled,
+            'debug': self.debug,
+            'engine': self.engine,
+            'cache_format': self.cache_format,
+            'chain_cache_ttl': self.chain_cache.ttl,
+            'chain_cache_max_bytes': self.chain_cache.max_bytes,
+            'memory_cache_size': self.chain_memory.max_entries,
+            'prune_band': self.prune_band,
+            # The default provider is built again from the settings above, others, (ex: a SnapshotProvider), are sent
+            'provider': None if self.__default_provider else self.provider,
+            # Only needed to look up the rates of each ticker's terms, when there is no shared rate
+            'yield_curve': self.__get_yield_curve() if (r is None) else None,
+        }
+
+    def __store(self, results: list):
+        result_store = self.get_result_store()
+        if (result_store is not None):
+            result_store.insert_many(results)
+
+    def get_result_store(self) -> 'ResultStore | None':
+        # sqlite3 is only imported once something is stored. Threads storing at the same time share one store.
+        if isinstance(self.result_store, str):
+            with _opening_result_store:
+                if isinstance(self.result_store, str):
+                    from vix.results import ResultStore
+                    self.result_store = ResultStore(self.result_store)
+
+        return self.result_store
+
+    def cache_stats(self) -> dict:
+        """
+        Hit/miss statistics of the chain and rates caches, for calculations run in this process.
+        """
+        return {
+            'chains': dict(self.chain_cache.stats),
+            'rates': dict(self.rates_cache.stats),
+            'chains_memory': dict(self.chain_memory.stats),
+            'rates_memory': dict(self.rates_memory.stats),
+            'strips': dict(self.strip_cache.memory.stats),
+            'strips_disk': dict(self.strip_cache.disk_cache.stats),
+        }
+
+    def get_selected_chain(self, ticker: str, as_of: float = None) -> dict:
+        return self.select_chain(ticker, as_of)[0]
+
+    def select_chain(self, ticker: str, as_of: float = None) -> tuple[dict, float]:
+        # Steps 1 and 2, skipped entirely when the strips selected from a fresh snapshot of the chain are memoized.
+        # Historical chains aren't fresh by definition, so they never go through the strip cache.
+        # Returns (selected_chain, snapshot_time of the chain it was selected from), the snapshot time versions the terms.
+        if ((not self.caching_enabled) or (as_of is not None)):
+            chain = self.__build_option_chain(ticker, as_of)
+            return self.__get_near_next_term_options(ticker, chain), chain.snapshot_time
+
+        time_range = build_option_chain_time_range()
+        with self.metrics.step('strip_cache', ticker=ticker) as record:
+            strips = self.strip_cache.get(ticker, time_range)
+            record['cache'] = 'hit' if strips else 'miss'
+        if strips: return strips
+
+        chain = self.__build_option_chain(ticker)
+        selected_chain = self.__get_near_next_term_options(ticker, chain)
+        self.strip_cache.set(ticker, time_range, selected_chain, chain.snapshot_time)
+
+        return selected_chain, chain.snapshot_time
+
+    def __build_option_chain(self, ticker: str, as_of: float = None, months: int = 3, min_days: int = Expirations.min_days_to_expiration,
+                             max_days: int = Expirations.max_days_to_expiration) -> OptionChain:
+        # Step 1: Fetch the option chain for the ticker.
+        # The raw response is parsed once into a columnar OptionChain, which every following step reads from.
+        # The VIX only needs 3 months of expirations within the Expirations window, a term structure can need more.
+        time_range = build_option_chain_time_range(as_of, months)
+        key = (ticker, time_range[0].date(), time_range[1].date(), as_of, min_days, max_days)
+
+        with self.metrics.step('option_chain', ticker=ticker) as record:
+            chain = self.chain_memory.get(key) if self.caching_enabled else None
+
+            if (chain is not None):
+                record['source'] = 'memory'
+            else:
+                chain = self.__fetch_option_chain(ticker, time_range, record, as_of, min_days, max_days)
+                if self.caching_enabled:
+                    # A chain read from a disk cache is only fresh for what is left of its ttl. Historical chains
+                    # never change, they stay for a whole ttl.
+                    self.chain_memory.set(key, chain, chain.snapshot_time if (as_of is None) else None)
+
+            record['cache'] = 'miss' if (record['source'] in ['network', None]) else 'hit'
+            record['expirations'] = len(chain)
 
-        chain = td.get_option_chain(time_range)
         return chain
 
-    def __get_near_next_term_options(self, chain: dict) -> dict:
+    def __fetch_option_chain(self, ticker: str, time_range: list, record: dict, as_of: float = None, min_days: int = None,
+                             max_days: int = None) -> OptionChain:
+        kwargs = {'as_of': as_of} if (as_of is not None) else {}  # Providers without history don't need to know about it
+        return self.provider.get_option_chain(
+            ticker,
+            time_range,
+            min_days=min_days,
+            max_days=max_days,
+            record=record,
+            **kwargs
+        )
+
+    def __get_near_next_term_options(self, ticker: str, chain: OptionChain) -> dict:
         # Step 2
         # Find the proper "near-term" and "next-term" option expirations to be used to find Forward Level.
         # https://www.sfu.ca/~poitras/419_VIX.pdf (pg 4)
-        expirations = Expirations()
-        selected_chain = expirations.find_option_terms(chain)
+        with self.metrics.step('find_option_terms', ticker=ticker) as record:
+            expirations = Expirations()
+            selected_chain = expirations.find_option_terms(chain)
+            record['expirations'] = len(chain)
         return selected_chain
 
-    def __get_risk_free_rate(self) -> float:
+    def get_risk_free_rate(self, as_of: float = None) -> float:
         # Step 3
         # Calculate R
         # The risk-free interest rate, R, is the bond-equivalent yield of the U.S. T-bill maturing
         # closest to the expiration dates of relevant SPX options. As such, the VIX calculation may
         # use different risk-free interest rates for near- and next-term options.
         # https://www.sfu.ca/~poitras/419_VIX.pdf (pg 4)
-        fred = Fred(cache=self.caching_enabled, debug=self.debug)
-        r = fred.scrape_3m_treasury()
+        # This is the 3m treasury yield, from the yield curve when it covers the day, otherwise from FRED.
+        # See get_term_rates() for the rate of each term. As of a past day, the rate published on that day.
+        fred = Fred(cache=self.caching_enabled, debug=self.debug, disk_cache=self.rates_cache, as_of=as_of)
+        key = fred.timestamp.date()
+
+        with self.metrics.step('risk_free_rate') as record:
+            r = self.rates_memory.get(key) if self.caching_enabled else None
+            curve = None if (r or self.debug) else self.__get_yield_curve()
+
+            if r:
+                record['source'] = 'memory'
+            elif (curve and curve.covers(key)):
+                r = curve.rate(THREE_MONTHS, key)
+                record['source'] = 'yield_curve'
+            else:
+                r = fred.scrape_3m_treasury()
+                record['source'] = fred.source
+
+            if (r and self.caching_enabled and (record['source'] != 'memory')):
+                self.rates_memory.set(key, r)
+
+            record['cache'] = 'miss' if (record['source'] in ['network', None]) else 'hit'
+            record['r'] = r
 
         return r
 
-    def __get_t1_t2(self, selected_chain: dict) -> dict:
+    def get_term_rates(self, selected_chain: dict, as_of: float = None) -> dict:
+        """
+        The risk-free rate of each term, interpolated on the yield curve at the term's days to expiration.
+        When the yield curve doesn't cover the day, (or there is no yield curve file), both terms use get_risk_free_rate().
+
+        Returns
+        -------
+        r           :dict
+                    {'nearTerm': r1, 'nextTerm': r2}, in percents.
+        """
+        curve = None if self.debug else self.__get_yield_curve()
+        date = self.__rates_date(as_of)
+
+        if (curve and curve.covers(date)):
+            with self.metrics.step('risk_free_rate') as record:
+                rates = curve.term_rates(selected_chain, date)
+                record['source'] = 'yield_curve'
+                record['cache'] = 'hit'
+                record['r'] = rates
+            return rates
+
+        r = self.get_risk_free_rate(as_of)
+        return {term: r for term in selected_chain}
+
+    def get_shared_rate(self, as_of: float = None) -> float | None:
+        """
+        The rate shared by every ticker of a batch. None when the yield curve covers the day, each calculation then
+        interpolates the rates of its own terms. Otherwise the 3m treasury yield, fetched once for the whole batch.
+        """
+        curve = None if self.debug else self.__get_yield_curve()
+        if (curve and curve.covers(self.__rates_date(as_of))):
+            return None
+        return self.get_risk_free_rate(as_of)
+
+    def __expiration_rates(self, terms: list, as_of: float = None) -> dict:
+        # {expiration_timestamp: r} for every term of a batch, see BatchedVolatility
+        curve = self.__get_yield_curve()
+        date = self.__rates_date(as_of)
+        return {options.expiration_timestamp: curve.rate(options.days_to_expiration, date) for options in terms}
+
+    def __get_yield_curve(self) -> YieldCurve | None:
+        if isinstance(self.yield_curve, str):
+            path = self.yield_curve
+            self.yield_curve = None
+            if os.path.exists(path):
+                try:
+                    self.yield_curve = YieldCurve.load(path)
+                except Exception as e:
+                    print('Error when loading the yield curve: ', e)
+
+        return self.yield_curve
+
+    def __rates_date(self, as_of: float = None) -> datetime.date:
+        return datetime.datetime.fromtimestamp(as_of).date() if (as_of is not None) else datetime.date.today()
+
+    def __get_t1_t2(self, selected_chain: dict, as_of: float = None) -> dict:
         # Step 4
         # Calculate T1 and T2, for near-term and next-term options respectively. See calculateT() in functions.py for more.
         # https://www.sfu.ca/~poitras/419_VIX.pdf (pg 4)
-        t, tminutes = calculate_t(selected_chain)
+        t, tminutes = calculate_t(selected_chain, as_of)
         return t, tminutes
 
     def __get_forward_level(self, t: dict, r: float, selected_chain: dict) -> dict:
@@ -106,7 +734,7 @@ class Vix:
         f = calculate_f(t, r, forward_level)
         return f
 
-    def __get_volatility(self, f: dict, t: dict, r: float, selected_chain: dict) -> dict:
+    def __get_volatility(self, f: dict, t: dict, r: float, selected_chain: dict, record: dict) -> dict:
         # Step 7
         # Calculate Vol
         # Most of this function is finding K0
@@ -114,25 +742,78 @@ class Vix:
         # I decided it would take far more code to break up this function into multiple parts rather than to simply
         # finish it in one loop.
         # https://www.sfu.ca/~poitras/419_VIX.pdf (pg 6 - 9)
-        vol = Volatility().calculate(f, t, r, selected_chain)
+        engine = self.engines[self.engine]()
+        vol = engine.calculate(f, t, r, selected_chain)
+
+        record['terms'] = {
+            term: {
+                'strikes_considered': len(options.call) + len(options.put),
+                'strikes_retained': engine.strikes_retained[term],
+            }
+            for term, options in selected_chain.items()
+        }
         return vol
 
     def __equation(self, vol, t, tminutes):
         # Step 8
-        # Calculate VIX
-        v1 = vol['nearTerm']  # Volatility of near-term options
-        v2 = vol['nextTerm']  # Volatility of next-term options
-        t1 = t['nearTerm']  # Special VIX calculation for near-term options timing
-        t2 = t['nextTerm']  # Special VIX calculation for next-term options timing
-        nT1 = tminutes['nearTerm']  # Minutes to expiration
-        nT2 = tminutes['nextTerm']  # Minutes to expiration
-
-        minYear = 525600  # Minutes in a year
-        minMonth = 43200  # minutes in a month
-
-        # VIX Equation
-        vix = 100 * math.sqrt(
-            (t1 * v1 * ((nT2 - minMonth) / (nT2 - nT1)) + t2 * v2 * ((minMonth - nT1) / (nT2 - nT1))) * minYear / minMonth
-        )
+        # Calculate VIX, see calculate_vix() in math.py
+        return calculate_vix(vol, t, tminutes)
+
+_worker = None  # The Vix of a worker process, see _start_worker()
+
+
+def _start_worker(config: dict):
+    # Runs once in each worker process of a pool. The metrics records made in a worker go back with each result,
+    # see _worker_records().
+    global _worker
+    _worker = Vix(**config)
+    _worker.metrics.detached = True
+
+
+def _calculate_ticker_in_worker(ticker: str, r: float) -> tuple:
+    # Worker functions have to live at module level to be picklable
+    return _calculate_ticker(_worker, ticker, r)
+
+
+def _calculate_chain_in_worker(ticker: str, chain: OptionChain, r: float) -> tuple:
+    return _calculate_chain(_worker, ticker, chain, r)
+
+
+def _calculate_ticker(vix: Vix, ticker: str, r: float) -> tuple:
+    # The result goes back to the parent, which stores it with the rest of the batch.
+    try:
+        return ticker, vix.calculate_result(ticker, r=r), None, _worker_records(vix)
+    except Exception as e:
+        # Our exceptions often carry sys.exc_info(), and tracebacks can't be pickled back to the parent process.
+        return ticker, None, str(e.args[0]) if e.args else repr(e), _worker_records(vix)
+
+
+def _calculate_chain(vix: Vix, ticker: str, chain: OptionChain, r: float) -> tuple:
+    try:
+        return ticker, vix.calculate_chain_result(chain, r, ticker), None, _worker_records(vix)
+    except Exception as e:
+        return ticker, None, str(e.args[0]) if e.args else repr(e), _worker_records(vix)
+
+
+def _worker_records(vix: Vix) -> list | None:
+    # The records of this task only, a worker runs many
+    if not vix.metrics.detached: return None
+    records = vix.metrics.export()
+    vix.metrics.clear()
+    return records
+
+
+def _result(ticker: str, timestamp: float, vix: float, error: str, selected_chain: dict = None, r: float | dict = None,
+            snapshot_time: float = None, engine: str = None) -> dict:
+    # A row of the ResultStore. r is a rate, per term, or per expiration timestamp, (see calculate_batch()).
+    result = {'ticker': ticker, 'timestamp': timestamp, 'vix': vix, 'error': error, 'snapshot_time': snapshot_time, 'engine': engine}
+
+    for prefix, term in [('near', 'nearTerm'), ('next', 'nextTerm')]:
+        options = selected_chain[term] if selected_chain else None
+        result[f"{prefix}_expiration"] = int(options.expiration_timestamp) if options else None
+        if isinstance(r, dict) and (term not in r):
+            result[f"{prefix}_rate"] = r.get(options.expiration_timestamp) if options else None
+        else:
+            result[f"{prefix}_rate"] = term_rate(r, term)
 
-        return round(vix, 3)
+    return result
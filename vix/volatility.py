@@ -1,15 +1,20 @@
 from math import e
+from vix.options.chain import OptionTerm
+from vix.math import term_rate
 
 class Volatility:
-    def calculate(self, f: dict, t: dict, r: float, selected_chain: dict) -> dict:
+    def calculate(self, f: dict, t: dict, r: float | dict, selected_chain: dict) -> dict:
         """
         f = forward level
         t = time to expiration
-        r = risk free rate
+        r = risk free rate, or one per term
         selected_chain = selected option chain
+
+        The number of strikes kept in each term's strip is left in self.strikes_retained.
         """
 
         vol = {}
+        self.strikes_retained = {}
         for term, options in selected_chain.items():
             min_forward_level = float(int(f[term]))
             k0, ks = self.__calculateK0(options, min_forward_level)
@@ -25,7 +30,8 @@ class Volatility:
             put_call_avg = (call_mid_quote + put_mid_quote) / 2
 
             vix_chain = self.__build_vix_chain(bounds, k0, ks, put_call_avg)
-            contributions = self.__calculate_strike_contributions(r, t[term], vix_chain)
+            contributions = self.__calculate_strike_contributions(term_rate(r, term), t[term], vix_chain)
+            self.strikes_retained[term] = len(vix_chain)
 
             # The following is essentially the VIX formula
             # 2/T ∑∆Ki/Ki**2 e**(rt) * q
@@ -38,25 +44,23 @@ class Volatility:
 
         return vol
 
-    def __calculateK0(self, options: dict, min_forward_level: float) -> tuple[str, dict]:
+    def __calculateK0(self, options: OptionTerm, min_forward_level: float) -> tuple[float, dict]:
         ks = {}  # As in many k's. A collection of k's, (contracts within VIX parameters)
 
-        for side, option in options.items():
+        for side, option in options.sides().items():
             ks[side] = {}
-            for strike, details in option['strikes'].items():
-                
+            for strike, bid, ask, midquote in zip(option.strikes.tolist(), option.bid.tolist(), option.ask.tolist(), option.mid.tolist()):
+
                 # Collecting bids and asks to be used in determining 'ki'
-                bid = details[0]['bid']
-                ask = details[0]['ask']
                 ks[side][strike] = {
                     'bid': bid,
                     'ask': ask,
-                    'midquote': (bid + ask) / 2
+                    'midquote': midquote
                 }
 
                 # Collecting k0
                 # The first strike below the forward index level, F
-                if (float(strike) <= min_forward_level):
+                if (strike <= min_forward_level):
                     k0 = strike
         return k0, ks
 